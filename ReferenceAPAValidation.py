@@ -1,20 +1,48 @@
 import os
 import re
 import logging
-from flask import Flask, render_template, request, send_file, redirect, url_for, flash, make_response, session
+from flask import Flask, render_template, request, redirect, url_for, flash, session, Response
 from werkzeug.utils import secure_filename
 from docx import Document
+from docx.enum.text import WD_COLOR_INDEX
+from docx.enum.style import WD_STYLE_TYPE
+from lxml import etree
 import io
 import zipfile
+import copy
+import hashlib
+import concurrent.futures
+import threading
+import shutil
+import time
+import uuid
+from pathlib import Path
+import tempfile
+import bisect
+from operator import itemgetter
+from array import array
+from itertools import islice, repeat
+from collections import defaultdict, namedtuple, OrderedDict
+from functools import lru_cache, partial
+from rapidfuzz import fuzz, process
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 from citation_parsers import get_parser, auto_detect_style
+from duplicate_scoring import length_window_pairs
 
 # Configure logging
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format=LOG_FORMAT
 )
 logger = logging.getLogger(__name__)
 
+# Imported after logging is configured, so its own basicConfig fallback stays a no-op
+import ReferencesStructing as RS
+
 app = Flask(__name__)
 app.secret_key = os.environ.get('SESSION_SECRET', 'dev-secret-key')
 
@@ -27,37 +55,200 @@ if not os.path.exists(UPLOAD_FOLDER):
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
+# Paragraph spools stay in RAM up to this many bytes before rolling over to disk
+SPOOL_MAX_MEMORY = 64 * 1024
+SPOOL_READ_BATCH = 1024
+
+# Batch ZIPs are streamed to the client in pieces of roughly this size
+ZIP_STREAM_CHUNK = 64 * 1024
+# Members that are already DEFLATE containers gain nothing from recompression
+ZIP_STORED_SUFFIXES = ('.docx',)
+# Batch directories are removed once their ZIP has been sent; anything left
+# behind (crash, aborted download) is swept after this many seconds
+BATCH_DIR_MAX_AGE = 60 * 60
+BATCH_SWEEP_INTERVAL = 10 * 60
+_batch_sweeper_started = False
+_batch_sweeper_lock = threading.Lock()
+
+# Validation results for recently seen documents, keyed by (content hash, requested style)
+VALIDATION_CACHE_SIZE = 32
+_validation_cache = OrderedDict()
+_validation_cache_lock = threading.Lock()
+
+# WordprocessingML tags read when streaming paragraph text
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_W_BODY = _W + 'body'
+_W_P = _W + 'p'
+_W_R = _W + 'r'
+_W_HYPERLINK = _W + 'hyperlink'
+_W_T = _W + 't'
+_W_TAB = _W + 'tab'
+_W_PTAB = _W + 'ptab'
+_W_BR = _W + 'br'
+_W_CR = _W + 'cr'
+_W_NO_BREAK_HYPHEN = _W + 'noBreakHyphen'
+_W_TYPE = _W + 'type'
+
+# Precompiled patterns used on every citation / reference
+_BRACKETED_RE = re.compile(r'\[[^\]]+\]')
+_LEAD_IN_RE = re.compile(r'^(see|cf\.?|e\.g\.?,?|i\.e\.?,?)\s+', re.IGNORECASE)
+_PAGE_RE = re.compile(r'\bp\.?\s*\d+', re.IGNORECASE)
+_MONTH_RE = re.compile(r'(January|February|March|April|May|June|July|August|September|October|November|December)', re.IGNORECASE)
+_YEAR_RE = re.compile(r'\b((?:19|20)\d{2})[a-z]?\b')
+_YEAR_SEGMENT_RE = re.compile(r',?\s*(?:19|20)\d{2}[a-z]?,?\s*')
+_TRAILING_COMMA_RE = re.compile(r',\s*$')
+_LEADING_NUMBER_RE = re.compile(r'^\d+,?\s*')
+_ET_AL_RE = re.compile(r'\s*et\s+al\.?\s*', re.IGNORECASE)
+_WORD_RE = re.compile(r'\b[a-z]{2,}\b')
+_AND_RE = re.compile(r'\band\b')
+_PUNCT_TABLE = str.maketrans('', '', '.,')
+_ABBR_INTRO_RE = re.compile(r'^(.*?)\s*\[.*?\]')
+_INITIAL_RE = re.compile(r'^[A-Z]\.?$')
+_CITE_YEAR_RE = re.compile(r'(\b\d{4}[a-z]?\b|n\.d\.|in press)', re.IGNORECASE)
+
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def _main_document_part(zf):
+    """Locate the main document part (usually word/document.xml) via the package relationships."""
+    rels = etree.fromstring(zf.read('_rels/.rels'))
+    for rel in rels:
+        if rel.get('Type', '').endswith('/officeDocument'):
+            return rel.get('Target').lstrip('/')
+    return 'word/document.xml'
+
+
+def _run_text(run_elem):
+    """Text of a w:r element, translated the same way as python-docx's Run.text."""
+    parts = []
+    for child in run_elem:
+        tag = child.tag
+        if tag == _W_T:
+            parts.append(child.text or '')
+        elif tag == _W_TAB or tag == _W_PTAB:
+            parts.append('\t')
+        elif tag == _W_CR or (tag == _W_BR and child.get(_W_TYPE, 'textWrapping') == 'textWrapping'):
+            parts.append('\n')
+        elif tag == _W_NO_BREAK_HYPHEN:
+            parts.append('-')
+    return ''.join(parts)
+
+
+def iter_docx_paragraphs(file_path):
+    """
+    Stream the text of each top-level body paragraph straight from the docx XML.
+    Yields exactly what Document(file_path).paragraphs[i].text would, in order,
+    without building python-docx wrapper objects for every paragraph and run.
+    """
+    with zipfile.ZipFile(file_path) as zf:
+        part_name = _main_document_part(zf)
+        with zf.open(part_name) as f:
+            for _, elem in etree.iterparse(f, events=('end',), tag=_W_P):
+                parent = elem.getparent()
+                if parent is None or parent.tag != _W_BODY:
+                    continue
+                parts = []
+                for child in elem:
+                    if child.tag == _W_R:
+                        parts.append(_run_text(child))
+                    elif child.tag == _W_HYPERLINK:
+                        parts.extend(_run_text(r) for r in child.iterchildren(_W_R))
+                yield ''.join(parts)
+                # Free already-processed body content
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+
 def extract_text_from_docx(file_path):
-    doc = Document(file_path)
-    paragraphs = []
-    for para in doc.paragraphs:
-        paragraphs.append(para.text)
-    return paragraphs
+    return list(iter_docx_paragraphs(file_path))
+
+
+class SpooledParagraphs:
+    """
+    Read-only paragraph sequence backed by a spooled temporary file.
+    Paragraphs are written once as UTF-8 while the bibliography tags are located
+    (available afterwards as .sections); reads seek back to just the range needed.
+    Only a compact offset table stays in memory, not one str per paragraph.
+    """
+
+    def __init__(self, paragraphs):
+        self._file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        self._offsets = array('Q', [0])
+        self.sections = find_reference_sections(self._spool(paragraphs))
+
+    def _spool(self, paragraphs):
+        for para in paragraphs:
+            self._offsets.append(self._offsets[-1] + self._file.write(para.encode('utf-8')))
+            yield para
+
+    def _read(self, start, stop):
+        self._file.seek(self._offsets[start])
+        data = self._file.read(self._offsets[stop] - self._offsets[start])
+        base = self._offsets[start]
+        return [data[self._offsets[i] - base:self._offsets[i + 1] - base].decode('utf-8') for i in range(start, stop)]
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return self._read(start, max(start, stop))[::step]
+            return self._read(start, max(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('paragraph index out of range')
+        return self._read(index, index + 1)[0]
+
+    def __iter__(self):
+        for start in range(0, len(self), SPOOL_READ_BATCH):
+            yield from self._read(start, min(start + SPOOL_READ_BATCH, len(self)))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def spool_docx_paragraphs(file_path):
+    """Stream a docx's paragraphs into a SpooledParagraphs without building the full list."""
+    return SpooledParagraphs(iter_docx_paragraphs(file_path))
 
 
 def normalize_citation_key(author_part, year):
-    author_clean = re.sub(r'[^\w\s&]', '', author_part).strip()
-    author_clean = re.sub(r'\s+', ' ', author_clean)
-    return f"{author_clean}|{year}"
+    # Single pass equivalent of dropping [^\w\s&] then collapsing/stripping whitespace
+    out = []
+    pending_space = False
+    for ch in author_part:
+        if ch.isalnum() or ch == '_' or ch == '&':
+            if pending_space and out:
+                out.append(' ')
+            pending_space = False
+            out.append(ch)
+        elif ch.isspace():
+            pending_space = True
+    return f"{''.join(out)}|{year}"
 
 
 # Ported from Referencenumvalidation.py
 def find_duplicates(references, reference_details):
     """
-    Finds duplicate references using fuzzy matching (difflib) on FULL TEXT.
+    Finds duplicate references using fuzzy matching (RapidFuzz) on FULL TEXT.
     Args:
         references: Dictionary of reference objects.
         reference_details: Dictionary containing 'text' for each reference key.
     Returns:
         List of dicts: {'id': str, 'text': str, 'duplicate_of': str, 'score': float}
     """
-    import difflib
-    
     duplicates = []
     processed_refs = [] 
     for key, data in references.items():
@@ -65,50 +256,44 @@ def find_duplicates(references, reference_details):
         text = reference_details.get(key, {}).get('text', data.get('display', ''))
         processed_refs.append({'id': key, 'text': text})
         
-    n = len(processed_refs)
-    for i in range(n):
-        ref_a = processed_refs[i]
-        for j in range(i + 1, n):
-            ref_b = processed_refs[j]
-            
-            # Simple fuzzy match on the display string
-            len_a = len(ref_a['text'])
-            len_b = len(ref_b['text'])
-            if len_a == 0 or len_b == 0: continue
-            
-            if min(len_a, len_b) / max(len_a, len_b) < 0.6:
-                continue
-            
-            ratio = difflib.SequenceMatcher(None, ref_a['text'], ref_b['text']).ratio()
-            
-            if ratio > 0.85:
-                duplicates.append({
-                    'id': ref_b['id'], 
-                    'text': ref_b['text'][:100],
-                    'duplicate_of': ref_a['id'],
-                    'score': round(ratio * 100, 1)
-                })
-        
+    texts = [ref['text'] for ref in processed_refs]
+    for i, j, score in _score_window_pairs(texts):
+        duplicates.append({
+            'id': processed_refs[j]['id'],
+            'text': processed_refs[j]['text'][:100],
+            'duplicate_of': processed_refs[i]['id'],
+            'score': round(score, 1)
+        })
 
     return duplicates
 
 
+def _score_window_pairs(texts):
+    """
+    Score length-compatible pairs of texts with duplicate_scoring.length_window_pairs
+    and return the (i, j, score) pairs with i < j and fuzz.ratio above 85, in (i, j) order.
+    """
+    return [(i, j, score) for i, j, score in zip(*length_window_pairs(texts))
+            # Empty references never count as duplicates
+            if texts[i] and texts[j]]
+
+
 def parse_single_citation(cite_text):
     cite_text = cite_text.strip()
-    cite_text = re.sub(r'\[[^\]]+\]', '', cite_text).strip()
-    cite_text = re.sub(r'^(see|cf\.?|e\.g\.?,?|i\.e\.?,?)\s+', '', cite_text, flags=re.IGNORECASE).strip()
+    cite_text = _BRACKETED_RE.sub('', cite_text).strip()
+    cite_text = _LEAD_IN_RE.sub('', cite_text).strip()
     
-    if re.search(r'\bp\.?\s*\d+', cite_text, re.IGNORECASE):
+    if _PAGE_RE.search(cite_text):
         return [(None, None)]
     
-    if re.search(r'(January|February|March|April|May|June|July|August|September|October|November|December)', cite_text, re.IGNORECASE):
+    if _MONTH_RE.search(cite_text):
         return [(None, None)]
     
-    years = re.findall(r'\b((?:19|20)\d{2})[a-z]?\b', cite_text)
+    years = _YEAR_RE.findall(cite_text)
     if years:
-        author_part = re.sub(r',?\s*(?:19|20)\d{2}[a-z]?,?\s*', '', cite_text).strip()
-        author_part = re.sub(r',\s*$', '', author_part).strip()
-        author_part = re.sub(r'^\d+,?\s*', '', author_part).strip()
+        author_part = _YEAR_SEGMENT_RE.sub('', cite_text).strip()
+        author_part = _TRAILING_COMMA_RE.sub('', author_part).strip()
+        author_part = _LEADING_NUMBER_RE.sub('', author_part).strip()
         
         if not author_part or len(author_part) < 2:
             return [(None, None)]
@@ -120,18 +305,44 @@ def parse_single_citation(cite_text):
     return [(None, None)]
 
 
-def find_citations_in_text(paragraphs, parser):
+def find_reference_sections(paragraphs):
+    """
+    Locate the bibliography in a single pass.
+    Returns (start, end) paragraph index ranges lying strictly between each
+    <ref-open> tag and its <ref-close> (or the end of the document).
+    """
+    sections = []
+    start = None
+    count = 0
+    for i, para in enumerate(paragraphs):
+        count = i + 1
+        if '<ref-open>' in para:
+            if start is not None:
+                sections.append((start, i))
+            start = i + 1
+        elif '<ref-close>' in para:
+            if start is not None:
+                sections.append((start, i))
+                start = None
+    if start is not None:
+        sections.append((start, count))
+    return sections
+
+
+def find_citations_in_text(paragraphs, parser, body_end=None):
     """
     Find citations using the provided parser.
+    Only paragraphs before body_end (the first <ref-open> tag) are scanned.
     """
     citations = {}
     citation_locations = {}
     
-    for i, para in enumerate(paragraphs):
-        # Stop if we hit the bibliography section start
-        if '<ref-open>' in para:
-            break
-            
+    # Stop where the bibliography section starts
+    if body_end is None:
+        body_end = next((i for i, para in enumerate(paragraphs) if '<ref-open>' in para), len(paragraphs))
+    
+    for i, para in enumerate(islice(paragraphs, body_end)):
+        
         # Pass the whole paragraph text to the parser
         # The parser is now responsible for finding parenthetical AND narrative citations
         found_citations = parser.parse_citation(para)
@@ -155,79 +366,75 @@ def find_citations_in_text(paragraphs, parser):
                     'author': author,
                     'year': year,
                     'type': cite['type'],
-                    'warnings': cite.get('warnings', []),
+                    # Ordered set while scanning so repeated merges stay O(1) per warning
+                    'warnings': dict.fromkeys(cite.get('warnings', [])),
                     'raw': cite.get('raw', '')
                 }
             else:
                 # Merge warnings if new ones found
-                citations[citation_key]['warnings'].extend([w for w in cite.get('warnings', []) if w not in citations[citation_key]['warnings']])
+                citations[citation_key]['warnings'].update(dict.fromkeys(cite.get('warnings', [])))
 
             if citation_key not in citation_locations:
                 citation_locations[citation_key] = []
             citation_locations[citation_key].append(i + 1)
     
+    for cite_data in citations.values():
+        cite_data['warnings'] = list(cite_data['warnings'])
+    
     return citations, citation_locations
 
 
-def find_references_in_bibliography(paragraphs, parser):
+def find_references_in_bibliography(paragraphs, parser, sections=None):
     """
     Find references strictly between <ref-open> and <ref-close> tags.
+    sections: optional precomputed result of find_reference_sections(paragraphs).
     """
     references = {}
     reference_details = {}
     abbreviation_map = {}
     
-    in_references_section = False
+    if sections is None:
+        sections = find_reference_sections(paragraphs)
     
-    for i, para in enumerate(paragraphs):
-        para_stripped = para.strip()
-        
-        # Check for tags
-        if '<ref-open>' in para_stripped:
-            in_references_section = True
-            # If the tag is on its own line, continue. If inline, we might need to parse the rest?
-            # Assuming tag is a section delimiter.
-            continue
-        
-        if '<ref-close>' in para_stripped:
-            in_references_section = False
-            continue
-            
-        if in_references_section and para_stripped:
-            # Parse reference using parser
-            ref_data = parser.parse_reference(para_stripped)
+    for start, end in sections:
+        for i, para in enumerate(paragraphs[start:end], start):
+            para_stripped = para.strip()
             
-            if ref_data:
-                author_display = ref_data['author']
-                year = ref_data['year']
-                full_author = ref_data['full_author']
-                abbreviations = ref_data['abbreviations']
-                
-                ref_key = normalize_citation_key(author_display, year)
+            if para_stripped:
+                # Parse reference using parser
+                ref_data = parser.parse_reference(para_stripped)
                 
-                if ref_key not in references:
-                    references[ref_key] = {
-                        'display': f"{author_display} ({year})",
-                        'author': author_display,
-                        'year': year,
-                        'full_author': full_author,
-                        'abbreviations': abbreviations
-                    }
-                    reference_details[ref_key] = {
-                        'line': i + 1,
-                        'text': para_stripped[:150] + ('...' if len(para_stripped) > 150 else '')
-                    }
+                if ref_data:
+                    author_display = ref_data['author']
+                    year = ref_data['year']
+                    full_author = ref_data['full_author']
+                    abbreviations = ref_data['abbreviations']
                     
-                    for abbr in abbreviations:
-                        abbr_key = f"{abbr}|{year}"
-                        abbreviation_map[abbr_key] = ref_key
-    
+                    ref_key = normalize_citation_key(author_display, year)
+                    
+                    if ref_key not in references:
+                        references[ref_key] = {
+                            'display': f"{author_display} ({year})",
+                            'author': author_display,
+                            'year': year,
+                            'full_author': full_author,
+                            'abbreviations': abbreviations
+                        }
+                        reference_details[ref_key] = {
+                            'line': i + 1,
+                            'text': para_stripped[:150] + ('...' if len(para_stripped) > 150 else '')
+                        }
+                        
+                        for abbr in abbreviations:
+                            abbr_key = f"{abbr}|{year}"
+                            abbreviation_map[abbr_key] = ref_key
+        
     return references, reference_details, abbreviation_map
 
 
 def extract_first_surname(author_str):
     author_str = author_str.strip()
-    author_str = re.sub(r'\s*et\s+al\.?\s*', '', author_str, flags=re.IGNORECASE)
+    author_str = _ET_AL_RE.sub('', author_str)
     
     if ',' in author_str:
         return author_str.split(',')[0].strip()
@@ -236,54 +443,109 @@ def extract_first_surname(author_str):
     return parts[0] if parts else ''
 
 
-def match_citation_to_reference(citation, references):
+# Per-reference values the matchers compare against, computed once per document
+# Word sets are stored as int bitmasks over a per-document token table, so subset tests are a single AND
+ReferenceFeatures = namedtuple('ReferenceFeatures', 'full_lower first_surname words_mask norm norm_first norm_words_mask')
+ReferenceIndex = namedtuple('ReferenceIndex', 'by_year by_key_author features author_norms token_ids')
+# One citation's formatting work: its key and data, in-range paragraph numbers, matched reference and status
+CitationJob = namedtuple('CitationJob', 'key data locations ref is_valid')
+
+
+def _assign_word_mask(words, token_ids):
+    """Bitmask of words, allocating a new bit for each word not yet in token_ids."""
+    mask = 0
+    for word in words:
+        mask |= 1 << token_ids.setdefault(word, len(token_ids))
+    return mask
+
+
+def _word_mask(words, token_ids):
+    """Bitmask of words over token_ids, or None if a word is unknown (the set can't be a subset then)."""
+    mask = 0
+    for word in words:
+        bit = token_ids.get(word)
+        if bit is None:
+            return None
+        mask |= 1 << bit
+    return mask
+
+
+def index_references(references):
+    """
+    Precompute everything the matchers need from the bibliography in one pass:
+    reference keys grouped by year and by the author part of their citation key,
+    per-reference comparison features, and the normalized short author used for
+    spelling checks.
+    """
+    by_year = defaultdict(list)
+    by_key_author = defaultdict(list)
+    features = {}
+    author_norms = {}
+    token_ids = {}
+    for ref_key, ref_data in references.items():
+        by_year[ref_data['year']].append(ref_key)
+        by_key_author[normalize_citation_key(ref_data['author'], '0000').split('|')[0]].append(ref_key)
+        
+        ref_full_author = ref_data.get('full_author', ref_data['author'])
+        full_lower = ref_full_author.lower()
+        norm = normalize_text_for_comparison(ref_full_author)
+        features[ref_key] = ReferenceFeatures(
+            full_lower=full_lower,
+            first_surname=extract_first_surname(ref_full_author),
+            words_mask=_assign_word_mask(_WORD_RE.findall(full_lower), token_ids),
+            norm=norm,
+            norm_first=norm.split()[0] if norm else '',
+            norm_words_mask=_assign_word_mask(_WORD_RE.findall(norm), token_ids)
+        )
+        
+        author_norm = normalize_text_for_comparison(ref_data['author'])
+        if author_norm:
+            author_norms[ref_key] = author_norm
+    return ReferenceIndex(by_year, by_key_author, features, author_norms, token_ids)
+
+
+def match_citation_to_reference(citation, references, ref_index=None):
     cite_author = citation['author'].strip()
     cite_year = citation['year']
     cite_author_lower = cite_author.lower()
     
-    for ref_key, ref_data in references.items():
-        ref_year = ref_data['year']
-        ref_full_author = ref_data.get('full_author', ref_data['author'])
-        ref_full_lower = ref_full_author.lower()
-        
-        if cite_year != ref_year:
-            continue
-        
-        cite_first = extract_first_surname(cite_author)
-        ref_first = extract_first_surname(ref_full_author)
+    if ref_index is None:
+        ref_index = index_references(references)
+    
+    cite_first = extract_first_surname(cite_author)
+    cite_words = set(_WORD_RE.findall(cite_author_lower))
+    cite_words -= {'et', 'al', 'and', 'the'}
+    cite_mask = _word_mask(cite_words, ref_index.token_ids) if cite_words else None
+    
+    for ref_key in ref_index.by_year.get(cite_year, []):
+        ref = ref_index.features[ref_key]
         
-        if cite_first and ref_first and cite_first == ref_first:
+        if cite_first and ref.first_surname and cite_first == ref.first_surname:
             return ref_key
         
-        if cite_author_lower in ref_full_lower or ref_full_lower.startswith(cite_author_lower):
+        if cite_author_lower in ref.full_lower or ref.full_lower.startswith(cite_author_lower):
             return ref_key
         
         # Word subset matching for basic cases
-        cite_words = set(re.findall(r'\b[a-z]{2,}\b', cite_author_lower))
-        cite_words -= {'et', 'al', 'and', 'the'}
-        ref_words = set(re.findall(r'\b[a-z]{2,}\b', ref_full_lower))
-        
-        if cite_words and cite_words.issubset(ref_words):
+        if cite_mask is not None and not cite_mask & ~ref.words_mask:
             return ref_key
     
     return None
 
 
-import difflib
-from difflib import SequenceMatcher
-
+@lru_cache(maxsize=4096)
 def normalize_text_for_comparison(text):
-    """Normalize text for flexible matching."""
-    # Replace 'and' with '&'
-    text = re.sub(r'\band\b', '&', text, flags=re.IGNORECASE)
+    """Normalize text for flexible matching (cached: called per citation for every reference)."""
+    # Replace 'and' with '&' (on lowered text, before punctuation removal can shift word boundaries)
+    text = _AND_RE.sub('&', text.lower())
     # Remove dots, commas, extra spaces
-    text = re.sub(r'[.,]', '', text)
-    text = text.strip().lower()
+    text = text.translate(_PUNCT_TABLE).strip()
     # Remove leading 'the'
-    text = re.sub(r'^the\s+', '', text)
+    if text.startswith('the') and text[3:4].isspace():
+        text = text[3:].lstrip()
     return text
 
-def check_smart_match(cite_data, references):
+def check_smart_match(cite_data, references, ref_index=None):
     """
     Advanced matching logic for:
     1. Introduction of abbreviations: "Organization [Org]" -> Match "Organization"
@@ -298,7 +560,7 @@ def check_smart_match(cite_data, references):
     
     # 1. Handle Abbreviation Introduction: "Name [Abbr]"
     # Extract "Name" part
-    prefix_match = re.match(r'^(.*?)\s*\[.*?\]', cite_author)
+    prefix_match = _ABBR_INTRO_RE.match(cite_author)
     citation_prefix_norm = None
     if prefix_match:
         citation_prefix_norm = normalize_text_for_comparison(prefix_match.group(1))
@@ -307,15 +569,20 @@ def check_smart_match(cite_data, references):
     is_etal = 'et al' in cite_norm
     cite_first_surname = cite_norm.split()[0] if cite_norm else ""
     
-    # 3. Handle list of names (e.g. "Smith & Jones")
-    cite_names = [n.strip() for n in re.split(r'[&]', cite_norm)]
+    # 3. Handle list of names (e.g. "Smith & Jones"): only significant words count,
+    # so "and" in the citation must not match "and" in the reference
+
+    cite_words = set(_WORD_RE.findall(cite_norm))
+    cite_words -= {'and', 'the', 'et', 'al'}
     
-    for ref_key, ref_data in references.items():
-        if cite_year and ref_data['year'] != cite_year:
-            continue
-            
-        ref_author = ref_data.get('full_author', ref_data['author'])
-        ref_norm = normalize_text_for_comparison(ref_author)
+    if ref_index is None:
+        ref_index = index_references(references)
+    cite_mask = _word_mask(cite_words, ref_index.token_ids) if len(cite_words) > 1 else None
+    candidate_keys = ref_index.by_year.get(cite_year, []) if cite_year else references.keys()
+    
+    for ref_key in candidate_keys:
+        ref = ref_index.features[ref_key]
+        ref_norm = ref.norm
         
         # A. Direct Normalized Match (covers "Smith and Jones" vs "Smith & Jones")
         if cite_norm == ref_norm:
@@ -330,47 +597,38 @@ def check_smart_match(cite_data, references):
         # Citation: "Smith et al" vs Ref: "Smith, Jones..."
         # Rule: First surnames match
         if is_etal:
-            ref_first_surname = ref_norm.split()[0]
-            if cite_first_surname == ref_first_surname:
+            if cite_first_surname == ref.norm_first:
                 return ref_key
                 
         # D. Word Subset Match (Robust for "Smith, Jones" vs "Smith, A., Jones, B.")
         # Only check if citation has multiple words (potential authors)
-        cite_words = set(re.findall(r'\b[a-z]{2,}\b', cite_norm))
-        # Remove common stopwords from citation side to avoid false positives matching "and" to "and"
-        cite_words -= {'and', 'the', 'et', 'al'}
-        
-        if len(cite_words) > 1:
-            ref_words = set(re.findall(r'\b[a-z]{2,}\b', ref_norm))
+        if cite_mask is not None:
             # Check if All significant citation words are in reference
-            if cite_words.issubset(ref_words):
+            if not cite_mask & ~ref.norm_words_mask:
                 return ref_key
 
     return None
 
-def check_spelling_mismatch(cite_author, references):
+def check_spelling_mismatch(cite_author, references, ref_index=None):
     """
-    Check for spelling mismatches using difflib.
+    Check for spelling mismatches using RapidFuzz.
     Returns reference key if a close match is found.
     """
     cite_author_norm = normalize_text_for_comparison(cite_author)
+    if not cite_author_norm:
+        return None
     
-    best_match = None
-    max_ratio = 0.0
+    if ref_index is None:
+        ref_index = index_references(references)
     
-    for ref_key, ref_data in references.items():
-        ref_author = ref_data['author']
-        ref_norm = normalize_text_for_comparison(ref_author)
-        
-        # simple ratio check
-        ratio = difflib.SequenceMatcher(None, cite_author_norm, ref_norm).ratio()
-        
-        if ratio > 0.8: # >80% similarity
-            if ratio > max_ratio:
-                max_ratio = ratio
-                best_match = ref_key
+    # Best-match loop runs in C++; the cutoff also prunes pairs whose lengths
+    # differ too much to reach 80% before any edit distance is computed.
+    best = process.extractOne(cite_author_norm, ref_index.author_norms, scorer=fuzz.ratio, score_cutoff=80)
+    
+    if best and best[1] > 80: # >80% similarity
+        return best[2]
                 
-    return best_match
+    return None
 
 
 def check_et_al_misuse(cite_data, ref_data):
@@ -405,7 +663,7 @@ def check_et_al_misuse(cite_data, ref_data):
         parts = ref_full_author.split('&')
         # First part has N-1 authors (separated by commas)
         # Last part has 1 author
-        first_part_authors = len([p for p in parts[0].split(',') if p.strip() and not re.match(r'^[A-Z]\.?$', p.strip())])
+        first_part_authors = len([p for p in parts[0].split(',') if p.strip() and not _INITIAL_RE.match(p.strip())])
         author_count = first_part_authors + 1
     else:
         # Single author (has comma for "Last, F.")
@@ -443,11 +701,14 @@ def check_et_al_misuse(cite_data, ref_data):
     
     return None
 
-def get_citation_matches(citations, references, abbreviation_map):
+def get_citation_matches(citations, references, abbreviation_map, ref_index=None):
     """
     Match citations to references using Exact, Abbreviation, and Smart/Fuzzy matching.
     Returns: matched_citations (set), matched_references (set), matched_pairs (dict: cite_key -> ref_key)
     """
+    if ref_index is None:
+        ref_index = index_references(references)
+    
     matched_citations = set()
     matched_references = set()
     matched_pairs = {}
@@ -469,7 +730,7 @@ def get_citation_matches(citations, references, abbreviation_map):
             
         # 3. Smart Match / Fuzzy Match
         else:
-            smart_match_key = check_smart_match(cite_data, references)
+            smart_match_key = check_smart_match(cite_data, references, ref_index)
             if smart_match_key:
                 matched_ref_key = smart_match_key
         
@@ -486,7 +747,6 @@ def check_abbreviation_usage(matched_pairs, citations, references, citation_loca
     Validate proper usage of abbreviations (First vs Subsequent usage).
     """
     abbreviation_errors = []
-    from collections import defaultdict
     ref_usage_map = defaultdict(list)
     
     # 1. Build Usage Map
@@ -570,17 +830,27 @@ def check_abbreviation_usage(matched_pairs, citations, references, citation_loca
     return abbreviation_errors
 
 
-def validate_document(file_path, parser=None):
+def validate_document(file_path=None, parser=None, paragraphs=None):
     if parser is None:
         parser = get_parser('apa')
         
-    paragraphs = extract_text_from_docx(file_path)
+    # Callers that already extracted the paragraphs pass them in to avoid a second docx parse
+    if paragraphs is None:
+        with spool_docx_paragraphs(file_path) as spooled:
+            return validate_document(parser=parser, paragraphs=spooled)
     
-    citations, citation_locations = find_citations_in_text(paragraphs, parser)
-    references, reference_details, abbreviation_map = find_references_in_bibliography(paragraphs, parser)
+    # Locate the bibliography once (a spool found it while being written); citations are only searched for before it
+    sections = getattr(paragraphs, 'sections', None)
+    if sections is None:
+        sections = find_reference_sections(paragraphs)
+    body_end = sections[0][0] - 1 if sections else len(paragraphs)
+    
+    citations, citation_locations = find_citations_in_text(paragraphs, parser, body_end)
+    references, reference_details, abbreviation_map = find_references_in_bibliography(paragraphs, parser, sections)
+    ref_index = index_references(references)
     
     # 1. Match Citations
-    matched_citations, matched_references, matched_pairs = get_citation_matches(citations, references, abbreviation_map)
+    matched_citations, matched_references, matched_pairs = get_citation_matches(citations, references, abbreviation_map, ref_index)
     
     # Validation Results Containers
     missing_refs = []
@@ -613,19 +883,21 @@ def validate_document(file_path, parser=None):
                     'severity': et_al_check.get('severity', 'error')
                 })
         else:
-            # Matches failed, check for Year Mismatch
+            # Matches failed, check for Year Mismatch (same author part, first in bibliography order)
             found_year_match = False
-            for ref_key, ref_data in references.items():
-                if normalize_citation_key(ref_data['author'], '0000').split('|')[0] == normalize_citation_key(cite_author, '0000').split('|')[0]:
-                     year_mismatches.append({
-                        'citation': cite_data['display'],
-                        'cited_year': cite_year,
-                        'ref_year': ref_data['year'],
-                        'ref_key': ref_key,
-                        'locations': citation_locations.get(cite_key, [])
-                    })
-                     found_year_match = True
-                     break
+            cite_key_author = normalize_citation_key(cite_author, '0000').split('|')[0]
+            same_author_keys = ref_index.by_key_author.get(cite_key_author)
+            if same_author_keys:
+                ref_key = same_author_keys[0]
+                ref_data = references[ref_key]
+                year_mismatches.append({
+                    'citation': cite_data['display'],
+                    'cited_year': cite_year,
+                    'ref_year': ref_data['year'],
+                    'ref_key': ref_key,
+                    'locations': citation_locations.get(cite_key, [])
+                })
+                found_year_match = True
             
             if found_year_match:
                 if cite_data['warnings']:
@@ -637,7 +909,7 @@ def validate_document(file_path, parser=None):
                 continue
             
             # Check for Spelling Mismatch
-            potential_match_key = check_spelling_mismatch(cite_author, references)
+            potential_match_key = check_spelling_mismatch(cite_author, references, ref_index)
             if potential_match_key:
                 spelling_mismatches.append({
                     'citation': cite_data['display'],
@@ -712,6 +984,15 @@ def validate_document(file_path, parser=None):
         'reference_details': reference_details
     }
 
+def _file_digest(file_path):
+    """BLAKE2b digest of the file contents, used as the validation cache key."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def validate_document_multi_style(file_path, citation_style=None):
     """
     Validate document with support for multiple citation styles.
@@ -724,26 +1005,35 @@ def validate_document_multi_style(file_path, citation_style=None):
     Returns:
         Dict with validation results including detected style
     """
-    paragraphs = extract_text_from_docx(file_path)
-    
-    # Auto-detect style if not specified
-    if citation_style is None:
-        sample_text = ' '.join(paragraphs[:50])  # Use first 50 paragraphs
-        citation_style = auto_detect_style(sample_text)
-        logger.info(f"Auto-detected citation style: {citation_style}")
-    
-    # Get appropriate parser
-    try:
-        parser = get_parser(citation_style)
-        logger.info(f"Using {citation_style.upper()} parser")
-    except ValueError as e:
-        # Fall back to APA if style not supported
-        logger.warning(f"Unsupported style '{citation_style}', falling back to APA: {e}")
-        parser = get_parser('apa')
-        citation_style = 'apa'
-    
-    # Use the detected parser with validation logic
-    results = validate_document(file_path, parser=parser)
+    # Re-uploads of an unchanged document are served from the cache
+    cache_key = (_file_digest(file_path), citation_style)
+    with _validation_cache_lock:
+        cached = _validation_cache.get(cache_key)
+        if cached is not None:
+            _validation_cache.move_to_end(cache_key)
+    if cached is not None:
+        logger.info(f"Using cached validation results for {os.path.basename(file_path)}")
+        return copy.deepcopy(cached)
+    
+    with spool_docx_paragraphs(file_path) as paragraphs:
+        # Auto-detect style if not specified
+        if citation_style is None:
+            sample_text = ' '.join(paragraphs[:50])  # Use first 50 paragraphs
+            citation_style = auto_detect_style(sample_text)
+            logger.info(f"Auto-detected citation style: {citation_style}")
+        
+        # Get appropriate parser
+        try:
+            parser = get_parser(citation_style)
+            logger.info(f"Using {citation_style.upper()} parser")
+        except ValueError as e:
+            # Fall back to APA if style not supported
+            logger.warning(f"Unsupported style '{citation_style}', falling back to APA: {e}")
+            parser = get_parser('apa')
+            citation_style = 'apa'
+        
+        # Use the detected parser with validation logic
+        results = validate_document(parser=parser, paragraphs=paragraphs)
     
     # Add detected style to results
     results['citation_style'] = citation_style.upper()
@@ -753,10 +1043,28 @@ def validate_document_multi_style(file_path, citation_style=None):
         'chicago': 'Chicago (Author-Year)'
     }.get(citation_style, citation_style.upper())
     
+    with _validation_cache_lock:
+        _validation_cache[cache_key] = copy.deepcopy(results)
+        while len(_validation_cache) > VALIDATION_CACHE_SIZE:
+            _validation_cache.popitem(last=False)
+    
     return results
 
 
-def generate_report(results, filename):
+_DASH_RULE = "-" * 60
+_EQUALS_RULE = "=" * 60
+
+
+def _format_locations(locations):
+    return ', '.join(map(str, locations))
+
+
+def generate_report(results, filename, out=None):
+    """
+    Render the validation report for results. With out (a text file-like object)
+    the report is written to it line by line and None is returned; otherwise the
+    report text is returned.
+    """
     # Calculate Total Comments/Issues for Status Line
     total_issues = (
         len(results['missing_references']) + 
@@ -773,19 +1081,35 @@ def generate_report(results, filename):
     if "VANCOUVER" in results.get('citation_style', '').upper():
          style_label = "Numerical"
 
-    report_lines = []
+    own_buffer = out is None
+    if own_buffer:
+        out = io.StringIO()
+    write = out.write
+    
+    def add(line=""):
+        write(line)
+        write("\n")
+    
+    def section(title):
+        write("\n")
+        write(_DASH_RULE)
+        write("\n")
+        write(title)
+        write("\n")
+        write(_DASH_RULE)
+        write("\n")
     
     # Status Header
-    report_lines.append(f"STATUS: {style_label}: {total_issues} comments")
-    report_lines.append("")
+    add(f"STATUS: {style_label}: {total_issues} comments")
+    add("")
     
     # Main Title
-    report_lines.append("=" * 60)
-    report_lines.append("NAME AND YEAR VALIDATION REPORT")
-    report_lines.append("=" * 60)
+    add(_EQUALS_RULE)
+    add("NAME AND YEAR VALIDATION REPORT")
+    add(_EQUALS_RULE)
     
     # Previous report content follows...
-    # report_lines.append("=" * 60) # User removed this dup line in example, but kept CITATION VALIDATION REPORT below?
+    # add("=" * 60) # User removed this dup line in example, but kept CITATION VALIDATION REPORT below?
     # Actually the user example has:
     # STATUS...
     # ===
@@ -796,124 +1120,233 @@ def generate_report(results, filename):
     
     # I will replicate this structure exactly to be safe.
     
-    report_lines.append("=" * 60)
-    report_lines.append("CITATION VALIDATION REPORT")
-    report_lines.append("=" * 60)
-    report_lines.append(f"\nDocument: {filename}")
-    report_lines.append(f"Style: {results.get('citation_style_name', 'APA')}")
-    report_lines.append("-" * 60)
-    
-    report_lines.append("\nSUMMARY:")
-    report_lines.append(f"  Total in-text citations found: {results['total_citations']}")
-    report_lines.append(f"  Total references in bibliography: {results['total_references']}")
-    report_lines.append(f"  Valid (matched) citations: {results['valid_count']}")
-    report_lines.append(f"  Missing references: {len(results['missing_references'])}")
-    report_lines.append(f"  Unused references: {len(results['unused_references'])}")
-    report_lines.append(f"  Format Errors: {len(results.get('format_errors', []))}")
-    report_lines.append(f"  Year Mismatches: {len(results.get('year_mismatches', []))}")
-    report_lines.append(f"  Spelling Mismatches: {len(results.get('spelling_mismatches', []))}")
-    report_lines.append(f"  Spelling Mismatches: {len(results.get('spelling_mismatches', []))}")
-    report_lines.append(f"  Et Al. Errors: {len(results.get('et_al_errors', []))}")
-    report_lines.append(f"  Abbreviation Errors: {len(results.get('abbreviation_errors', []))}")
+    add(_EQUALS_RULE)
+    add("CITATION VALIDATION REPORT")
+    add(_EQUALS_RULE)
+    add(f"\nDocument: {filename}")
+    add(f"Style: {results.get('citation_style_name', 'APA')}")
+    add(_DASH_RULE)
+    
+    add("\nSUMMARY:")
+    add(f"  Total in-text citations found: {results['total_citations']}")
+    add(f"  Total references in bibliography: {results['total_references']}")
+    add(f"  Valid (matched) citations: {results['valid_count']}")
+    add(f"  Missing references: {len(results['missing_references'])}")
+    add(f"  Unused references: {len(results['unused_references'])}")
+    add(f"  Format Errors: {len(results.get('format_errors', []))}")
+    add(f"  Year Mismatches: {len(results.get('year_mismatches', []))}")
+    add(f"  Spelling Mismatches: {len(results.get('spelling_mismatches', []))}")
+    add(f"  Et Al. Errors: {len(results.get('et_al_errors', []))}")
+    add(f"  Abbreviation Errors: {len(results.get('abbreviation_errors', []))}")
     
     if results['missing_references']:
-        report_lines.append("\n" + "-" * 60)
-        report_lines.append("MISSING REFERENCES (cited but not in bibliography):")
-        report_lines.append("-" * 60)
+        section("MISSING REFERENCES (cited but not in bibliography):")
         for item in results['missing_references']:
-            report_lines.append(f"\n  {item['reference']}")
-            report_lines.append(f"    Cited in paragraph(s): {', '.join(map(str, item['cited_at_paragraphs']))}")
+            add(f"\n  {item['reference']}")
+            add(f"    Cited in paragraph(s): {_format_locations(item['cited_at_paragraphs'])}")
     
     if results.get('year_mismatches'):
-        report_lines.append("\n" + "-" * 60)
-        report_lines.append("YEAR MISMATCHES (Author matches but year differs):")
-        report_lines.append("-" * 60)
+        section("YEAR MISMATCHES (Author matches but year differs):")
         for item in results['year_mismatches']:
-            report_lines.append(f"\n  Citation: {item['citation']}")
-            report_lines.append(f"  Reference Year: {item['ref_year']}")
-            report_lines.append(f"  Cited in paragraph(s): {', '.join(map(str, item['locations']))}")
+            add(f"\n  Citation: {item['citation']}")
+            add(f"  Reference Year: {item['ref_year']}")
+            add(f"  Cited in paragraph(s): {_format_locations(item['locations'])}")
 
     if results.get('spelling_mismatches'):
-        report_lines.append("\n" + "-" * 60)
-        report_lines.append("SPELLING MISMATCHES (Author spelling differs):")
-        report_lines.append("-" * 60)
+        section("SPELLING MISMATCHES (Author spelling differs):")
         for item in results['spelling_mismatches']:
-            report_lines.append(f"\n  Citation: {item['citation']}")
-            report_lines.append(f"  Cited Author: {item['cited_author']}")
-            report_lines.append(f"  Ref Author: {item['ref_author']}")
-            report_lines.append(f"  Cited in paragraph(s): {', '.join(map(str, item['locations']))}")
+            add(f"\n  Citation: {item['citation']}")
+            add(f"  Cited Author: {item['cited_author']}")
+            add(f"  Ref Author: {item['ref_author']}")
+            add(f"  Cited in paragraph(s): {_format_locations(item['locations'])}")
 
     if results.get('et_al_errors'):
-        report_lines.append("\n" + "-" * 60)
-        report_lines.append("ET AL. ERRORS (Incorrect use of 'et al.'):") 
-        report_lines.append("-" * 60)
+        section("ET AL. ERRORS (Incorrect use of 'et al.'):")
         for item in results['et_al_errors']:
-            report_lines.append(f"\n  Citation: {item['citation']}")
-            report_lines.append(f"  Issue: {item['message']}")
-            report_lines.append(f"  Correct Form: {item['correct_form']}")
-            report_lines.append(f"  Cited in paragraph(s): {', '.join(map(str, item['locations']))}")
+            add(f"\n  Citation: {item['citation']}")
+            add(f"  Issue: {item['message']}")
+            add(f"  Correct Form: {item['correct_form']}")
+            add(f"  Cited in paragraph(s): {_format_locations(item['locations'])}")
 
     if results.get('abbreviation_errors'):
-        report_lines.append("\n" + "-" * 60)
-        report_lines.append("ABBREVIATION ERRORS (First vs Subsequent Usage):") 
-        report_lines.append("-" * 60)
+        section("ABBREVIATION ERRORS (First vs Subsequent Usage):")
         for item in results['abbreviation_errors']:
-            report_lines.append(f"\n  Citation: {item['citation']}")
-            report_lines.append(f"  Issue: {item['message']}")
-            report_lines.append(f"  Cited in paragraph(s): {', '.join(map(str, item['locations']))}")
+            add(f"\n  Citation: {item['citation']}")
+            add(f"  Issue: {item['message']}")
+            add(f"  Cited in paragraph(s): {_format_locations(item['locations'])}")
 
     if results.get('duplicates'):
-        report_lines.append("\n" + "-" * 60)
-        report_lines.append("DUPLICATE REFERENCES:")
-        report_lines.append("-" * 60)
+        section("DUPLICATE REFERENCES:")
         for d in results['duplicates']:
-            report_lines.append(f"\n  Original ID: {d['duplicate_of']}")
-            report_lines.append(f"  Duplicate ID: {d['id']}")
-            report_lines.append(f"  Text: {d['text']}")
-            report_lines.append(f"  Similarity Score: {d['score']}%")
+            add(f"\n  Original ID: {d['duplicate_of']}")
+            add(f"  Duplicate ID: {d['id']}")
+            add(f"  Text: {d['text']}")
+            add(f"  Similarity Score: {d['score']}%")
             
     if results.get('format_errors'):
-        report_lines.append("\n" + "-" * 60)
-        report_lines.append("FORMAT ERRORS (APA Style Violations):")
-        report_lines.append("-" * 60)
+        section("FORMAT ERRORS (APA Style Violations):")
         for item in results['format_errors']:
-            report_lines.append(f"\n  Citation: {item['citation']}")
+            add(f"\n  Citation: {item['citation']}")
             for w in item['warnings']:
-                report_lines.append(f"    - {w}")
-            report_lines.append(f"    Cited in paragraph(s): {', '.join(map(str, item['locations']))}")
+                add(f"    - {w}")
+            add(f"    Cited in paragraph(s): {_format_locations(item['locations'])}")
     
     if results['unused_references']:
-        report_lines.append("\n" + "-" * 60)
-        report_lines.append("UNUSED REFERENCES (in bibliography but never cited):")
-        report_lines.append("-" * 60)
+        section("UNUSED REFERENCES (in bibliography but never cited):")
         for item in results['unused_references']:
-            report_lines.append(f"\\n  {item['reference']}")
-            report_lines.append(f"    Line: {item['line']}")
-            report_lines.append(f"    Text: {item['text']}")
+            add(f"\n  {item['reference']}")
+            add(f"    Line: {item['line']}")
+            add(f"    Text: {item['text']}")
     
     if results['valid_citations']:
-        report_lines.append("\\n" + "-" * 60)
-        report_lines.append("VALID CITATIONS:")
-        report_lines.append("-" * 60)
+        section("VALID CITATIONS:")
         for ref in results['valid_citations']:
-            report_lines.append(f"  {ref}")
+            add(f"  {ref}")
+    
+    add("\n" + _EQUALS_RULE)
+    add("END OF REPORT")
+    add(_EQUALS_RULE)
     
-    report_lines.append("\\n" + "=" * 60)
-    report_lines.append("END OF REPORT")
-    report_lines.append("=" * 60)
+    if own_buffer:
+        # Drop the newline after the last line, as the joined list used to
+        return out.getvalue()[:-1]
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _cite_patterns(author_part, year_part):
+    """Compiled (parenthetical, narrative) patterns locating an author/year citation in paragraph text."""
+    # Escape special chars in author but allow for some flexibility in spacing
+    author_regex = re.escape(author_part).replace(r'\ ', r'\s+')
+    year_regex = re.escape(year_part)
+    return (
+        # 1. Parenthetical Pattern: (Author... Year...)
+        re.compile(r'\([^)]*?' + author_regex + r'.*?' + year_regex + r'.*?\)', re.IGNORECASE),
+        # 2. Narrative Pattern: Author... (Year...)
+        re.compile(author_regex + r'.*?\([^)]*?' + year_regex + r'.*?\)', re.IGNORECASE),
+    )
+
+
+def find_citation_span(text, citation_text, fuzzy_threshold=None):
+    """
+    Locate citation_text in text and return its (start, end) offsets, or None.
+    Tries an exact match, then a case-insensitive one. If fuzzy_threshold (0.0-1.0)
+    is given, finally falls back to the best-aligned substring scored by RapidFuzz.
+    """
+    start_pos = text.find(citation_text)
+    if start_pos != -1:
+        return start_pos, start_pos + len(citation_text)
+    
+    text_lower = text.lower()
+    cite_lower = citation_text.lower()
+    start_pos = text_lower.find(cite_lower)
+    if start_pos != -1:
+        return start_pos, start_pos + len(citation_text)
+    
+    if fuzzy_threshold is None:
+        return None
+    alignment = fuzz.partial_ratio_alignment(cite_lower, text_lower, score_cutoff=fuzzy_threshold * 100)
+    if alignment is None or alignment.dest_start == alignment.dest_end:
+        return None
+    return alignment.dest_start, alignment.dest_end
+
+
+def _build_run_map(paragraph):
+    """
+    Concatenated run text of a paragraph plus the offsets of each run in it.
+    Returns (full_text, run_map) where run_map is a list of (start_index, end_index, run_object).
+    """
+    parts = []
+    run_map = []
+    
+    current_idx = 0
+    for run in paragraph.runs:
+        # run.text walks the run's XML children, so read it only once
+        text = run.text
+        text_len = len(text)
+        run_map.append((current_idx, current_idx + text_len, run))
+        parts.append(text)
+        current_idx += text_len
     
-    return "\n".join(report_lines)
+    return "".join(parts), run_map
+
+
+class ParagraphIndex:
+    """
+    The paragraphs of an open Document, listed once, with each paragraph's
+    run map built on first use and shared by the comment and formatting passes.
+    Paragraph numbers are 1-based, as in citation_locations.
+    """
+
+    def __init__(self, doc):
+        self.paragraphs = doc.paragraphs
+        self._run_maps = {}
+        self._texts = {}
+
+    def __len__(self):
+        return len(self.paragraphs)
+
+    def paragraph(self, para_num):
+        return self.paragraphs[para_num - 1]
 
+    def run_map(self, para_num):
+        text_map = self._run_maps.get(para_num)
+        if text_map is None:
+            text_map = self._run_maps[para_num] = _build_run_map(self.paragraphs[para_num - 1])
+        return text_map
 
-def find_citation_in_runs(paragraph, citation_text, fuzzy_threshold=0.75):
+    def text(self, para_num):
+        """Paragraph.text, which python-docx rebuilds from the XML on every access, computed once."""
+        text = self._texts.get(para_num)
+        if text is None:
+            text = self._texts[para_num] = self.paragraphs[para_num - 1].text
+        return text
+
+    def invalidate(self, para_num, text_changed=False):
+        """Drop a cached run map after the paragraph's runs were edited (and its text, if that changed too)."""
+        self._run_maps.pop(para_num, None)
+        if text_changed:
+            self._texts.pop(para_num, None)
+
+
+def build_citation_automaton(citations):
+    """
+    Aho-Corasick automaton over the cleaned raw/display text of every citation, so a
+    paragraph can be swept once for all of them. None when pyahocorasick is not installed.
+    """
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for cite_data in citations.values():
+        for candidate in (cite_data.get('raw'), cite_data.get('display')):
+            clean_candidate = candidate.strip('.,; ') if candidate else ''
+            if clean_candidate:
+                automaton.add_word(clean_candidate, clean_candidate)
+    if not len(automaton):
+        return None
+    automaton.make_automaton()
+    return automaton
+
+
+def sweep_citations(automaton, text):
+    """Offset of the first exact occurrence in text of each automaton word found there."""
+    first_seen = {}
+    # Matches come out ordered by end offset, so the first hit per word is its earliest
+    for end_idx, word in automaton.iter(text):
+        if word not in first_seen:
+            first_seen[word] = end_idx - len(word) + 1
+    return first_seen
+
+
+def find_citation_in_runs(text_map, citation_text, fuzzy_threshold=None):
     """
     Find the specific run(s) containing a citation text in a paragraph.
     Uses robust index mapping to handle citations split across multiple runs.
     
     Args:
-        paragraph: python-docx Paragraph object
+        text_map: (full_text, run_map) of the paragraph, as built by _build_run_map
         citation_text: Citation text to find (e.g., "(Smith, 2020)")
-        fuzzy_threshold: Minimum similarity ratio for fuzzy matching (0.0-1.0) - Unused in strict index mode but kept for signature
+        fuzzy_threshold: Optional minimum similarity ratio (0.0-1.0); enables the fuzzy fallback of find_citation_span
         
     Returns:
         List of Run objects containing the citation.
@@ -921,181 +1354,164 @@ def find_citation_in_runs(paragraph, citation_text, fuzzy_threshold=0.75):
     if not citation_text:
         return []
 
-    # 1. Build full text and map run indices
-    full_text = ""
-    run_map = [] # List of (start_index, end_index, run_object)
+    full_text, run_map = text_map
     
-    current_idx = 0
-    for run in paragraph.runs:
-        text_len = len(run.text)
-        run_map.append((current_idx, current_idx + text_len, run))
-        full_text += run.text
-        current_idx += text_len
-        
-    # 2. Find citation in full text
-    # Normalize for loose matching (ignore case/whitespace diffs if exact fails)
-    
-    # Try Exact Match first
-    start_pos = full_text.find(citation_text)
-    
-    if start_pos == -1:
-        # Try Case Insensitive
-        start_pos = full_text.lower().find(citation_text.lower())
-        
-    if start_pos == -1:
-        # Try normalizing whitespace (collapse spaces)
-        # This is harder to map back to indices directly if we change length.
-        # But commonly the issue is just simple splits.
-        # Let's try aggressive "remove all spaces" match as a fallback?
-        # No, that breaks index mapping.
-        # Let's rely on the calling function to provide varying candidates (regex output).
+    # Find citation in full text (exact, case-insensitive, then optionally fuzzy)
+    span = find_citation_span(full_text, citation_text, fuzzy_threshold)
+    if span is None:
         return []
-        
-    end_pos = start_pos + len(citation_text)
-    
-    # 3. Collect Runs Overlapping with [start_pos, end_pos]
-    matched_runs = []
-    
-    for r_start, r_end, run_obj in run_map:
-        # Check for overlap
-        # Overlap if run starts before match ends AND run ends after match starts
-        if r_start < end_pos and r_end > start_pos:
-            matched_runs.append(run_obj)
-            
-    return matched_runs
+    return _runs_in_span(run_map, *span)
+
 
+def _run_span_range(run_map, start_pos, end_pos):
+    """Index range [first, stop) of the run map entries overlapping the text offsets [start_pos, end_pos)."""
+    # Runs are in text order: jump past those ending before the match, stop at the first starting after it
+    first = bisect.bisect_right(run_map, start_pos, key=itemgetter(1))
+    stop = first
+    while stop < len(run_map) and run_map[stop][0] < end_pos:
+        stop += 1
+    return first, stop
 
-def insert_comments_in_document(file_path, results, citation_locations, reference_details):
+
+def _runs_in_span(run_map, start_pos, end_pos):
+    """Runs of a run map overlapping the text offsets [start_pos, end_pos)."""
+    first, stop = _run_span_range(run_map, start_pos, end_pos)
+    return [entry[2] for entry in run_map[first:stop]]
+
+
+def insert_comments_in_document(file_path, results, citation_locations, reference_details, doc=None, para_index=None):
     """
     Insert Word comments for missing references, unused references, and mismatches.
+    Pass an already open doc (and optionally its ParagraphIndex) to annotate it
+    in place instead of re-reading file_path.
     """
-    doc = Document(file_path)
+    if doc is None:
+        doc = Document(file_path)
+    if para_index is None:
+        para_index = ParagraphIndex(doc)
     comment_count = 0
     
-    # 1. Missing References
-    for item in results['missing_references']:
-        citation_text = item['reference']
-        # The parser might return display format, which might not match exact text in doc if we normalized it.
-        # But we stored 'raw' in parser if we used it, but here we iterate existing list.
-        # We need to rely on citation_locations which links Key -> Paragraph Index.
-        # We'll need a way to link 'item' back to key or rely on display text searching.
+    # helper to locate a citation's runs with improved matching
+    def locate_citation_runs(cite_text, para_num):
+        para = para_index.paragraph(para_num)
+        text_map = para_index.run_map(para_num)
+        ptext = para_index.text(para_num)
         
-        # Simpler approach: Iterate citation_locations
-        pass # Logic handled below generically
-    
-    # helper to add comment with improved matching
-    def add_comment_to_citation(cite_text, paragraphs, message):
-        count = 0
-        for para_num in paragraphs:
-            if para_num <= len(doc.paragraphs):
-                para = doc.paragraphs[para_num - 1]
-                
-                # Try 1: Exact index match with citation text
-                runs = find_citation_in_runs(para, cite_text, fuzzy_threshold=0.75)
-                
-                # Try 2: Regex Based Candidates (Robust Fallback)
-                if not runs:
-                    import re
-                    # Extract year
-                    year_match = re.search(r'(\b\d{4}[a-z]?\b|n\.d\.|in press)', cite_text, re.IGNORECASE)
-                    year_part = year_match.group(1) if year_match else None
-                    
-                    # Extract author (everything before year or parens often works)
-                    author_part = None
-                    if '(' in cite_text:
-                        author_part = cite_text.split('(')[0].strip()
-                        if not author_part: # Leading paren case: (Author, Year)
-                            # Remove leading paren and extract until comma/year
-                            cleaned = cite_text.replace('(', '').replace(')', '')
-                            if year_part:
-                                author_part = cleaned.split(year_part)[0].strip(' ,.')
-                            else:
-                                author_part = cleaned
-                    else:
-                        if year_part:
-                            author_part = cite_text.split(year_part)[0].strip(' ,(')
-                        else:
-                            author_part = cite_text.strip()
-                            
-                    if author_part and year_part:
-                        # Escape special chars
-                        author_regex = re.escape(author_part).replace(r'\ ', r'\s+')
-                        regexes = []
-                        # 1. Parenthetical Pattern: (Author... Year...)
-                        regexes.append(re.compile(r'\([^)]*?' + author_regex + r'.*?' + re.escape(year_part) + r'.*?\)', re.IGNORECASE))
-                        # 2. Narrative Pattern: Author... (Year...)
-                        regexes.append(re.compile(author_regex + r'.*?\([^)]*?' + re.escape(year_part) + r'.*?\)', re.IGNORECASE))
-                        
-                        candidates = []
-                        for pattern in regexes:
-                            candidates.extend(pattern.findall(para.text))
-                            
-                        for cand in candidates:
-                            runs = find_citation_in_runs(para, cand)
-                            if runs: break
-
-                # Fallback 3: Just Author if all else fails
-                if not runs and author_part and len(author_part) > 2 and "Unknown" not in author_part:
-                     runs = find_citation_in_runs(para, author_part)
-                     
-                # Fallback 4: Just Year
-                if not runs and year_part:
-                     if year_part in para.text:
-                         # Anchor to first run or try to find year specifically?
-                         # Finding year in runs using find_citation_in_runs
-                         runs = find_citation_in_runs(para, year_part)
-
-                # Fallback 5: Unknown/Fail -> First run
-                if not runs and "Unknown" in cite_text and para.runs:
-                     runs = [para.runs[0]]
-                
-                if runs:
-                    try:
-                        doc.add_comment(
-                            runs=runs,
-                            text=message,
-                            author="Citation Checker",
-                            initials="CC"
-                        )
-                        count += 1
-                        logger.debug(f"Successfully added comment to paragraph {para_num}")
-                    except Exception as e:
-                        logger.warning(f"Failed to add comment for '{cite_text}' at paragraph {para_num}: {e}")
+        # Try 1: Exact index match with citation text
+        runs = find_citation_in_runs(text_map, cite_text)
+        if runs:
+            return runs
+        
+        # Extract year
+        year_match = _CITE_YEAR_RE.search(cite_text)
+        year_part = year_match.group(1) if year_match else None
+        
+        # Extract author (everything before year or parens often works)
+        author_part = None
+        if '(' in cite_text:
+            author_part = cite_text.split('(')[0].strip()
+            if not author_part: # Leading paren case: (Author, Year)
+                # Remove leading paren and extract until comma/year
+                cleaned = cite_text.replace('(', '').replace(')', '')
+                if year_part:
+                    author_part = cleaned.split(year_part)[0].strip(' ,.')
                 else:
-                    logger.warning(f"Could not locate citation '{cite_text}' in paragraph {para_num}")
+                    author_part = cleaned
+        else:
+            if year_part:
+                author_part = cite_text.split(year_part)[0].strip(' ,(')
+            else:
+                author_part = cite_text.strip()
+        
+        # Decide up front which layers can possibly help; placeholder authors never anchor anything
+        has_good_author = bool(author_part) and len(author_part) > 2 and "Unknown" not in author_part
+        
+        if has_good_author or year_part:
+            # Try 2: Regex Based Candidates (Robust Fallback), stopping at the first that maps to runs
+            if author_part and year_part and "Unknown" not in author_part:
+                for pattern in _cite_patterns(author_part, year_part):
+                    for match in pattern.finditer(ptext):
+                        runs = find_citation_in_runs(text_map, match.group(0))
+                        if runs:
+                            return runs
+
+            # Try 3: Fuzzy alignment of the citation text (typos, odd spacing)
+            runs = find_citation_in_runs(text_map, cite_text, fuzzy_threshold=0.75)
+
+            # Fallback 3: Just Author if all else fails
+            if not runs and has_good_author:
+                 runs = find_citation_in_runs(text_map, author_part)
+                 
+            # Fallback 4: Just Year
+            if not runs and year_part:
+                 if year_part in ptext:
+                     # Anchor to first run or try to find year specifically?
+                     # Finding year in runs using find_citation_in_runs
+                     runs = find_citation_in_runs(text_map, year_part)
+
+        # Fallback 5: Unknown/Fail -> First run
+        if not runs and "Unknown" in cite_text and para.runs:
+             runs = [para.runs[0]]
         
-        return count
+        return runs
 
-    # Add comments for Missing References
+    # Gather every issue into one worklist keyed by (paragraph, citation text), so each
+    # citation occurrence is located once and gets a single comment listing all its issues
+    work = {}
+    
+    def add_work(cite_text, paragraphs, message):
+        for para_num in paragraphs:
+            if para_num <= len(para_index):
+                # Ordered set: a citation repeated in one paragraph still gets each message once
+                work.setdefault((para_num, cite_text), {})[message] = None
+
+    # Missing References
     for item in results['missing_references']:
         msg = f"⚠️ MISSING REFERENCE: '{item['reference']}' is not in the bibliography."
-        comment_count += add_comment_to_citation(item['reference'], item['cited_at_paragraphs'], msg)
+        add_work(item['reference'], item['cited_at_paragraphs'], msg)
 
-    # Add comments for Year Mismatches
+    # Year Mismatches
     for item in results.get('year_mismatches', []):
         msg = f"📅 YEAR MISMATCH: You cited '{item['cited_year']}' but bibliography has '{item['ref_year']}'."
-        comment_count += add_comment_to_citation(item['citation'], item['locations'], msg)
+        add_work(item['citation'], item['locations'], msg)
 
-    # Add comments for Spelling Mismatches
+    # Spelling Mismatches
     for item in results.get('spelling_mismatches', []):
         msg = f"🔤 SPELLING MISMATCH: Cited as '{item['cited_author']}' but bibliography has '{item['ref_author']}'."
-        comment_count += add_comment_to_citation(item['citation'], item['locations'], msg)
+        add_work(item['citation'], item['locations'], msg)
 
-    # Add comments for Format Errors
+    # Format Errors
     for item in results.get('format_errors', []):
-        warnings_str = "\\n".join(item['warnings'])
+        warnings_str = "\n".join(item['warnings'])
         msg = f"📝 FORMAT ERROR: {warnings_str}"
-        comment_count += add_comment_to_citation(item['citation'], item['locations'], msg)
+        add_work(item['citation'], item['locations'], msg)
     
-    # Add comments for Et Al. Errors
+    # Et Al. Errors
     for item in results.get('et_al_errors', []):
         msg = f"✏️ ET AL. ERROR: {item['message']}"
-        comment_count += add_comment_to_citation(item['citation'], item['locations'], msg)
+        add_work(item['citation'], item['locations'], msg)
     
-    # Add comments for Abbreviation Errors (NEW)
+    # Abbreviation Errors
     for item in results.get('abbreviation_errors', []):
         msg = f"🔤 ABBREVIATION ERROR: {item['message']}"
-        comment_count += add_comment_to_citation(item['citation'], item['locations'], msg)
+        add_work(item['citation'], item['locations'], msg)
+
+    for (para_num, cite_text), messages in work.items():
+        runs = locate_citation_runs(cite_text, para_num)
+        if runs:
+            try:
+                doc.add_comment(
+                    runs=runs,
+                    text="\n".join(messages),
+                    author="Citation Checker",
+                    initials="CC"
+                )
+                comment_count += 1
+                logger.debug(f"Successfully added comment to paragraph {para_num}")
+            except Exception as e:
+                logger.warning(f"Failed to add comment for '{cite_text}' at paragraph {para_num}: {e}")
+        else:
+            logger.warning(f"Could not locate citation '{cite_text}' in paragraph {para_num}")
 
     # Add comments for Unused References
     for item in results['unused_references']:
@@ -1104,8 +1520,8 @@ def insert_comments_in_document(file_path, results, citation_locations, referenc
         # We need to find the reference in the bibliography section again?
         # or use reference_details which has line number.
         line_num = item['line']
-        if line_num != 'Unknown' and line_num <= len(doc.paragraphs):
-             para = doc.paragraphs[line_num - 1]
+        if line_num != 'Unknown' and line_num <= len(para_index):
+             para = para_index.paragraph(line_num)
              if para.runs:
                 try:
                     runs_to_comment = para.runs[:min(3, len(para.runs))]
@@ -1122,21 +1538,24 @@ def insert_comments_in_document(file_path, results, citation_locations, referenc
     return doc, comment_count
 
 
-def apply_citation_formatting(file_path, results):
+def apply_citation_formatting(file_path, results, doc=None, para_index=None):
     """
     Format ALL citations in the document:
     1. Shorten multi-author citations (3+ authors) to 'et al.' if not already (for valid matches).
     2. Apply 'cite_bib' character style.
     3. Highlight in Green (Valid/Matched) or Yellow (Unmatched/Mismatch).
-    """
-    from docx.shared import RGBColor
-    from docx.enum.text import WD_COLOR_INDEX
     
-    doc = Document(file_path)
+    The document is read from and saved back to file_path, unless an already open
+    doc is passed in; that one is formatted in place and left for the caller to save.
+    """
+    save_to_file = doc is None
+    if save_to_file:
+        doc = Document(file_path)
+    if para_index is None:
+        para_index = ParagraphIndex(doc)
     count = 0
     
     # Ensure style exists
-    from docx.enum.style import WD_STYLE_TYPE
     styles = doc.styles
     try:
         styles['cite_bib']
@@ -1152,16 +1571,35 @@ def apply_citation_formatting(file_path, results):
     references = results['references']
     citation_locations = results['citation_locations']
     matched_keys = set(results.get('matched_citation_keys', []))
+    ref_index = index_references(references)
     
-    # Iterate through ALL detected citations
-    # We sort by location availability to group work? No, just iterate dict.
-    # But same citation key might have multiple locations.
+    # One Aho-Corasick sweep per paragraph finds every raw/display candidate at once
+    automaton = build_citation_automaton(citations)
+    sweeps = {}
     
+    # One pre-pass gathers everything a citation needs (locations, status, resolved
+    # reference) so the paragraph loop below does no further dict lookups or matching
+    n_paragraphs = len(para_index)
+    jobs = []
     for cite_key, cite_data in citations.items():
-        location_indices = citation_locations.get(cite_key, [])
-        
-        # Determine Status
+        locations = [p for p in citation_locations.get(cite_key, []) if p <= n_paragraphs]
         is_valid = cite_key in matched_keys
+        target_ref_data = None
+        if is_valid:
+            if cite_key in references:
+                target_ref_data = references[cite_key]
+            else:
+                match_found = match_citation_to_reference(cite_data, references, ref_index) or check_smart_match(cite_data, references, ref_index)
+                if match_found:
+                    target_ref_data = references[match_found]
+        jobs.append(CitationJob(cite_key, cite_data, locations, target_ref_data, is_valid))
+    
+    # Iterate through ALL detected citations
+    # But same citation key might have multiple locations.
+    
+    for job in jobs:
+        cite_data = job.data
+        is_valid = job.is_valid
         
         # Determine Color
         highlight_color = WD_COLOR_INDEX.BRIGHT_GREEN if is_valid else WD_COLOR_INDEX.YELLOW
@@ -1172,15 +1610,7 @@ def apply_citation_formatting(file_path, results):
         first_author_surname = ""
         
         if is_valid:
-            target_ref_data = None
-            if cite_key in references:
-                target_ref_data = references[cite_key]
-            else:
-                match_found = match_citation_to_reference(cite_data, references)
-                if not match_found:
-                     match_found = check_smart_match(cite_data, references)
-                if match_found:
-                    target_ref_data = references[match_found]
+            target_ref_data = job.ref
             
             # Shortening disabled as per user request to preserve original text
             # if target_ref_data:
@@ -1196,9 +1626,8 @@ def apply_citation_formatting(file_path, results):
             #          full_shortened_str = f"{first_author_surname} et al. ({cite_data['year']})"
 
         # Apply to Document Paragraphs
-        for para_idx in location_indices:
-             if para_idx > len(doc.paragraphs): continue
-             para = doc.paragraphs[para_idx - 1]
+        for para_idx in job.locations:
+             para = para_index.paragraph(para_idx)
              
              citation_display = cite_data['display']
              
@@ -1217,29 +1646,21 @@ def apply_citation_formatting(file_path, results):
              if citation_display and citation_display not in search_candidates:
                  search_candidates.append(citation_display)
 
-             # Candidate 3: Regex match in this specific paragraph
+             located = None
+             if automaton is not None:
+                 located = sweeps.get(para_idx)
+                 if located is None:
+                     located = sweeps[para_idx] = sweep_citations(automaton, para_index.run_map(para_idx)[0])
+             swept_hit = located is not None and any(c.strip('.,; ') in located for c in search_candidates)
+
+             # Candidate 3: Regex match in this specific paragraph (not needed once raw/display matched exactly)
              try:
                  author_part = cite_data.get('author', '').strip()
                  year_part = cite_data.get('year', '').strip()
                  
-                 if author_part and year_part:
-                     import re
-                     # Escape special chars in author but allow for some flexibility
-                     author_regex = re.escape(author_part).replace(r'\ ', r'\s+')
-                     
-                 if author_part and year_part:
-                     import re
-                     # Escape special chars in author but allow for some flexibility
-                     author_regex = re.escape(author_part).replace(r'\ ', r'\s+')
-                     
-                     regexes = []
-                     # 1. Parenthetical Pattern: (Author... Year...)
-                     regexes.append(re.compile(r'\([^)]*?' + author_regex + r'.*?' + re.escape(year_part) + r'.*?\)', re.IGNORECASE))
-                     # 2. Narrative Pattern: Author... (Year...)
-                     regexes.append(re.compile(author_regex + r'.*?\([^)]*?' + re.escape(year_part) + r'.*?\)', re.IGNORECASE))
-                     
-                     for pattern in regexes:
-                         matches = pattern.findall(para.text)
+                 if author_part and year_part and not swept_hit:
+                     for pattern in _cite_patterns(author_part, year_part):
+                         matches = pattern.findall(para_index.text(para_idx))
                          for m in matches:
                              if m not in search_candidates:
                                  search_candidates.append(m)
@@ -1250,15 +1671,27 @@ def apply_citation_formatting(file_path, results):
              run_group = None
              matched_candidate = None
              full_text_found = ""
+             # Paragraph offsets of the match and of the first run in run_group
+             match_start = match_end = group_start = 0
+             text_map = para_index.run_map(para_idx)
+             run_map = text_map[1]
              
              # Try candidates
              for candidate in search_candidates:
                  if not candidate: continue
                  # Clean candidates of trailing punctuation for search
                  clean_candidate = candidate.strip('.,; ')
+                 if not clean_candidate: continue
                  
-                 rg = find_citation_in_runs(para, clean_candidate, fuzzy_threshold=0.85)
-                 if rg:
+                 if located is not None and clean_candidate in located:
+                     span = (located[clean_candidate], located[clean_candidate] + len(clean_candidate))
+                 else:
+                     span = find_citation_span(text_map[0], clean_candidate)
+                 if span is None:
+                     continue
+                 first, stop = _run_span_range(run_map, *span)
+                 if first < stop:
+                     rg = [entry[2] for entry in run_map[first:stop]]
                      # Verify match
                      ft = "".join(r.text for r in rg)
                      # Check if it contains the essential parts (Author/Year) to confirm it's not a false positive
@@ -1266,9 +1699,28 @@ def apply_citation_formatting(file_path, results):
                          run_group = rg
                          matched_candidate = clean_candidate
                          full_text_found = ft
+                         match_start, match_end = span
+                         group_start = run_map[first][0]
                          break
              
+             # Last resort: fuzzy-align the first candidate and use the paragraph substring it matched
+             if not run_group and search_candidates:
+                 runs_text = text_map[0]
+                 span = find_citation_span(runs_text, search_candidates[0].strip('.,; '), fuzzy_threshold=0.85)
+                 if span:
+                     fuzzy_candidate = runs_text[span[0]:span[1]]
+                     first, stop = _run_span_range(run_map, *span)
+                     if first < stop and cite_data['year'] in fuzzy_candidate:
+                         run_group = [entry[2] for entry in run_map[first:stop]]
+                         matched_candidate = fuzzy_candidate
+                         full_text_found = "".join(r.text for r in run_group)
+                         match_start, match_end = span
+                         group_start = run_map[first][0]
+             
              if run_group:
+                 # Runs are about to be rewritten; the cached offsets no longer apply
+                 para_index.invalidate(para_idx)
+                 
                  # Robust Replacement Logic
                  full_text = full_text_found
                  
@@ -1276,7 +1728,10 @@ def apply_citation_formatting(file_path, results):
                  for r in run_group[1:]:
                      r.text = ""
                  
-                 final_citation_text = matched_candidate
+                 # The match position is already known, so the split needs no second search
+                 start_idx = match_start - group_start
+                 end_idx = match_end - group_start
+                 final_citation_text = full_text[start_idx:end_idx]
                  
                  # Apply Shortening if Valid
                  if is_valid and should_shorten and "et al" not in matched_candidate.lower():
@@ -1288,52 +1743,218 @@ def apply_citation_formatting(file_path, results):
                          replacement_str = full_shortened_str.replace('(', '').replace(')', '')
                      
                      # Simple replace
-                     full_text = full_text.replace(matched_candidate, replacement_str, 1)
+                     full_text = full_text[:start_idx] + replacement_str + full_text[end_idx:]
                      final_citation_text = replacement_str
+                     end_idx = start_idx + len(replacement_str)
+                     # Paragraph text changed, so earlier sweep offsets are stale
+                     sweeps.pop(para_idx, None)
+                     para_index.invalidate(para_idx, text_changed=True)
                  
                  # Split and Style
                  run = run_group[0]
                  run.text = full_text 
                  
                  try:
-                     start_idx = full_text.find(final_citation_text)
-                     if start_idx != -1:
-                         end_idx = start_idx + len(final_citation_text)
-                         
-                         pre_text = full_text[:start_idx]
-                         post_text = full_text[end_idx:]
-                         
-                         run.text = pre_text
-                         
-                         cite_run = para.add_run(final_citation_text)
-                         cite_run.style = 'cite_bib'
-                         cite_run.font.highlight_color = highlight_color
-                         
-                         run._element.addnext(cite_run._element)
+                     pre_text = full_text[:start_idx]
+                     post_text = full_text[end_idx:]
+                     
+                     run.text = pre_text
+                     
+                     cite_run = para.add_run(final_citation_text)
+                     cite_run.style = 'cite_bib'
+                     cite_run.font.highlight_color = highlight_color
+                     
+                     run._element.addnext(cite_run._element)
+                     
+                     if post_text:
+                         post_run = para.add_run(post_text)
+                         if run.style and run.style.name != 'Default Paragraph Font':
+                              post_run.style = run.style
+                         cite_run._element.addnext(post_run._element)
                          
-                         if post_text:
-                             post_run = para.add_run(post_text)
-                             if run.style and run.style.name != 'Default Paragraph Font':
-                                  post_run.style = run.style
-                             cite_run._element.addnext(post_run._element)
-                             
-                         count += 1
-                     else:
-                         # Fallback if text replacement made find impossible?
-                         pass
+                     count += 1
                  except Exception as e:
                      logger.error(f"Error splitting runs for formatting: {e}")
                             
-    doc.save(file_path)
+    if save_to_file:
+        doc.save(file_path)
     return count
 
 
-import ReferencesStructing as RS
-import shutil
-import uuid
-from pathlib import Path
+def _init_batch_worker():
+    """Set up logging in a batch worker process the same way as the main process."""
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
+
+def _process_batch_file(file_path, original_filename, batch_dir, check_structuring, check_validation, citation_style):
+    """
+    Run the structuring and validation phases for one uploaded file.
+    Returns the (source, arcname) entries it contributes to the batch ZIP, where
+    source is a file path or, for documents generated here, the file's bytes.
+    """
+    results_map = []
+
+    # Track current working document
+    current_doc_path = file_path
+    current_doc_name = original_filename
+
+    # 1. STRUCTURING PHASE
+    if check_structuring:
+        try:
+            logger.info(f"Structuring references for {original_filename}")
+            # RS.process_docx_file returns dict with Path objects
+            struct_res = RS.process_docx_file(Path(file_path), Path(batch_dir))
+
+            structured_path = str(struct_res['output_docx'])
+            log_path = str(struct_res['log_file'])
+
+            if os.path.exists(structured_path):
+                # Add to ZIP results
+                results_map.append((structured_path, f"Structured/{current_doc_name.replace('.docx', '_Structured.docx')}"))
+                results_map.append((log_path, f"Logs/{current_doc_name.replace('.docx', '_Structuring_Log.txt')}"))
+
+                # Update current doc for next phase (Validation)
+                current_doc_path = structured_path
+                current_doc_name = os.path.basename(structured_path)
+        except Exception as e:
+            logger.error(f"Error structuring {original_filename}: {e}")
+            # If structuring failed, continue with original for validation?
+            # Or just log error?
+            results_map.append((file_path, f"Errors/{original_filename}_Structuring_Failed.docx"))
+
+    # 2. VALIDATION PHASE
+    if check_validation:
+        try:
+            logger.info(f"Validating {current_doc_name}")
+            results = validate_document_multi_style(current_doc_path, citation_style)
+
+            # Save Report (written straight to the file, not built in memory first)
+            report_filename = f"{current_doc_name}_Report.txt"
+            report_path = os.path.join(batch_dir, report_filename)
+            with open(report_path, 'w', encoding='utf-8') as f:
+                generate_report(results, current_doc_name, out=f)
+
+            results_map.append((report_path, f"Reports/{report_filename}"))
+
+            # New Step: Auto-Formatting
+            # Open the document once and share it (and its paragraph index) with the comment pass
+            doc = Document(current_doc_path)
+            para_index = ParagraphIndex(doc)
+            formatted_count = apply_citation_formatting(current_doc_path, results, doc=doc, para_index=para_index)
+            if formatted_count > 0:
+                 logger.info(f"Formatted {formatted_count} citations in {current_doc_name}")
+                 # Keep the phase input (e.g. the Structured output) formatted on disk as before
+                 doc.save(current_doc_path)
+
+            # Create Annotated Doc if issues exist OR successful formatting occurred
+            has_issues = (results['missing_references'] or 
+                          results['unused_references'] or 
+                          results.get('format_errors') or 
+                          results.get('year_mismatches') or 
+                          results.get('spelling_mismatches'))
+
+            if has_issues or formatted_count > 0:
+                doc, comment_count = insert_comments_in_document(
+                    current_doc_path, 
+                    results,
+                    results['citation_locations'], 
+                    results['reference_details'],
+                    doc=doc,
+                    para_index=para_index
+                )
+                if comment_count > 0 or formatted_count > 0:
+                    # Kept in memory: it only ever goes into the ZIP
+                    annotated_filename = current_doc_name.replace('.docx', '_Annotated.docx')
+                    buf = io.BytesIO()
+                    doc.save(buf)
+                    results_map.append((buf.getvalue(), f"Annotated/{annotated_filename}"))
+        except Exception as e:
+            logger.error(f"Error validating {current_doc_name}: {e}")
+
+    return results_map
+
+
+def _sweep_stale_batch_dirs():
+    """Delete batch_* upload directories older than BATCH_DIR_MAX_AGE."""
+    cutoff = time.time() - BATCH_DIR_MAX_AGE
+    try:
+        entries = list(os.scandir(app.config['UPLOAD_FOLDER']))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.name.startswith('batch_') and entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            continue
+
+
+def _batch_sweeper_loop():
+    while True:
+        _sweep_stale_batch_dirs()
+        time.sleep(BATCH_SWEEP_INTERVAL)
+
+
+def _ensure_batch_sweeper():
+    """Start the stale batch directory sweeper once, from the serving process only."""
+    global _batch_sweeper_started
+    with _batch_sweeper_lock:
+        if not _batch_sweeper_started:
+            threading.Thread(target=_batch_sweeper_loop, name='batch-sweeper', daemon=True).start()
+            _batch_sweeper_started = True
+
+
+class _ZipChunkSink(io.RawIOBase):
+    """Unseekable write target that hands ZipFile output back in chunks."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def _iter_zip_stream(entries):
+    """
+    Yield a ZIP archive of (source, arc_name) entries as it is written, where
+    source is a file path or the entry's bytes. ZipFile falls back to data
+    descriptors on an unseekable target, so only the current chunk is held in
+    memory instead of the whole archive.
+    """
+    sink = _ZipChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for source, arc_name in entries:
+            compress_type = (zipfile.ZIP_STORED if arc_name.lower().endswith(ZIP_STORED_SUFFIXES)
+                             else zipfile.ZIP_DEFLATED)
+            if isinstance(source, bytes):
+                # Generated in memory: no file to stat or open
+                zinfo = zipfile.ZipInfo(arc_name, date_time=time.localtime()[:6])
+                zinfo.external_attr = 0o600 << 16
+                zf.writestr(zinfo, source, compress_type=compress_type)
+                yield from sink.drain()
+                continue
+            if not os.path.exists(source):
+                continue
+            zinfo = zipfile.ZipInfo.from_file(source, arc_name)
+            zinfo.compress_type = compress_type
+            with open(source, 'rb') as src, zf.open(zinfo, 'w') as dest:
+                while True:
+                    block = src.read(ZIP_STREAM_CHUNK)
+                    if not block:
+                        break
+                    dest.write(block)
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
 
-# ... existing code ...
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
@@ -1358,13 +1979,15 @@ def index():
             return redirect(request.url)
 
         # Create Batch Directory
+        _ensure_batch_sweeper()
         batch_id = str(uuid.uuid4())[:8]
         batch_dir = os.path.join(app.config['UPLOAD_FOLDER'], f"batch_{batch_id}")
         os.makedirs(batch_dir, exist_ok=True)
         
-        results_map = [] # To store (file_path, arcname)
+        results_map = [] # To store (file_path or bytes, arcname)
 
         try:
+            uploads = []
             for file in files:
                 if not (file.filename and allowed_file(file.filename)):
                     continue
@@ -1372,103 +1995,41 @@ def index():
                 original_filename = secure_filename(file.filename)
                 file_path = os.path.join(batch_dir, original_filename)
                 file.save(file_path)
-
-                # Track current working document
-                current_doc_path = file_path
-                current_doc_name = original_filename
-
-                # 1. STRUCTURING PHASE
-                if check_structuring:
-                    try:
-                        logger.info(f"Structuring references for {original_filename}")
-                        # RS.process_docx_file returns dict with Path objects
-                        struct_res = RS.process_docx_file(Path(file_path), Path(batch_dir))
-                        
-                        structured_path = str(struct_res['output_docx'])
-                        log_path = str(struct_res['log_file'])
-                        
-                        if os.path.exists(structured_path):
-                            # Add to ZIP results
-                            results_map.append((structured_path, f"Structured/{current_doc_name.replace('.docx', '_Structured.docx')}"))
-                            results_map.append((log_path, f"Logs/{current_doc_name.replace('.docx', '_Structuring_Log.txt')}"))
-                            
-                            # Update current doc for next phase (Validation)
-                            current_doc_path = structured_path
-                            current_doc_name = os.path.basename(structured_path)
-                    except Exception as e:
-                        logger.error(f"Error structuring {original_filename}: {e}")
-                        # If structuring failed, continue with original for validation?
-                        # Or just log error?
-                        results_map.append((file_path, f"Errors/{original_filename}_Structuring_Failed.docx"))
-
-                # 2. VALIDATION PHASE
-                if check_validation:
-                    try:
-                        logger.info(f"Validating {current_doc_name}")
-                        results = validate_document_multi_style(current_doc_path, citation_style)
-                        report_text = generate_report(results, current_doc_name)
-                        
-                        # Save Report
-                        report_filename = f"{current_doc_name}_Report.txt"
-                        report_path = os.path.join(batch_dir, report_filename)
-                        with open(report_path, 'w', encoding='utf-8') as f:
-                            f.write(report_text)
-                        
-                        results_map.append((report_path, f"Reports/{report_filename}"))
-
-                        # New Step: Auto-Formatting
-                        formatted_count = apply_citation_formatting(current_doc_path, results)
-                        if formatted_count > 0:
-                             logger.info(f"Formatted {formatted_count} citations in {current_doc_name}")
-
-                        # Create Annotated Doc if issues exist OR successful formatting occurred
-                        has_issues = (results['missing_references'] or 
-                                      results['unused_references'] or 
-                                      results.get('format_errors') or 
-                                      results.get('year_mismatches') or 
-                                      results.get('spelling_mismatches'))
-                        
-                        if has_issues or formatted_count > 0:
-                            doc, comment_count = insert_comments_in_document(
-                                current_doc_path, 
-                                results,
-                                results['citation_locations'], 
-                                results['reference_details']
-                            )
-                            if comment_count > 0 or formatted_count > 0:
-                                annotated_filename = current_doc_name.replace('.docx', '_Annotated.docx')
-                                annotated_path = os.path.join(batch_dir, annotated_filename)
-                                doc.save(annotated_path)
-                                results_map.append((annotated_path, f"Annotated/{annotated_filename}"))
-                    except Exception as e:
-                        logger.error(f"Error validating {current_doc_name}: {e}")
+                uploads.append((file_path, original_filename))
+
+            if len(uploads) > 1:
+                # Files are independent: run one worker process per file, up to the core count
+                with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=min(len(uploads), os.cpu_count() or 1),
+                    initializer=_init_batch_worker
+                ) as executor:
+                    # map() keeps upload order, so the ZIP is assembled serially and deterministically
+                    file_paths, original_filenames = zip(*uploads)
+                    for entries in executor.map(_process_batch_file, file_paths, original_filenames,
+                                                repeat(batch_dir), repeat(check_structuring),
+                                                repeat(check_validation), repeat(citation_style),
+                                                chunksize=1):
+                        results_map.extend(entries)
+            else:
+                for file_path, original_filename in uploads:
+                    results_map.extend(_process_batch_file(file_path, original_filename, batch_dir,
+                                                           check_structuring, check_validation, citation_style))
 
             # GENERATE ZIP
             if not results_map:
+                shutil.rmtree(batch_dir, ignore_errors=True)
                 flash('No results generated. Please check files and try again.', 'error')
                 return redirect(request.url)
 
-            memory_file = io.BytesIO()
-            with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-                for src_path, arc_name in results_map:
-                    if os.path.exists(src_path):
-                        zf.write(src_path, arc_name)
-            
-            memory_file.seek(0)
-            
-            # Use send_file with a callback to clean up? 
-            # Flask send_file doesn't support cleanup callback easily in older versions, 
-            # but we can trust OS temp cleaning or do it in a finally block if we weren't returning
-            # Since we are returning a stream, we can't delete immediately.
-            # Best practice: schedule a cleanup or trust the unique dir is small enough until standard purge.
-            # OR read bytes and delete.
-            
-            response = make_response(send_file(
-                memory_file,
+            # Stream the archive while it is being compressed; the generator
+            # reads the batch directory lazily, so it is removed only once the
+            # response has been sent (or the client went away).
+            response = Response(
+                _iter_zip_stream(results_map),
                 mimetype='application/zip',
-                as_attachment=True,
-                download_name=f"Processed_Results_{batch_id}.zip"
-            ))
+                headers={'Content-Disposition': f'attachment; filename=Processed_Results_{batch_id}.zip'}
+            )
+            response.call_on_close(partial(shutil.rmtree, batch_dir, ignore_errors=True))
             
             # Set cookie for frontend to detect download completion
             token = request.form.get('download_token')
@@ -1479,6 +2040,7 @@ def index():
 
         except Exception as e:
             logger.error(f"Batch processing error: {e}", exc_info=True)
+            shutil.rmtree(batch_dir, ignore_errors=True)
             flash(f'Error processing files: {str(e)}', 'error')
             return redirect(request.url)
 
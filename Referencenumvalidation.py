@@ -1,15 +1,36 @@
 import re
 import os
 import io
+import json
 import zipfile
-from collections import defaultdict
+import posixpath
+from collections import defaultdict, namedtuple
 
-from flask import Flask, request, send_file, render_template, redirect, url_for, session
+from flask import Flask, request, send_from_directory, render_template, redirect, url_for, session
 from docx import Document
-from docx.oxml.text.paragraph import CT_P
-from docx.oxml.table import CT_Tbl
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn, nsmap
+from docx.styles import BabelFish
 from docx.text.paragraph import Paragraph
-from docx.table import Table
+from docx.text.run import Run
+import numpy as np
+from rapidfuzz import fuzz
+from duplicate_scoring import (
+    DUPLICATE_SCORE_CUTOFF, DUPLICATE_MAX_LENGTH_RATIO, DUPLICATE_LSH_MIN_REFS,
+    DUPLICATE_SHINGLE_SIZE, DUPLICATE_LSH_THRESHOLD, DUPLICATE_LSH_NUM_PERM,
+    length_window_pairs,
+)
+from lxml import etree
+
+try:
+    from datasketch import MinHash, MinHashLSH
+except ImportError:  # optional: without it every pair is compared
+    MinHash = MinHashLSH = None
+
+try:
+    import orjson
+except ImportError:  # optional: the standard json module is used instead
+    orjson = None
 
 app = Flask(__name__)
 app.secret_key = "secret_key_for_session_encryption"
@@ -20,21 +41,114 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 # Helpers & Core Logic
 # =====================================================
 
+# Duplicate prefilter for very large bibliographies: references are shingled
+# and bucketed with MinHash LSH (settings in duplicate_scoring), so only
+# entries with similar shingle sets get a fuzz.ratio score.
+# 32-bit FNV-1a, used to hash shingles for MinHash
+_FNV32_OFFSET = np.uint32(2166136261)
+_FNV32_PRIME = np.uint32(16777619)
+# Entries shorter than this have too few shingles for LSH to be reliable
+# (one edit changes up to 3 of them); they are always scored exactly
+DUPLICATE_SHORT_TEXT = 40
+
+# Number lists at least this long are sorted/grouped with NumPy
+NUMPY_MIN_NUMBERS = 64
+
+# Citation / number patterns, compiled once and shared by every scan.
+# (start) with optional -(end); allows hyphen, en dash, em dash. A single
+# branch, so a lone number is not scanned twice as with "range|single".
+_NUM_RE = re.compile(r'(\d+)(?:\s*[-–—]\s*(\d+))?')
+# Superscript run content that looks like numbers/ranges/separators
+_SUPER_RE = re.compile(r'\A[\d,\-–—\s]+\Z')
+# Fallback inline citation ^1-3^
+_CITE_INLINE_RE = re.compile(r'\^([\d,\-–—\s]+)\^')
+# ^1-3^ OR [1-3] OR (1-3); the only group is the numeric body
+_CITE_BRACKET_RE = re.compile(r'[\^\[\(]([\d,\-–—\s]+)[\^\]\)]')
+# Leading reference number such as "12", "[12]", "12. "
+_LEADING_NUM_RE = re.compile(r'\d+')
+_REF_NUMBER_PREFIX_RE = re.compile(r'^\[?\d+\]?[\.\s]*')
+
+# WordprocessingML tags read by the streaming (validation-only) scanner
+_W_BODY, _W_P, _W_TBL = qn('w:body'), qn('w:p'), qn('w:tbl')
+_W_SDT, _W_CUSTOM_XML = qn('w:sdt'), qn('w:customXml')
+# Every w:p in document order, in one lxml call. Paragraphs under mc:Fallback
+# are the legacy copy of a text box already reached through mc:Choice.
+_CONTENT_PARAGRAPHS = etree.XPath(
+    'descendant-or-self::w:p[not(ancestor::mc:Fallback)]',
+    namespaces={'w': nsmap['w'], 'mc': 'http://schemas.openxmlformats.org/markup-compatibility/2006'}
+)
+_W_R, _W_HYPERLINK, _W_T = qn('w:r'), qn('w:hyperlink'), qn('w:t')
+_W_TAB, _W_PTAB, _W_BR, _W_CR = qn('w:tab'), qn('w:ptab'), qn('w:br'), qn('w:cr')
+_W_NO_BREAK_HYPHEN = qn('w:noBreakHyphen')
+_W_VAL, _W_TYPE = qn('w:val'), qn('w:type')
+
+
+def shingle_hashes(text, k=DUPLICATE_SHINGLE_SIZE):
+    """
+    Distinct FNV-1a hashes of the k-character shingles of text (the whole text
+    when it is shorter than k), computed over all windows at once with NumPy.
+    """
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    if len(codes) < k:
+        windows = codes[np.newaxis, :]
+    else:
+        windows = np.lib.stride_tricks.sliding_window_view(codes, k)
+    h = np.full(len(windows), _FNV32_OFFSET, dtype=np.uint32)
+    for col in range(windows.shape[1]):
+        h ^= windows[:, col]
+        h *= _FNV32_PRIME
+    return np.unique(h).tolist()
+
+
+def duplicate_candidates(texts):
+    """
+    Returns, for each text, the indices of later texts worth comparing with it.
+    Uses MinHash LSH when datasketch is installed, otherwise every later index.
+    """
+    n = len(texts)
+    if MinHashLSH is None:
+        return [range(i + 1, n) for i in range(n)]
+
+    lsh = MinHashLSH(threshold=DUPLICATE_LSH_THRESHOLD, num_perm=DUPLICATE_LSH_NUM_PERM)
+    # Shingles arrive pre-hashed, so MinHash only applies its permutations;
+    # generator() also reuses one set of permutations for every text.
+    hashes = list(MinHash.generator((shingle_hashes(text) for text in texts),
+                                    num_perm=DUPLICATE_LSH_NUM_PERM, hashfunc=int))
+    for i, mh in enumerate(hashes):
+        lsh.insert(i, mh)
+
+    return [sorted(j for j in lsh.query(mh) if j > i) for i, mh in enumerate(hashes)]
+
+
+def _score_lsh_pairs(texts):
+    """
+    (i, j, score) triples, row-major, for the LSH candidate pairs plus every
+    length-compatible pair involving a short entry.
+    """
+    # Short entries and every text long enough to match one of them
+    short_limit = DUPLICATE_SHORT_TEXT * DUPLICATE_MAX_LENGTH_RATIO
+    short = [k for k, text in enumerate(texts) if len(text) < short_limit]
+    short_set = set(short)
+    si, sj, scores = length_window_pairs([texts[k] for k in short])
+    scored = [(short[i], short[j], score) for i, j, score in zip(si, sj, scores)]
+
+    for i, js in enumerate(duplicate_candidates(texts)):
+        for j in js:
+            if i in short_set and j in short_set:
+                continue  # already scored exactly above
+            scored.append((i, j, fuzz.ratio(texts[i], texts[j], score_cutoff=DUPLICATE_SCORE_CUTOFF)))
+
+    scored.sort(key=lambda item: (item[0], item[1]))
+    return scored
+
+
 def iter_document_paragraphs(doc):
     """
     Iterate through all paragraphs in the document body in order,
-    including those inside tables.
+    including those inside (nested) tables, content controls and text boxes.
     """
-    body = doc._element.body
-    for child in body:
-        if isinstance(child, CT_P):
-            yield Paragraph(child, doc)
-        elif isinstance(child, CT_Tbl):
-            table = Table(child, doc)
-            for row in table.rows:
-                for cell in row.cells:
-                    for p in cell.paragraphs:
-                        yield p
+    for p in _CONTENT_PARAGRAPHS(doc._element.body):
+        yield Paragraph(p, doc)
 
 
 def get_numbers(text):
@@ -43,61 +157,65 @@ def get_numbers(text):
     Handles ranges "1-5" -> [1, 2, 3, 4, 5].
     """
     nums = []
-    # Matches: (start)-(end) OR (single)
-    # Allows hyphen, en dash, em dash
-    pattern = re.compile(r'(\d+)\s*[-–—]\s*(\d+)|(\d+)')
-    
-    for start, end, single in pattern.findall(text):
-        if start and end:
+    for m in _NUM_RE.finditer(text):
+        start, end = m.groups()
+        if end:
             try:
                 s, e = int(start), int(end)
                 if s <= e:
                     nums.extend(range(s, e + 1))
             except ValueError:
                 pass
-        elif single:
+        else:
             try:
-                nums.append(int(single))
+                nums.append(int(start))
             except ValueError:
                 pass
     return nums
 
 
-def format_numbers(nums):
+def number_runs(nums):
     """
-    Format a list of numbers into a string like '1-3, 5'.
-    Collapses ranges of 3 or more (e.g. 1,2,3 -> 1-3).
+    Split numbers into sorted, de-duplicated consecutive runs [(start, end), ...].
+    Large inputs are handled with NumPy (np.unique + np.diff); short citation
+    groups stay in plain Python where array setup would cost more than it saves.
     """
-    nums = sorted(set(nums))
-    if not nums:
-        return ""
+    if len(nums) >= NUMPY_MIN_NUMBERS:
+        u = np.unique(np.fromiter(nums, dtype=np.int64, count=len(nums)))
+        breaks = np.flatnonzero(np.diff(u) != 1) + 1
+        starts = u[np.concatenate(([0], breaks))]
+        ends = u[np.concatenate((breaks - 1, [len(u) - 1]))]
+        return list(zip(starts.tolist(), ends.tolist()))
 
-    parts = []
+    nums = sorted(set(nums))
     if not nums:
-        return ""
+        return []
 
+    runs = []
     start = prev = nums[0]
-
     for n in nums[1:]:
-        if n == prev + 1:
-            prev = n
+        if n != prev + 1:
+            runs.append((start, prev))
+            start = n
+        prev = n
+    runs.append((start, prev))
+    return runs
+
+
+def format_numbers(nums):
+    """
+    Format a list of numbers into a string like '1-3, 5'.
+    Collapses ranges of 3 or more (e.g. 1,2,3 -> 1-3).
+    """
+    parts = []
+    for start, end in number_runs(nums):
+        length = end - start + 1
+        if length >= 3:
+            parts.append(f"{start}-{end}")
+        elif length == 2:
+            parts.append(f"{start},{end}")
         else:
-            length = prev - start + 1
-            if length >= 3:
-                parts.append(f"{start}-{prev}")
-            elif length == 2:
-                parts.append(f"{start},{prev}")
-            else:
-                parts.append(str(start))
-            start = prev = n
-
-    length = prev - start + 1
-    if length >= 3:
-        parts.append(f"{start}-{prev}")
-    elif length == 2:
-        parts.append(f"{start},{prev}")
-    else:
-        parts.append(str(start))
+            parts.append(str(start))
 
     return ", ".join(parts)
 
@@ -114,15 +232,146 @@ def is_citation_run(run):
         if not text:
             return False
         # Must look like numbers/ranges/separators
-        if re.match(r'^[\d,\-–—\s]+$', text):
+        if _SUPER_RE.match(text):
             return True
     return False
 
 
-class ReferenceProcessor:
-    def __init__(self, doc):
-        self.doc = doc
-        
+# Read-only snapshots of what ReferenceProcessor inspects on python-docx objects
+# (para.text/.style.name/.runs, run.text/.style.name/.font.superscript), read
+# straight from the XML so scans skip python-docx's per-run style lookups.
+StyleRef = namedtuple('StyleRef', 'name')
+FontRef = namedtuple('FontRef', 'superscript')
+RunRecord = namedtuple('RunRecord', 'text style font')
+ParagraphRecord = namedtuple('ParagraphRecord', 'text style runs')
+
+
+def _part_target(zf, source_part, rel_type_suffix):
+    """Resolve the first relationship of `source_part` whose type ends with the suffix."""
+    rels_path = posixpath.join(posixpath.dirname(source_part), '_rels',
+                               posixpath.basename(source_part) + '.rels')
+    try:
+        rels = etree.fromstring(zf.read(rels_path))
+    except KeyError:
+        return None
+    for rel in rels:
+        if rel.get('Type', '').endswith(rel_type_suffix):
+            target = rel.get('Target')
+            if target.startswith('/'):
+                return target.lstrip('/')
+            return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+    return None
+
+
+def _style_resolver(styles_element):
+    """
+    Returns a resolver (style_id, style_type) -> StyleRef | None over a <w:styles>
+    element that follows python-docx: unknown ids or a type mismatch fall back
+    to the type's default.
+    """
+    by_id = {}
+    defaults = {}
+    if styles_element is not None:
+        for style in styles_element.iterchildren(qn('w:style')):
+            name_el = style.find(qn('w:name'))
+            name = name_el.get(_W_VAL) if name_el is not None else None
+            ref = StyleRef(BabelFish.internal2ui(name) if name is not None else None)
+            style_type = style.get(_W_TYPE)
+            by_id.setdefault(style.get(qn('w:styleId')), (style_type, ref))
+            if style.get(qn('w:default')) in ('1', 'true', 'on'):
+                defaults[style_type] = ref  # last default wins
+
+    def resolve(style_id, style_type):
+        found = by_id.get(style_id) if style_id else None
+        if found is None or found[0] != style_type:
+            return defaults.get(style_type)
+        return found[1]
+
+    return resolve
+
+
+def _run_record(r, resolve_style):
+    parts = []
+    style_id = superscript = None
+    for child in r:
+        tag = child.tag
+        if tag == _W_T:
+            parts.append(child.text or '')
+        elif tag == _W_TAB or tag == _W_PTAB:
+            parts.append('\t')
+        elif tag == _W_CR or (tag == _W_BR and child.get(_W_TYPE, 'textWrapping') == 'textWrapping'):
+            parts.append('\n')
+        elif tag == _W_NO_BREAK_HYPHEN:
+            parts.append('-')
+        elif tag == qn('w:rPr'):
+            r_style = child.find(qn('w:rStyle'))
+            style_id = r_style.get(_W_VAL) if r_style is not None else None
+            vert_align = child.find(qn('w:vertAlign'))
+            if vert_align is not None:
+                superscript = vert_align.get(_W_VAL) == 'superscript'
+    return RunRecord(''.join(parts), resolve_style(style_id, 'character'), FontRef(superscript))
+
+
+def _paragraph_record(p, resolve_style):
+    runs = []
+    text_parts = []
+    style_id = None
+    for child in p:
+        if child.tag == _W_R:
+            run = _run_record(child, resolve_style)
+            runs.append(run)
+            text_parts.append(run.text)
+        elif child.tag == _W_HYPERLINK:
+            # Hyperlink text counts towards paragraph text but not para.runs
+            text_parts.extend(_run_record(r, resolve_style).text for r in child.iterchildren(_W_R))
+        elif child.tag == qn('w:pPr'):
+            p_style = child.find(qn('w:pStyle'))
+            style_id = p_style.get(_W_VAL) if p_style is not None else None
+    return ParagraphRecord(''.join(text_parts), resolve_style(style_id, 'paragraph'), runs)
+
+
+def stream_docx_paragraphs(file):
+    """
+    Parse a .docx with lxml iterparse instead of building a python-docx Document.
+    Returns (all_paragraphs, body_paragraphs) as ParagraphRecord records, where
+    all_paragraphs matches iter_document_paragraphs() and body_paragraphs matches
+    doc.paragraphs. Processed body content is freed as the parse advances.
+    """
+    all_paragraphs = []
+    body_paragraphs = []
+    with zipfile.ZipFile(file) as zf:
+        document_part = _part_target(zf, '', '/officeDocument') or 'word/document.xml'
+        styles_part = _part_target(zf, document_part, '/styles')
+        resolve_style = _style_resolver(etree.fromstring(zf.read(styles_part)) if styles_part else None)
+        with zf.open(document_part) as f:
+            # Body-level blocks that can hold paragraphs; each is handled whole
+            for _, elem in etree.iterparse(f, events=('end',), tag=(_W_P, _W_TBL, _W_SDT, _W_CUSTOM_XML)):
+                parent = elem.getparent()
+                if parent is None or parent.tag != _W_BODY:
+                    continue
+                records = [_paragraph_record(p, resolve_style) for p in _CONTENT_PARAGRAPHS(elem)]
+                if elem.tag == _W_P:
+                    body_paragraphs.append(records[0])
+                all_paragraphs.extend(records)
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del parent[0]
+    return all_paragraphs, body_paragraphs
+
+
+class ReferenceChecker:
+    """
+    Read-only citation and bibliography scans and the validation stats built
+    from them. Subclasses supply _paragraph_records() and
+    _bibliography_paragraphs().
+    """
+
+    def __init__(self, duplicate_scores=None):
+        # (texts, [(i, j, score), ...]) from the last find_duplicates() call.
+        # Renumbering only reorders entries and rewrites their numbers, so a
+        # later call (or another checker for the same document) reuses it.
+        self.duplicate_scores = duplicate_scores
+
     def get_references_in_bibliography(self):
         """
         Returns a Set of IDs found in the bibliography sections (REF-N style).
@@ -131,34 +380,33 @@ class ReferenceProcessor:
         refs_found = set()
         ref_objects = [] # list of dicts: {'id': int, 'para': p, 'run': r}
 
-        for para in self.doc.paragraphs:
-            if para.style and para.style.name == "REF-N":
-                found_id = None
-                bib_run = None
-                
-                # Try finding styled run
-                for run in para.runs:
-                    if run.style and run.style.name == "bib_number":
-                        nums = get_numbers(run.text)
-                        if nums:
-                            found_id = nums[0]
-                            bib_run = run
-                            break
-                            
-                # Fallback: Check start of text if no styled run
-                if found_id is None:
-                    match = re.match(r'^(\d+)', para.text.strip())
-                    if match:
-                        found_id = int(match.group(1))
+        for para, record in self._bibliography_paragraphs():
+            found_id = None
+            bib_run = None
+            
+            # Try finding styled run
+            for k, run in enumerate(record.runs):
+                if run.style and run.style.name == "bib_number":
+                    nums = get_numbers(run.text)
+                    if nums:
+                        found_id = nums[0]
+                        bib_run = para.runs[k]
+                        break
+                        
+            # Fallback: Check start of text if no styled run
+            if found_id is None:
+                match = _LEADING_NUM_RE.match(record.text.strip())
+                if match:
+                    found_id = int(match.group())
+            
+            if found_id is not None:
+                refs_found.add(found_id)
+                ref_objects.append({
+                    'id': found_id,
+                    'para': para,
+                    'run': bib_run
+                })
                 
-                if found_id is not None:
-                    refs_found.add(found_id)
-                    ref_objects.append({
-                        'id': found_id,
-                        'para': para,
-                        'run': bib_run
-                    })
-                    
         return refs_found, ref_objects
 
     def get_citations_in_text(self):
@@ -169,60 +417,48 @@ class ReferenceProcessor:
             appearance_order: list of unique IDs in order of first appearance
         """
         all_cited_ids = []
-        appearance_order = []
-        seen = set()
-        
-        # Regex for fallback pattern ^1-3^
-        citation_pattern = re.compile(r'\^([\d,\-–—\s]+)\^')
+        first_seen = {}  # insertion-ordered: unique IDs by first appearance
 
-        for para in iter_document_paragraphs(self.doc):
-            # 1. Process runs
-            current_group = []
+        def ingest(text):
+            nums = get_numbers(text)
+            all_cited_ids.extend(nums)
+            for n in nums:
+                first_seen.setdefault(n, None)
+
+        for record in self._paragraph_records():
+            # 1. Process runs; consecutive citation runs form one group
+            group_texts = []
             
-            for run in para.runs:
+            for run in record.runs:
                 if is_citation_run(run):
-                    current_group.append(run)
-                else:
-                    if current_group:
-                        # Flush group
-                        text = "".join(r.text for r in current_group)
-                        nums = get_numbers(text)
-                        all_cited_ids.extend(nums)
-                        for n in nums:
-                            if n not in seen:
-                                seen.add(n)
-                                appearance_order.append(n)
-                        current_group = []
-                    
-                    # Check fallback pattern in non-citation run
-                    matches = citation_pattern.findall(run.text)
-                    for m in matches:
-                        nums = get_numbers(m)
-                        all_cited_ids.extend(nums)
-                        for n in nums:
-                            if n not in seen:
-                                seen.add(n)
-                                appearance_order.append(n)
+                    group_texts.append(run.text)
+                    continue
+
+                if group_texts:
+                    ingest("".join(group_texts))
+                    group_texts = []
+                
+                # Check fallback pattern ^1-3^ in non-citation run
+                text = run.text
+                if '^' in text:
+                    for m in _CITE_INLINE_RE.finditer(text):
+                        ingest(m.group(1))
             
             # Flush trailing group
-            if current_group:
-                text = "".join(r.text for r in current_group)
-                nums = get_numbers(text)
-                all_cited_ids.extend(nums)
-                for n in nums:
-                    if n not in seen:
-                        seen.add(n)
-                        appearance_order.append(n)
+            if group_texts:
+                ingest("".join(group_texts))
                         
-        return all_cited_ids, appearance_order
+        return all_cited_ids, list(first_seen)
 
     def find_duplicates(self, ref_objects):
         """
-        Finds duplicate references using fuzzy matching (difflib).
+        Finds duplicate references using fuzzy matching (rapidfuzz ratio).
+        Pairs are limited to length-compatible references. Bibliographies of at
+        least DUPLICATE_LSH_MIN_REFS entries use the candidate pairs from
+        duplicate_candidates() when the LSH prefilter is available (short
+        entries are then still compared exactly).
         Returns a list of dicts: {'id': int, 'text': str, 'duplicate_of': int, 'score': float}
         """
-        import difflib
-        
         duplicates = []
         processed_refs = [] # list of (id, clean_text)
         
@@ -230,64 +466,68 @@ class ReferenceProcessor:
         for obj in ref_objects:
             full_text = obj['para'].text.strip()
             # Remove leading numbering like "1. ", "[1] "
-            clean_text = re.sub(r'^\[?\d+\]?[\.\s]*', '', full_text)
+            clean_text = _REF_NUMBER_PREFIX_RE.sub('', full_text)
             processed_refs.append({'id': obj['id'], 'text': clean_text})
             
-        # 2. Compare O(N^2)
+        # 2. Score pairs
         # We only check forward to avoid double reporting (A=B, B=A)
         # We assume the *earlier* ID is the "original" and later is "duplicate"
-        n = len(processed_refs)
-        matcher = difflib.SequenceMatcher(None, "", "")
-        
-        for i in range(n):
-            ref_a = processed_refs[i]
-            text_a = ref_a['text']
-            len_a = len(text_a)
-            
-            if len_a == 0:
+        texts = [r['text'] for r in processed_refs]
+        scored = self._reuse_duplicate_scores(texts)
+        if scored is None:
+            if MinHashLSH is None or len(texts) < DUPLICATE_LSH_MIN_REFS:
+                scored = list(zip(*length_window_pairs(texts)))
+            else:
+                scored = _score_lsh_pairs(texts)
+        self.duplicate_scores = (texts, scored)
+
+        for i, j, score in scored:
+            # Empty entries score 100 against each other; never report them
+            # Threshold: 85 (85% similar)
+            if not texts[i] or not texts[j] or score <= DUPLICATE_SCORE_CUTOFF:
                 continue
-                
-            matcher.set_seq1(text_a)
-            
-            for j in range(i + 1, n):
-                ref_b = processed_refs[j]
-                text_b = ref_b['text']
-                len_b = len(text_b)
-                
-                if len_b == 0: 
-                    continue
-                    
-                # Optimization: Length ratio check
-                # If lengths differ significantly, they can't be high matches
-                # If ratio > 0.85, then min_len / max_len must be roughly > 0.85
-                # We use 0.6 as a conservative safety net, but 0.8 is probably safe if threshold is 0.85.
-                if min(len_a, len_b) / max(len_a, len_b) < 0.6:
-                    continue
-                
-                matcher.set_seq2(text_b)
-                
-                # Performance Optimization: Check cheap upper bounds first
-                if matcher.real_quick_ratio() < 0.85:
-                    continue
-                if matcher.quick_ratio() < 0.85:
-                    continue
-                    
-                ratio = matcher.ratio()
-                
-                # Threshold: 0.85 (85% similar)
-                if ratio > 0.85:
-                    duplicates.append({
-                        'id': ref_b['id'], # The later one is the duplicate
-                        'text': ref_b['text'][:100] + "...",
-                        'duplicate_of': ref_a['id'],
-                        'score': round(ratio * 100, 1)
-                    })
+            ref_a = processed_refs[i]
+            ref_b = processed_refs[j]
+            duplicates.append({
+                'id': ref_b['id'], # The later one is the duplicate
+                'text': ref_b['text'][:100] + "...",
+                'duplicate_of': ref_a['id'],
+                'score': round(float(score), 1)
+            })
                     
         return duplicates
 
+    def _reuse_duplicate_scores(self, texts):
+        """
+        The cached pair scores re-indexed for texts, or None when texts is not
+        a reordering of the texts they were computed for.
+        """
+        if self.duplicate_scores is None:
+            return None
+        old_texts, old_scored = self.duplicate_scores
+        if len(old_texts) != len(texts):
+            return None
+
+        slots = defaultdict(list)
+        for k, text in enumerate(texts):
+            slots[text].append(k)
+        new_index = []
+        for text in old_texts:
+            if not slots[text]:
+                return None
+            new_index.append(slots[text].pop())
+
+        # fuzz.ratio is symmetric, so only the pair order needs fixing up
+        scored = []
+        for i, j, score in old_scored:
+            a, b = new_index[i], new_index[j]
+            scored.append((min(a, b), max(a, b), score))
+        scored.sort(key=lambda item: (item[0], item[1]))
+        return scored
+
     def get_validation_stats(self):
         bib_refs, ref_objects = self.get_references_in_bibliography()
-        all_cited, _ = self.get_citations_in_text()
+        all_cited, appearance_order = self.get_citations_in_text()
         
         unique_cited = set(all_cited)
         
@@ -300,25 +540,15 @@ class ReferenceProcessor:
         # Duplicates
         duplicates = self.find_duplicates(ref_objects)
         
-        # Sequence Issues
-        sequence_issues = []
-        seen_in_seq = []
-        previous_max = 0
-        
-        for n in all_cited:
-            if n not in seen_in_seq:
-                if n < previous_max:
-                     pass
-                
-                if n != len(seen_in_seq) + 1:
-                     sequence_issues.append({
-                         "position": len(seen_in_seq) + 1,
-                         "current": n,
-                         "expected": len(seen_in_seq) + 1
-                     })
-                
-                seen_in_seq.append(n)
-                previous_max = max(previous_max, n)
+        # Sequence Issues: the k-th distinct citation (in order of first
+        # appearance) should be k; compare the whole order at once
+        order = np.asarray(appearance_order, dtype=np.int64)
+        expected = np.arange(1, len(order) + 1)
+        wrong = order != expected
+        sequence_issues = [
+            {"position": pos, "current": cur, "expected": pos}
+            for pos, cur in zip(expected[wrong].tolist(), order[wrong].tolist())
+        ]
                 
         return {
             "total_references": len(bib_refs),
@@ -330,6 +560,54 @@ class ReferenceProcessor:
             "is_perfect": (not missing and not unused and not sequence_issues and not duplicates)
         }
 
+
+class ReferenceProcessor(ReferenceChecker):
+    """ReferenceChecker over a python-docx Document, which it can also renumber."""
+
+    def __init__(self, doc, duplicate_scores=None):
+        super().__init__(duplicate_scores)
+        self.doc = doc
+        # Paragraph lists are built on first use and shared by every scan;
+        # renumber() drops them once it reorders the bibliography.
+        self._all_paragraphs = None
+        self._records = None
+        self._bib_paragraphs = None
+        self._resolve_style = None
+
+    def _style_resolver(self):
+        if self._resolve_style is None:
+            self._resolve_style = _style_resolver(self.doc.styles.element)
+        return self._resolve_style
+
+    def _paragraphs(self):
+        """All body paragraphs (including table cells) in document order."""
+        if self._all_paragraphs is None:
+            self._all_paragraphs = list(iter_document_paragraphs(self.doc))
+        return self._all_paragraphs
+
+    def _paragraph_records(self):
+        """ParagraphRecord snapshots of _paragraphs(), used by the read-only scans."""
+        if self._records is None:
+            resolve_style = self._style_resolver()
+            self._records = [_paragraph_record(p._p, resolve_style) for p in self._paragraphs()]
+        return self._records
+
+    def _bibliography_paragraphs(self):
+        """(paragraph, record) for top-level paragraphs styled REF-N, in document order."""
+        if self._bib_paragraphs is None:
+            resolve_style = self._style_resolver()
+            self._bib_paragraphs = []
+            for p in self.doc.paragraphs:
+                record = _paragraph_record(p._p, resolve_style)
+                if record.style and record.style.name == "REF-N":
+                    self._bib_paragraphs.append((p, record))
+        return self._bib_paragraphs
+
+    def _invalidate_paragraphs(self):
+        self._all_paragraphs = None
+        self._records = None
+        self._bib_paragraphs = None
+
     def renumber(self):
         """
         Renumber citations and reorder bibliography.
@@ -341,10 +619,14 @@ class ReferenceProcessor:
         from docx.enum.style import WD_STYLE_TYPE
         styles = self.doc.styles
         try:
-            styles['cite_bib']
+            cite_style = styles['cite_bib']
         except KeyError:
-            s = styles.add_style('cite_bib', WD_STYLE_TYPE.CHARACTER)
-            s.font.superscript = True
+            cite_style = styles.add_style('cite_bib', WD_STYLE_TYPE.CHARACTER)
+            cite_style.font.superscript = True
+        # Style ids are resolved once here and written straight into rStyle below
+        cite_style_id = cite_style.style_id
+        self._resolve_style = None  # the style may have just been added
+        resolve_style = self._style_resolver()
 
         # Create Mapping
         mapping = {} 
@@ -352,119 +634,90 @@ class ReferenceProcessor:
         for old_id in appearance_order:
             mapping[old_id] = new_id
             new_id += 1
+
+        # Lookup table old -> new for long (range-expanded) groups, and a cache
+        # of converted citation text, since the same citation usually recurs.
+        max_id = max(mapping, default=0)
+        lut = np.arange(max_id + 1)
+        lut[list(mapping)] = list(mapping.values())
+        converted = {}
+
+        def convert(numbers_text):
+            result = converted.get(numbers_text)
+            if result is None:
+                nums = get_numbers(numbers_text)
+                if len(nums) >= NUMPY_MIN_NUMBERS:
+                    arr = np.asarray(nums)
+                    known = arr <= max_id
+                    arr[known] = lut[arr[known]]
+                    new_nums = arr.tolist()
+                else:
+                    new_nums = [mapping.get(n, n) for n in nums]
+                # Format: 1-3 ("" when the text holds no numbers)
+                result = converted[numbers_text] = format_numbers(new_nums)
+            return result
             
         # 1. Update Citations in Text
-        # Matches: ^1-3^ OR [1-3] OR (1-3)
+        # Matches: ^1-3^ OR [1-3] OR (1-3) via _CITE_BRACKET_RE
         # Note: Be careful with (1) as it can be a list. We verify contents are numeric.
-        citation_pattern = re.compile(r'(\^|\[|\()([\d,\-–—\s]+)(\^|\]|\))')
         
-        for para in iter_document_paragraphs(self.doc):
-            # Iterate runs safely with index since we might modify list
-            i = 0
-            while i < len(para.runs):
-                run = para.runs[i]
-                original_text = run.text
+        for para in self._paragraphs():
+            # Snapshot the <w:r> children once; runs created by a split are
+            # handled inline, so the paragraph is never re-walked.
+            for r_element in para._p.r_lst:
+                run = Run(r_element, para)
                 
-                # Check for Citation Pattern matches
-                match = citation_pattern.search(original_text)
-                
-                if match:
-                    # We found a match! We must split the run to style JUST the citation.
-                    start, end = match.span()
-                    
-                    pre_text = original_text[:start]
-                    match_text = original_text[start:end]
-                    post_text = original_text[end:]
-                    
-                    # Calculate replacement text
-                    # Regex Group 2 contains the numbers: [1-3] -> group 2="1-3"
-                    nums = get_numbers(match.group(2))
-                    new_nums = [mapping.get(n, n) for n in nums]
-                    # Format: 1-3
-                    converted_text = format_numbers(new_nums)
-                    
-                    # 1. Update Current Run -> Pre Text
-                    run.text = pre_text
-                    
-                    # 2. Insert Match Run
-                    new_run = para.add_run(converted_text)
-                    new_run.style = "cite_bib"
-                    new_run.font.superscript = True
+                while run is not None:
+                    original_text = run.text
                     
-                    # Move new_run to be after current run
-                    run._element.addnext(new_run._element)
+                    # Check for Citation Pattern matches
+                    match = _CITE_BRACKET_RE.search(original_text)
                     
-                    # 3. Insert Post Run (if exists)
-                    if post_text:
-                        post_run = para.add_run(post_text)
-                        # Copy original style/font props if possible? 
-                        # Ideally yes, but complex. Inheriting 'style' is good enough often.
-                        if run.style:
-                            post_run.style = run.style
+                    if match:
+                        # We found a match! We must split the run to style JUST the citation.
+                        start, end = match.span()
+                        
+                        pre_text = original_text[:start]
+                        post_text = original_text[end:]
                         
-                        # Move post_run to be after new_run
-                        new_run._element.addnext(post_run._element)
+                        # Calculate replacement text
+                        # Regex Group 1 contains the numbers: [1-3] -> group 1="1-3"
+                        converted_text = convert(match.group(1))
                         
-                        # We don't advance i yet, or we assume post_run might have MORE citations?
-                        # If post_run has citations, we need to process it.
-                        # But we just inserted it at i+2 roughly.
-                        # The runs list might not update automatically for 'para.runs[i]' indexing if cached?
-                        # python-docx re-reads xml usually.
-                        # Let's verify 'para.runs' reflects changes. 
-                        # If it does, next iter will be new_run (styled) -> skip? 
-                        # Then post_run -> process.
+                        # 1. Update Current Run -> Pre Text
+                        run.text = pre_text
                         
-                    # We modified the document structure.
-                    # We should probably restart check on 'post_run' if we suspect multiple citations?
-                    # Simply incrementing i might land us on new_run or post_run.
-                    # Since we split current match, we should continue loop.
-                    # But index strategy is tricky if list changes.
-                    # Safer: Break and restart paragraph scan? Or just recursive?
-                    # Given simple needs: let's assuming one per run or use recursive replacement on string FIRST?
-                    # No, string replacement loses style boundaries.
-                    # Let's just break for this run and continue to next (which might be the post_run we just added).
-                    # Actually, if we use list(para.runs) iterator, it won't see new ones.
-                    # We are using while index.
+                        # 2. Insert Match Run right after the current run
+                        new_run = Run(OxmlElement('w:r'), para)
+                        new_run.text = converted_text
+                        new_run._r.style = cite_style_id
+                        new_run.font.superscript = True
+                        run._element.addnext(new_run._element)
+                        
+                        # 3. Insert Post Run (if exists) after the citation.
+                        # It may hold more citations, so it is scanned next.
+                        if post_text:
+                            post_run = Run(OxmlElement('w:r'), para)
+                            post_run.text = post_text
+                            # Inheriting the character 'style' is good enough here
+                            post_run._r.style = run._r.style
+                            new_run._element.addnext(post_run._element)
+                            run = post_run
+                        else:
+                            run = None
                     
-                    # Logic: 
-                    # i = current (now pre)
-                    # i+1 = new_run (styled)
-                    # i+2 = post_run
-                    # We want to continue checking from i+2.
-                    i += 1 # Skip new_run
-                    if post_text:
-                         # We want to check post_run next.
-                         # i is now new_run index. i+1 is post_run.
-                         # loop continues, i becomes i+1.
-                         pass
-                    else:
-                         # No post run. i is new_run.
-                         pass
+                    elif is_citation_run(_run_record(run._r, resolve_style)):
+                        # Existing formatted citation (superscript without brackets):
+                        # just update the numbers and enforce the style.
+                        converted_text = convert(run.text)
+                        if converted_text:
+                            run.text = converted_text
+                            run._r.style = cite_style_id
+                            run.font.superscript = True
+                        run = None
                     
-                    i += 1
-                    continue
-                
-                elif is_citation_run(run):
-                    # Existing formatted citation logic (likely superscripts without brackets)
-                    # If it's already styled/superscript, we just update numbers.
-                    current_group = [run]
-                    # check next runs? (Group logic from original code was complex)
-                    # For simplicty, let's just update this single run if it stands alone.
-                    # The original code grouped multiple runs.
-                    # We can keep that logic if we assume they are contiguous.
-                    # But mixing with the splitting logic above is hard.
-                    
-                    # If valid citation run, just update text.
-                    txt = run.text
-                    nums = get_numbers(txt)
-                    if nums:
-                         new_nums = [mapping.get(n, n) for n in nums]
-                         run.text = format_numbers(new_nums)
-                         # Ensure style is enforced
-                         run.style = "cite_bib"
-                         run.font.superscript = True
-                
-                i += 1
+                    else:
+                        run = None
 
         # 2. Reorder Bibliography
         _, ref_objects = self.get_references_in_bibliography()
@@ -483,72 +736,82 @@ class ReferenceProcessor:
         if not ref_objects:
             return mapping
 
-        # Find anchor (min index)
+        # Find anchor (min index) in one pass over the body
         body = self.doc._element.body
+        bib_elements = {obj['para']._element for obj in ref_objects}
+        anchor = next((k for k, child in enumerate(body) if child in bib_elements), None)
         
-        indices = []
-        for obj in ref_objects:
-            try:
-                idx = body.index(obj['para']._element)
-                indices.append(idx)
-            except ValueError:
-                pass 
-        
-        if not indices:
+        if anchor is None:
             return mapping
-            
-        anchor = min(indices)
         
-        # Remove all
+        # Remove all (the cached paragraph order is stale from here on)
+        self._invalidate_paragraphs()
         for obj in ref_objects:
              p = obj['para']._element
              if p.getparent() == body:
                  body.remove(p)
                  
-        # Insert Cited (Sorted)
+        # Cited (Sorted), then Uncited appended after cited
         cited_refs.sort(key=lambda x: x['new_id'])
         
-        insert_idx = anchor
         for obj in cited_refs:
             # Update ID text
             if obj['run']:
                 obj['run'].text = str(obj['new_id'])
-            
-            body.insert(insert_idx, obj['para']._element)
-            insert_idx += 1
-            
-        # Insert Uncited (Appended after cited)
-        for obj in uncited_refs:
-            body.insert(insert_idx, obj['para']._element)
-            insert_idx += 1
+        
+        # Every removed entry sat at or after the anchor, so the slice
+        # position is still valid; insert them all in one splice.
+        body[anchor:anchor] = [obj['para']._element for obj in cited_refs + uncited_refs]
             
         return mapping
 
 
+class StreamedReferenceProcessor(ReferenceChecker):
+    """
+    Validation-only ReferenceChecker fed by stream_docx_paragraphs(); renumbering
+    needs the Document-backed ReferenceProcessor.
+    """
+
+    def __init__(self, file):
+        super().__init__()
+        self._records, body_paragraphs = stream_docx_paragraphs(file)
+        self._bib_paragraphs = [(p, p) for p in body_paragraphs
+                                if p.style and p.style.name == "REF-N"]
+
+    def _paragraph_records(self):
+        return self._records
+
+    def _bibliography_paragraphs(self):
+        return self._bib_paragraphs
+
+
 def process_document(file):
-    doc = Document(file)
-    processor = ReferenceProcessor(doc)
-    
-    # Check BEFORE
-    before_stats = processor.get_validation_stats()
+    # Check BEFORE straight from the XML; a python-docx Document is only
+    # built when we go on to renumber. doc is None when nothing was changed.
+    checker = StreamedReferenceProcessor(file)
+    before_stats = checker.get_validation_stats()
     
     # DECISION:
     # 1. If Unused References exist -> ABORT renumbering.
     if before_stats["unused_references"]:
-        return doc, before_stats, before_stats, {}, "Aborted: Document validation failed due to unused references."
+        return None, before_stats, before_stats, {}, "Aborted: Document validation failed due to unused references."
 
     # 2. If Perfect -> No need.
     if before_stats["is_perfect"]:
-        return doc, before_stats, before_stats, {}, "Validation completed."
+        return None, before_stats, before_stats, {}, "Validation completed."
         
     # 3. If Missing Refs -> Can't safely renumber usually
     if before_stats["missing_references"]:
-         return doc, before_stats, before_stats, {}, "Aborted: Missing references detected."
+         return None, before_stats, before_stats, {}, "Aborted: Missing references detected."
 
     # DO RENUMBER
+    if hasattr(file, "seek"):
+        file.seek(0)
+    doc = Document(file)
+    processor = ReferenceProcessor(doc, duplicate_scores=checker.duplicate_scores)
     mapping = processor.renumber()
     
-    # Check AFTER (Validate result)
+    # Check AFTER (Validate result); duplicate scores carry over from BEFORE
     after_stats = processor.get_validation_stats()
     
     # Determine status message
@@ -571,6 +834,13 @@ def process_document(file):
     return doc, before_stats, after_stats, mapping, status_msg
 
 
+def dump_stats(stats):
+    """Validation stats as indented JSON for the text report."""
+    if orjson is not None:
+        return orjson.dumps(stats, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(stats, indent=2, ensure_ascii=False)
+
+
 # =====================================================
 # Flask Routes
 # =====================================================
@@ -592,14 +862,19 @@ def process():
         doc_path = os.path.join(UPLOAD_DIR, f"{base}_renumbered.docx")
         report_path = os.path.join(UPLOAD_DIR, f"{base}_validation.txt")
 
-        doc.save(doc_path)
+        if doc is None:
+            # Validation only: the upload is returned unchanged
+            file.stream.seek(0)
+            file.save(doc_path)
+        else:
+            doc.save(doc_path)
 
         with open(report_path, "w", encoding="utf-8") as f:
             f.write(f"STATUS: {status_msg}\n")
             f.write("VALIDATION BEFORE\n")
-            f.write(str(before) + "\n\n")
+            f.write(dump_stats(before) + "\n\n")
             f.write("VALIDATION AFTER\n")
-            f.write(str(after) + "\n\n")
+            f.write(dump_stats(after) + "\n\n")
             if mapping:
                 f.write("RENUMBERING MAPPING (Old -> New)\n")
                 for old, new in sorted(mapping.items(), key=lambda x: x[1]):
@@ -631,9 +906,9 @@ def process():
         with open(html_report_path, "w", encoding="utf-8") as f:
             f.write(html_content)
 
-        with zipfile.ZipFile(zip_path, 'w') as zf:
-             # Add Doc
-             zf.write(doc_path, arcname=os.path.basename(doc_path))
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+             # Add Doc (already compressed internally, so store it as is)
+             zf.write(doc_path, arcname=os.path.basename(doc_path), compress_type=zipfile.ZIP_STORED)
              # Add Text Report
              zf.write(report_path, arcname=os.path.basename(report_path))
              # Add HTML Report
@@ -673,8 +948,11 @@ def process():
 
 @app.route("/download/<path:filename>")
 def download_file(filename):
-    # Security: Ensure filename is in UPLOAD_DIR
-    return send_file(os.path.join(UPLOAD_DIR, filename), as_attachment=True)
+    # send_from_directory rejects paths escaping UPLOAD_DIR, serves through
+    # wsgi.file_wrapper (sendfile) and answers conditional/range requests.
+    # UPLOAD_DIR is made absolute: relative paths would resolve against the app root.
+    return send_from_directory(os.path.abspath(UPLOAD_DIR), filename, as_attachment=True,
+                               conditional=True, max_age=0)
 
 
 if __name__ == "__main__":
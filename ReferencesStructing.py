@@ -22,14 +22,32 @@ from datetime import datetime
 import logging
 from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
+from urllib3.util import make_headers
 from urllib3.util.retry import Retry
 from xml.etree import ElementTree as ET
+from lxml import etree as LET
 from docx import Document
 from docx.enum.style import WD_STYLE_TYPE
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
-from difflib import SequenceMatcher
+from rapidfuzz import fuzz
+from rapidfuzz.process import extractOne
+from duplicate_scoring import (
+    DUPLICATE_SCORE_CUTOFF, DUPLICATE_LSH_MIN_REFS, DUPLICATE_SHINGLE_SIZE,
+    DUPLICATE_LSH_THRESHOLD, DUPLICATE_LSH_NUM_PERM, length_window_pairs,
+)
+try:
+    from datasketch import MinHash, MinHashLSH
+except ImportError:  # optional: without it find_duplicates scores every pair
+    MinHash = MinHashLSH = None
+try:
+    import ahocorasick
+except ImportError:  # optional: without it journal names are matched key by key
+    ahocorasick = None
 from typing import Optional, Tuple, Dict, Any, List
+from collections import OrderedDict
+from functools import lru_cache
+from bisect import bisect_right
 import urllib.parse
 import time
 import uuid
@@ -46,6 +64,16 @@ import html
 CROSSREF_TIMEOUT = 12
 PUBMED_TIMEOUT = 30
 CROSSREF_ROWS = 6
+PUBMED_EFETCH_BATCH = 200  # PMIDs per efetch request
+
+# PubMed XML is parsed with lxml; the DOCTYPE's DTD is never fetched
+PUBMED_XML_PARSER = LET.XMLParser(resolve_entities=False, no_network=True)
+
+# Parsed PubMed records kept in memory (least recently used dropped first), so
+# repeat lookups skip re-parsing the cached XML text. Callers only read them.
+PUBMED_PARSED_CACHE_SIZE = 2048
+_PARSED_PUBMED: "OrderedDict[str, LET._Element]" = OrderedDict()
+_PARSED_PUBMED_LOCK = threading.Lock()
 
 # thresholds
 # thresholds
@@ -56,47 +84,131 @@ PREF_DOI_THRESHOLD = 0.5   # prefer DOI source if similarity >= this
 # CACHE LOGIC
 # -------------------------
 import json
-import atexit
-
+import os
+import sqlite3
+from contextlib import closing
+try:
+    import orjson
+except ImportError:  # optional: cache values are then encoded with json
+    orjson = None
+
+# Entries live in SQLite, one row per lookup, written as they are fetched.
+# REF_CACHE_FILE is the old whole-file JSON cache, imported once.
 REF_CACHE_FILE = Path("ref_cache.json")
-REF_CACHE = {
-    "crossref_doi": {},
-    "crossref_search": {},
-    "pubmed_search": {},
-    "pubmed_fetch": {},
-    "journal_abbrev": {}
-}
+REF_CACHE_DB = Path("ref_cache.sqlite")
+REF_CACHE_NAMESPACES = ("crossref_doi", "crossref_search", "pubmed_search", "pubmed_fetch")
 CACHE_LOCK = threading.Lock()
 
-def load_ref_cache():
-    global REF_CACHE
-    if REF_CACHE_FILE.exists():
+_cache_local = threading.local()
+# Connections inherited over fork(); SQLite must not use or close them in the child
+_inherited_cache_connections = []
+
+def _cache_dumps(value: Any):
+    return orjson.dumps(value) if orjson is not None else json.dumps(value)
+
+def _cache_loads(data) -> Any:
+    # Rows may hold orjson bytes or json text; both decoders accept either
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def _open_cache_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(str(REF_CACHE_DB), isolation_level=None, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def _cache_connection() -> sqlite3.Connection:
+    """This thread's connection to the cache database."""
+    conn = getattr(_cache_local, 'conn', None)
+    if conn is not None and _cache_local.pid != os.getpid():
+        _inherited_cache_connections.append(conn)
+        conn = None
+    if conn is None:
+        conn = _open_cache_db()
+        _cache_local.conn = conn
+        _cache_local.pid = os.getpid()
+    return conn
+
+class CacheTable:
+    """
+    Dict-style access to one cache namespace; values are stored as JSON
+    (encoded with orjson when it is installed).
+    A database error never fails a lookup: reads miss and writes (also of
+    values JSON cannot encode) are dropped.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def _value_row(self, key: str):
+        try:
+            return _cache_connection().execute(f"SELECT value FROM {self.name} WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.debug("Cache read failed (%s): %s", self.name, e)
+            return None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._value_row(key)
+        return _cache_loads(row[0]) if row else default
+
+    def __contains__(self, key: str) -> bool:
+        return self._value_row(key) is not None
+
+    def __getitem__(self, key: str) -> Any:
+        row = self._value_row(key)
+        if row is None:
+            raise KeyError(key)
+        return _cache_loads(row[0])
+
+    def __setitem__(self, key: str, value: Any) -> None:
         try:
-            with open(REF_CACHE_FILE, 'r', encoding='utf-8') as f:
-                loaded = json.load(f)
-                # merge to ensure all keys exist
-                for k in REF_CACHE:
-                    if k in loaded:
-                        REF_CACHE[k] = loaded[k]
-            print(f"[Info] Loaded ref_cache.json with {sum(len(v) for v in REF_CACHE.values())} entries.")
-        except Exception as e:
-            print(f"[Warning] Failed to load ref_cache.json: {e}")
-
-def save_ref_cache():
+            _cache_connection().execute(f"INSERT OR REPLACE INTO {self.name} (key, value) VALUES (?, ?)",
+                                        (key, _cache_dumps(value)))
+        except (sqlite3.Error, TypeError, ValueError) as e:  # includes values JSON cannot encode
+            logger.debug("Cache write failed (%s): %s", self.name, e)
+
+    def __len__(self) -> int:
+        return _cache_connection().execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0]
+
+    def clear(self) -> None:
+        _cache_connection().execute(f"DELETE FROM {self.name}")
+
+REF_CACHE = {name: CacheTable(name) for name in REF_CACHE_NAMESPACES}
+
+def load_ref_cache():
+    """Create the cache tables, importing ref_cache.json when the database is new."""
     try:
-        with open(REF_CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(REF_CACHE, f, indent=2)
-        print("[Info] Saved ref_cache.json.")
+        # A short-lived connection: nothing stays open across a later fork()
+        with closing(_open_cache_db()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for name in REF_CACHE_NAMESPACES:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {name} (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+            imported = 0
+            if not existing and REF_CACHE_FILE.exists():
+                with open(REF_CACHE_FILE, 'rb') as f:
+                    loaded = _cache_loads(f.read())
+                for name in REF_CACHE_NAMESPACES:
+                    rows = [(k, _cache_dumps(v)) for k, v in (loaded.get(name) or {}).items()]
+                    conn.executemany(f"INSERT OR REPLACE INTO {name} (key, value) VALUES (?, ?)", rows)
+                    imported += len(rows)
+            conn.execute("COMMIT")
+        if imported:
+            print(f"[Info] Imported {imported} entries from ref_cache.json into {REF_CACHE_DB}.")
     except Exception as e:
-        print(f"[Warning] Failed to save ref_cache.json: {e}")
+        print(f"[Warning] Failed to open {REF_CACHE_DB}: {e}")
 
-# Load cache on startup
+# Create/migrate the cache on startup; entries are written as they arrive
 load_ref_cache()
-# Save on exit
-atexit.register(save_ref_cache)
 
 # NCBI E-utilities base
 NCBI_BASE = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+# NCBI allows 3 requests/second without an API key, so at most this many
+# E-utilities calls are in flight however many references run at once
+NCBI_MAX_CONCURRENT = 3
+NCBI_SEMAPHORE = threading.BoundedSemaphore(NCBI_MAX_CONCURRENT)
+
+# References looked up in parallel (CrossRef takes the full width)
+REFERENCE_WORKERS = 16
 
 # Logging
 logger = logging.getLogger(__name__)
@@ -111,24 +223,83 @@ def get_requests_session() -> requests.Session:
     retries = Retry(total=5, backoff_factor=1.0,
                     status_forcelist=(429, 500, 502, 503, 504),
                     allowed_methods=frozenset(['GET', 'POST', 'HEAD']))
-    adapter = HTTPAdapter(max_retries=retries, pool_connections=25, pool_maxsize=25)
+    # Reference workers and CROSSREF_EXECUTOR can both be talking to CrossRef
+    adapter = HTTPAdapter(max_retries=retries, pool_connections=25, pool_maxsize=2 * REFERENCE_WORKERS)
     session.mount('https://', adapter)
     session.mount('http://', adapter)
-    session.headers.update({'User-Agent': 'refboth/1.0 (+https://example.org)'})
+    # Ask for compressed responses in every encoding urllib3 can decode here
+    # (gzip/deflate, plus br and zstd when brotli/zstandard are installed)
+    session.headers.update({'User-Agent': 'refboth/1.0 (+https://example.org)',
+                            'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding']})
     return session
 
 SESSION = get_requests_session()
 
+def _new_crossref_executor() -> concurrent.futures.ThreadPoolExecutor:
+    return concurrent.futures.ThreadPoolExecutor(max_workers=REFERENCE_WORKERS, thread_name_prefix='crossref')
+
+# CrossRef searches (and URL checks) run here, overlapping each reference's PubMed lookups
+CROSSREF_EXECUTOR = _new_crossref_executor()
+
+def _replace_crossref_executor() -> None:
+    # A forked batch worker inherits the parent's pool but none of its threads;
+    # the pool counts them as idle, never starts new ones, and every result() blocks
+    global CROSSREF_EXECUTOR
+    CROSSREF_EXECUTOR = _new_crossref_executor()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_replace_crossref_executor)
+
+def ncbi_request(method: str, endpoint: str, **kwargs) -> requests.Response:
+    """SESSION request to an E-utilities endpoint, throttled by NCBI_SEMAPHORE."""
+    with NCBI_SEMAPHORE:
+        return SESSION.request(method, f"{NCBI_BASE}/{endpoint}", timeout=PUBMED_TIMEOUT, **kwargs)
+
 # -------------------------
 # Utility helpers
 # -------------------------
 doi_regex = re.compile(r"10\.\d{4,9}/[-._;()/:A-Za-z0-9]+", re.IGNORECASE)
 doi_full_regex = re.compile(r"^10\.\d{4,9}/[-._;()/:A-Za-z0-9]+$", re.IGNORECASE)
+year_regex = re.compile(r'\b(19|20)\d{2}\b')
+sentence_split_regex = re.compile(r'\.\s+')
+# leading reference number "1. " (AMA parsing)
+ama_number_regex = re.compile(r'^\d+\.\s*')
+# Authors (Year). Title. Journal, ...
+apa_reference_regex = re.compile(
+    r'^(?P<authors>.+?)\s*\((?P<year>\d{4})\)\.\s*'
+    r'(?P<title>.+?)\.\s*'
+    r'(?P<journal>[^,\.]+)'
+)
+initials_split_regex = re.compile(r'[ \-]')
 
 def normalize_whitespace(s: Optional[str]) -> str:
     if not s:
         return ""
-    return re.sub(r'\s+', ' ', s).strip()
+    if isinstance(s, str):
+        return _normalize_whitespace_cached(s)
+    return ' '.join(s.split())
+
+@lru_cache(maxsize=8192)
+def _normalize_whitespace_cached(s: str) -> str:
+    # str.split() collapses runs of whitespace and trims the ends in C;
+    # cached because the same titles come back across candidate loops
+    return ' '.join(s.split())
+
+def _strip_leading_number(s: str) -> str:
+    # Drops leading numbering like "1. " or "[1] " (same as
+    # re.sub(r'^\[?\d+\]?[\.\s]*', '', s), without the regex engine)
+    n = len(s)
+    i = 1 if s[:1] == '[' else 0
+    j = i
+    while j < n and s[j].isdecimal():
+        j += 1
+    if j == i:
+        return s
+    if j < n and s[j] == ']':
+        j += 1
+    while j < n and (s[j] == '.' or s[j].isspace()):
+        j += 1
+    return s[j:]
 
 def extract_doi_from_text(s: str) -> Optional[str]:
     m = doi_regex.search(s)
@@ -144,32 +315,88 @@ def is_url(s: str) -> bool:
     except:
         return False
 
+# Hosts whose URLs we build from API metadata ourselves; never requested
+TRUSTED_URL_HOSTS = frozenset({'api.crossref.org', 'www.ncbi.nlm.nih.gov', 'pubmed.ncbi.nlm.nih.gov'})
+# DOI resolvers answer 3xx for a registered DOI and 404 otherwise, so the
+# publisher's site (often slow, or refusing HEAD) does not need to be reached
+DOI_RESOLVER_HOSTS = frozenset({'doi.org', 'dx.doi.org'})
+
+# URL check results kept in memory (least recently used dropped first)
+URL_CHECK_CACHE_SIZE = 4096
+_URL_CHECKS: "OrderedDict[str, bool]" = OrderedDict()
+_URL_CHECKS_LOCK = threading.Lock()
+
 def validate_url(url: str, timeout: int = 5) -> bool:
     if not url:
         return False
+    with _URL_CHECKS_LOCK:
+        ok = _URL_CHECKS.get(url)
+        if ok is not None:
+            _URL_CHECKS.move_to_end(url)
+            return ok
+    host = urllib.parse.urlparse(url).netloc.lower()
+    if host in TRUSTED_URL_HOSTS:
+        return True
     try:
-        r = SESSION.head(url, timeout=timeout, allow_redirects=True)
+        r = SESSION.head(url, timeout=timeout, allow_redirects=host not in DOI_RESOLVER_HOSTS)
         if r.status_code == 405:
             r = SESSION.get(url, timeout=timeout, stream=True)
             r.close()
-        return 200 <= r.status_code < 400
+        ok = 200 <= r.status_code < 400
     except (RequestException, Exception):
-        # On error, assume valid to avoid blocking
+        # On error, assume valid to avoid blocking (not cached: may be transient)
         return True
-
-def similarity(a: str, b: str) -> float:
+    with _URL_CHECKS_LOCK:
+        _URL_CHECKS[url] = ok
+        _URL_CHECKS.move_to_end(url)
+        while len(_URL_CHECKS) > URL_CHECK_CACHE_SIZE:
+            _URL_CHECKS.popitem(last=False)
+    return ok
+
+def similarity(a: str, b: str, score_cutoff: float = 0.0) -> float:
+    # Scores below score_cutoff come back as 0.0; rapidfuzz then rejects on
+    # length and character counts before running the full comparison.
     if not a or not b:
         return 0.0
-    return SequenceMatcher(None, normalize_whitespace(a.lower()), normalize_whitespace(b.lower())).ratio()
+    a = normalize_whitespace(a.lower())
+    b = normalize_whitespace(b.lower())
+    # ratio is symmetric, so (a, b) and (b, a) share a cache slot
+    if b < a:
+        a, b = b, a
+    return _similarity_cached(a, b, score_cutoff)
+
+@lru_cache(maxsize=16384)
+def _similarity_cached(a: str, b: str, score_cutoff: float) -> float:
+    return fuzz.ratio(a, b, score_cutoff=score_cutoff * 100) / 100.0
+
+def _similarity_norm(a: str, b: str) -> float:
+    # similarity() for strings already passed through normalize_whitespace().lower()
+    if not a or not b:
+        return 0.0
+    return fuzz.ratio(a, b) / 100.0
+
+def _norm_title(item: Dict[str, Any]) -> str:
+    return normalize_whitespace((item.get('title') or [''])[0]).lower()
+
+def duplicate_candidate_pairs(texts: List[str]) -> List[Tuple[int, int]]:
+    """(i, j) index pairs, i < j, whose character shingles collide in MinHash LSH."""
+    k = DUPLICATE_SHINGLE_SIZE
+    lsh = MinHashLSH(threshold=DUPLICATE_LSH_THRESHOLD, num_perm=DUPLICATE_LSH_NUM_PERM)
+    hashes = []
+    for i, text in enumerate(texts):
+        shingles = {text[p:p + k] for p in range(len(text) - k + 1)} or {text}
+        mh = MinHash(num_perm=DUPLICATE_LSH_NUM_PERM)
+        mh.update_batch([sh.encode('utf8') for sh in shingles])
+        lsh.insert(i, mh)
+        hashes.append(mh)
+    return [(i, j) for i, mh in enumerate(hashes) for j in sorted(lsh.query(mh)) if j > i]
 
 # Ported from Referencenumvalidation.py
 def find_duplicates(ref_objects):
         """
-        Finds duplicate references using fuzzy matching (difflib).
+        Finds duplicate references using fuzzy matching (rapidfuzz ratio).
         Returns a list of dicts: {'id': int, 'text': str, 'duplicate_of': int, 'score': float}
         """
-        import difflib
-        
         duplicates = []
         processed_refs = [] # list of (id, clean_text)
         
@@ -189,35 +416,39 @@ def find_duplicates(ref_objects):
                  continue
 
             # Remove leading numbering like "1. ", "[1] "
-            clean_text = re.sub(r'^\[?\d+\]?[\.\s]*', '', full_text)
+            clean_text = _strip_leading_number(full_text)
             
             # Use index or explicit ID
             rid = obj.get('id') if isinstance(obj, dict) else len(processed_refs) + 1
             processed_refs.append({'id': rid, 'text': clean_text})
             
-        # 2. Compare O(N^2)
+        # 2. Score pairs: every length-compatible pair, block by block in cdist;
+        #    very large bibliographies score only LSH candidates (needs datasketch)
         n = len(processed_refs)
-        for i in range(n):
+        if n < 2:
+            return duplicates
+        texts = [ref['text'] for ref in processed_refs]
+        if MinHashLSH is None or n < DUPLICATE_LSH_MIN_REFS:
+            scored = zip(*length_window_pairs(texts))
+        else:
+            scored = ((i, j, fuzz.ratio(texts[i], texts[j], score_cutoff=DUPLICATE_SCORE_CUTOFF))
+                      for i, j in duplicate_candidate_pairs(texts))
+
+        for i, j, score in scored:
             ref_a = processed_refs[i]
-            for j in range(i + 1, n):
-                ref_b = processed_refs[j]
-                
-                len_a = len(ref_a['text'])
-                len_b = len(ref_b['text'])
-                if len_a == 0 or len_b == 0: continue
-                    
-                if min(len_a, len_b) / max(len_a, len_b) < 0.6:
-                    continue
-                    
-                ratio = difflib.SequenceMatcher(None, ref_a['text'], ref_b['text']).ratio()
+            ref_b = processed_refs[j]
+            
+            len_a = len(ref_a['text'])
+            len_b = len(ref_b['text'])
+            if len_a == 0 or len_b == 0: continue
                 
-                if ratio > 0.85:
-                    duplicates.append({
-                        'id': ref_b['id'], 
-                        'text': ref_b['text'][:100] + "...",
-                        'duplicate_of': ref_a['id'],
-                        'score': round(ratio * 100, 1)
-                    })
+            if score > DUPLICATE_SCORE_CUTOFF:
+                duplicates.append({
+                    'id': ref_b['id'], 
+                    'text': ref_b['text'][:100] + "...",
+                    'duplicate_of': ref_a['id'],
+                    'score': round(score, 1)
+                })
                     
         return duplicates
 
@@ -243,6 +474,40 @@ def crossref_get_by_doi(doi: str) -> Optional[Dict[str, Any]]:
         return None
     return None
 
+# Searches in flight, by (cache namespace, cache key)
+_INFLIGHT: Dict[Tuple[str, str], concurrent.futures.Future] = {}
+
+def _coalesce_search(namespace: str, cache_key: str, search) -> Any:
+    """
+    Run search() for a cache miss, unless another thread is already running the
+    same search; then wait for that one instead of sending a second request.
+    Waiters read the result back from the cache so no two callers share objects.
+    """
+    key = (namespace, cache_key)
+    with CACHE_LOCK:
+        future = _INFLIGHT.get(key)
+        running = future is not None
+        if not running:
+            future = _INFLIGHT[key] = concurrent.futures.Future()
+    if running:
+        result = future.result()
+        return REF_CACHE[namespace].get(cache_key, result)
+
+    try:
+        # The search may have finished between the caller's cache check and here
+        result = REF_CACHE[namespace].get(cache_key)
+        if result is None:
+            result = search()
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with CACHE_LOCK:
+            del _INFLIGHT[key]
+
 def crossref_search(title: str, journal: Optional[str] = None, year: Optional[str] = None, rows: int = CROSSREF_ROWS) -> List[Dict[str, Any]]:
     # Cache Key Construction
     k_year = f"({year})" if year else ""
@@ -253,7 +518,11 @@ def crossref_search(title: str, journal: Optional[str] = None, year: Optional[st
     
     if cache_key in REF_CACHE['crossref_search']:
         return REF_CACHE['crossref_search'][cache_key]
+    return _coalesce_search('crossref_search', cache_key,
+                           lambda: _crossref_search_uncached(title, journal, year, rows, cache_key))
 
+def _crossref_search_uncached(title: str, journal: Optional[str], year: Optional[str], rows: int,
+                              cache_key: str) -> List[Dict[str, Any]]:
     params = {'query.title': title, 'rows': rows}
     if journal:
         params['query.container-title'] = journal
@@ -274,18 +543,14 @@ def crossref_search(title: str, journal: Optional[str] = None, year: Optional[st
         return []
 
 def crossref_pick_best(title: str, candidates: List[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], float]:
+    # extractOne scans the candidates in C, keeps the first of equal scores
+    # and stops at an exact match, like the loop it replaced
     tnorm = normalize_whitespace(title).lower()
-    best = None
-    best_score = 0.0
-    for item in candidates:
-        ititle = (item.get('title') or [''])[0]
-        sc = similarity(tnorm, ititle or '')
-        if sc > best_score:
-            best_score = sc
-            best = item
-        if normalize_whitespace(ititle).lower() == tnorm:
-            return item, 1.0
-    return best, best_score
+    hit = extractOne(tnorm, [_norm_title(item) for item in candidates],
+                     scorer=fuzz.ratio, processor=None)
+    if hit is None or hit[1] <= 0:
+        return None, 0.0
+    return candidates[hit[2]], hit[1] / 100.0
 
 # -------------------------
 # PubMed helpers
@@ -299,7 +564,11 @@ def pubmed_search_ids(title: str, journal: Optional[str] = None, year: Optional[
 
     if cache_key in REF_CACHE['pubmed_search']:
         return REF_CACHE['pubmed_search'][cache_key]
+    return _coalesce_search('pubmed_search', cache_key,
+                           lambda: _pubmed_search_ids_uncached(title, journal, year, max_results, cache_key))
 
+def _pubmed_search_ids_uncached(title: str, journal: Optional[str], year: Optional[str], max_results: int,
+                                cache_key: str) -> List[str]:
     results = set()
     def truncate_title(t: str, max_words: int = 10) -> str:
         words = t.split()
@@ -312,7 +581,7 @@ def pubmed_search_ids(title: str, journal: Optional[str] = None, year: Optional[
         q = f'{title}[ti] AND {journal}[ta] AND {year}[dp]'
         params = {'db': 'pubmed', 'term': q, 'retmax': max_results, 'retmode': 'json'}
         try:
-            r = SESSION.get(f"{NCBI_BASE}/esearch.fcgi", params=params, timeout=PUBMED_TIMEOUT)
+            r = ncbi_request('GET', 'esearch.fcgi', params=params)
             r.raise_for_status()
             ids = r.json().get('esearchresult', {}).get('idlist', []) or []
             results.update(ids)
@@ -324,7 +593,7 @@ def pubmed_search_ids(title: str, journal: Optional[str] = None, year: Optional[
         q = f'{title}[ti] AND {year}[dp]'
         params = {'db': 'pubmed', 'term': q, 'retmax': max_results, 'retmode': 'json'}
         try:
-            r = SESSION.get(f"{NCBI_BASE}/esearch.fcgi", params=params, timeout=PUBMED_TIMEOUT)
+            r = ncbi_request('GET', 'esearch.fcgi', params=params)
             r.raise_for_status()
             ids = r.json().get('esearchresult', {}).get('idlist', []) or []
             results.update(ids)
@@ -336,7 +605,7 @@ def pubmed_search_ids(title: str, journal: Optional[str] = None, year: Optional[
         q = f'{title}[ti]'
         params = {'db': 'pubmed', 'term': q, 'retmax': max_results * 2, 'retmode': 'json'}
         try:
-            r = SESSION.get(f"{NCBI_BASE}/esearch.fcgi", params=params, timeout=PUBMED_TIMEOUT)
+            r = ncbi_request('GET', 'esearch.fcgi', params=params)
             r.raise_for_status()
             ids = r.json().get('esearchresult', {}).get('idlist', []) or []
             results.update(ids)
@@ -357,7 +626,7 @@ def pubmed_search_ids(title: str, journal: Optional[str] = None, year: Optional[
             q += f' AND {year}[dp]'
         params = {'db': 'pubmed', 'term': q, 'retmax': max_results * 2, 'retmode': 'json'}
         try:
-            r = SESSION.get(f"{NCBI_BASE}/esearch.fcgi", params=params, timeout=PUBMED_TIMEOUT)
+            r = ncbi_request('GET', 'esearch.fcgi', params=params)
             r.raise_for_status()
             ids = r.json().get('esearchresult', {}).get('idlist', []) or []
             results.update(ids)
@@ -374,7 +643,7 @@ def pubmed_search_ids(title: str, journal: Optional[str] = None, year: Optional[
                 q += f' AND {year}[dp]'
             params = {'db': 'pubmed', 'term': q, 'retmax': max_results * 2, 'retmode': 'json'}
             try:
-                r = SESSION.get(f"{NCBI_BASE}/esearch.fcgi", params=params, timeout=PUBMED_TIMEOUT)
+                r = ncbi_request('GET', 'esearch.fcgi', params=params)
                 r.raise_for_status()
                 ids = r.json().get('esearchresult', {}).get('idlist', []) or []
                 results.update(ids)
@@ -383,28 +652,76 @@ def pubmed_search_ids(title: str, journal: Optional[str] = None, year: Optional[
 
     return list(results)[:max_results * 2]
 
-def pubmed_fetch_xml(pubmed_id: str) -> Optional[ET.Element]:
-    if pubmed_id in REF_CACHE['pubmed_fetch']:
+def pubmed_fetch_xml(pubmed_id: str) -> Optional[LET._Element]:
+    return pubmed_fetch_xml_batch([pubmed_id]).get(pubmed_id)
+
+def _parsed_pubmed_get(pubmed_id: str) -> Optional[LET._Element]:
+    with _PARSED_PUBMED_LOCK:
+        record = _PARSED_PUBMED.get(pubmed_id)
+        if record is not None:
+            _PARSED_PUBMED.move_to_end(pubmed_id)
+        return record
+
+def _parsed_pubmed_put(pubmed_id: str, record: LET._Element) -> LET._Element:
+    with _PARSED_PUBMED_LOCK:
+        _PARSED_PUBMED[pubmed_id] = record
+        _PARSED_PUBMED.move_to_end(pubmed_id)
+        while len(_PARSED_PUBMED) > PUBMED_PARSED_CACHE_SIZE:
+            _PARSED_PUBMED.popitem(last=False)
+    return record
+
+def pubmed_fetch_xml_batch(pubmed_ids: List[str]) -> Dict[str, LET._Element]:
+    """
+    Fetch several PubMed records, PUBMED_EFETCH_BATCH ids per efetch call.
+    Returns {pmid: <PubmedArticleSet> holding just that record}; ids that could
+    not be fetched are missing. Records are cached one PMID at a time.
+    """
+    found = {}
+    missing = []
+    for pubmed_id in dict.fromkeys(pubmed_ids):
+        record = _parsed_pubmed_get(pubmed_id)
+        if record is not None:
+            found[pubmed_id] = record
+            continue
+        if pubmed_id in REF_CACHE['pubmed_fetch']:
+            try:
+                record = LET.fromstring(REF_CACHE['pubmed_fetch'][pubmed_id].encode('utf-8'),
+                                        PUBMED_XML_PARSER)
+                found[pubmed_id] = _parsed_pubmed_put(pubmed_id, record)
+                continue
+            except Exception:
+                pass
+        missing.append(pubmed_id)
+
+    for start in range(0, len(missing), PUBMED_EFETCH_BATCH):
+        batch = missing[start:start + PUBMED_EFETCH_BATCH]
+        # POST so long id lists do not hit URL length limits
+        data = {'db': 'pubmed', 'id': ','.join(batch), 'retmode': 'xml'}
         try:
-            return ET.fromstring(REF_CACHE['pubmed_fetch'][pubmed_id])
-        except Exception:
-            pass
+            r = ncbi_request('POST', 'efetch.fcgi', data=data)
+            r.raise_for_status()
+            # Verify XML before caching
+            root = LET.fromstring(r.content, PUBMED_XML_PARSER)
+        except RequestException:
+            logger.debug("PubMed efetch failed for ids: %s", ','.join(batch))
+            continue
+        except LET.XMLSyntaxError:
+            logger.debug("Failed to parse PubMed XML for ids: %s", ','.join(batch))
+            continue
 
-    params = {'db': 'pubmed', 'id': pubmed_id, 'retmode': 'xml'}
-    try:
-        r = SESSION.get(f"{NCBI_BASE}/efetch.fcgi", params=params, timeout=PUBMED_TIMEOUT)
-        r.raise_for_status()
-        # Verify XML before caching
-        root = ET.fromstring(r.text)
-        with CACHE_LOCK:
-            REF_CACHE['pubmed_fetch'][pubmed_id] = r.text
-        return root
-    except RequestException:
-        logger.debug("PubMed efetch failed for id: %s", pubmed_id)
-        return None
-    except ET.ParseError:
-        logger.debug("Failed to parse PubMed XML for id: %s", pubmed_id)
-        return None
+        # Split the set into one record per PMID (journal articles and books);
+        # append() moves each article out of root, so iterate over a copy
+        for article in list(root):
+            pubmed_id = article.findtext('MedlineCitation/PMID') or article.findtext('BookDocument/PMID')
+            if not pubmed_id or pubmed_id not in batch:
+                continue
+            record = LET.Element(root.tag)
+            record.append(article)
+            found[pubmed_id] = _parsed_pubmed_put(pubmed_id, record)
+            with CACHE_LOCK:
+                REF_CACHE['pubmed_fetch'][pubmed_id] = LET.tostring(record, encoding='unicode')
+
+    return found
 
 def search_google_books(query: str, author: Optional[str] = None, api_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
     base_url = "https://www.googleapis.com/books/v1/volumes"
@@ -440,47 +757,65 @@ def search_google_books(query: str, author: Optional[str] = None, api_key: Optio
         pass
     return None
 
-def pubmed_parse_article_from_xml(root: ET.Element) -> Optional[Dict[str, Any]]:
-    pa = root.find('.//PubmedArticle')
+# Compiled once; each returns a list of matches in document order
+_XP_PUBMED_ARTICLE = LET.XPath('.//PubmedArticle')
+_XP_ARTICLE_TITLE = LET.XPath('.//ArticleTitle')
+_XP_JOURNAL_TITLE = LET.XPath('.//Journal/Title')
+_XP_ISO_ABBREV = LET.XPath('.//Journal/ISOAbbreviation')
+_XP_VOLUME = LET.XPath('.//JournalIssue/Volume')
+_XP_ISSUE = LET.XPath('.//JournalIssue/Issue')
+_XP_PAGES = LET.XPath('.//Pagination/MedlinePgn')
+_XP_PUBDATE_YEAR = LET.XPath('.//Journal/JournalIssue/PubDate/Year')
+_XP_ARTICLE_DATE_YEAR = LET.XPath('.//ArticleDate/Year')
+_XP_MEDLINE_DATE = LET.XPath('.//Journal/JournalIssue/PubDate/MedlineDate')
+_XP_AUTHORS = LET.XPath('.//AuthorList/Author')
+_XP_ARTICLE_IDS = LET.XPath('.//ArticleIdList/ArticleId')
+
+def _xp_first(xpath, node):
+    found = xpath(node)
+    return found[0] if found else None
+
+def pubmed_parse_article_from_xml(root: LET._Element) -> Optional[Dict[str, Any]]:
+    pa = _xp_first(_XP_PUBMED_ARTICLE, root)
     if pa is None:
         return None
 
-    article_title_el = pa.find('.//ArticleTitle')
+    article_title_el = _xp_first(_XP_ARTICLE_TITLE, pa)
     if article_title_el is None:
         return None
     title = ''.join(article_title_el.itertext()).strip()
 
-    journal_el = pa.find('.//Journal/Title')
+    journal_el = _xp_first(_XP_JOURNAL_TITLE, pa)
     journal = journal_el.text.strip() if journal_el is not None and journal_el.text else ''
     
     # Extract ISO Abbreviation
-    iso_abbrev_el = pa.find('.//Journal/ISOAbbreviation')
+    iso_abbrev_el = _xp_first(_XP_ISO_ABBREV, pa)
     iso_abbrev = iso_abbrev_el.text.strip() if iso_abbrev_el is not None and iso_abbrev_el.text else ''
 
-    volume_el = pa.find('.//JournalIssue/Volume')
-    issue_el = pa.find('.//JournalIssue/Issue')
-    pages_el = pa.find('.//Pagination/MedlinePgn')
+    volume_el = _xp_first(_XP_VOLUME, pa)
+    issue_el = _xp_first(_XP_ISSUE, pa)
+    pages_el = _xp_first(_XP_PAGES, pa)
 
     volume = volume_el.text.strip() if volume_el is not None and volume_el.text else ''
     issue = issue_el.text.strip() if issue_el is not None and issue_el.text else ''
     pages = pages_el.text.strip() if pages_el is not None and pages_el.text else ''
 
     year = None
-    pubdate_year = pa.find('.//Journal/JournalIssue/PubDate/Year')
+    pubdate_year = _xp_first(_XP_PUBDATE_YEAR, pa)
     if pubdate_year is not None and pubdate_year.text:
         year = pubdate_year.text.strip()
     else:
-        artdate_year = pa.find('.//ArticleDate/Year')
+        artdate_year = _xp_first(_XP_ARTICLE_DATE_YEAR, pa)
         if artdate_year is not None and artdate_year.text:
             year = artdate_year.text.strip()
         else:
-            medline_date = pa.find('.//Journal/JournalIssue/PubDate/MedlineDate')
+            medline_date = _xp_first(_XP_MEDLINE_DATE, pa)
             if medline_date is not None and medline_date.text:
-                m = re.search(r'\b(19|20)\d{2}\b', medline_date.text)
+                m = year_regex.search(medline_date.text)
                 year = m.group(0) if m else None
 
     authors_list = []
-    for author_el in pa.findall('.//AuthorList/Author'):
+    for author_el in _XP_AUTHORS(pa):
         last = author_el.find('LastName')
         fore = author_el.find('ForeName')
         initial = author_el.find('Initials')
@@ -494,7 +829,7 @@ def pubmed_parse_article_from_xml(root: ET.Element) -> Optional[Dict[str, Any]]:
             authors_list.append({'given': given, 'family': family})
 
     doi = None
-    for aid in pa.findall('.//ArticleIdList/ArticleId'):
+    for aid in _XP_ARTICLE_IDS(pa):
         if aid.attrib.get('IdType', '').lower() == 'doi' and aid.text:
             doi = aid.text.strip()
             break
@@ -518,27 +853,69 @@ def pubmed_parse_article_from_xml(root: ET.Element) -> Optional[Dict[str, Any]]:
 def parse_ama_reference_raw(raw: str) -> Dict[str, Optional[str]]:
     s = normalize_whitespace(raw)
     # Remove leading numbering (e.g. "1. ", "2. ") which might be present
-    s = re.sub(r'^\d+\.\s*', '', s)
+    s = ama_number_regex.sub('', s)
 
-    parts = [p.strip() for p in re.split(r'\.\s+', s) if p.strip()]
+    parts = [p.strip() for p in sentence_split_regex.split(s) if p.strip()]
     authors = parts[0] if len(parts) > 0 else ''
     title = parts[1] if len(parts) > 1 else ''
     journal = parts[2] if len(parts) > 2 else ''
-    year_match = re.search(r'\b(19|20)\d{2}\b', raw)
+    year_match = year_regex.search(raw)
     year = year_match.group(0) if year_match else None
     journal = journal.rstrip('. ')
     return {'authors': authors, 'title': title, 'journal': journal, 'year': year}
 
+def _split_apa_reference(s: str) -> Optional[Dict[str, str]]:
+    """
+    Fast path for parse_apa_reference_raw on whitespace-normalised text: slices
+    "Authors (Year). Title. Journal, ..." around the first "(dddd)." with str.find.
+    Gives exactly what apa_reference_regex would, or None when the first year
+    does not lead to a match (the regex may still match at a later one).
+    """
+    i = s.find('(', 1)  # authors take at least one character
+    while i != -1:
+        year = s[i + 1:i + 5]
+        if s.startswith(').', i + 5) and len(year) == 4 and year.isdecimal():
+            break
+        i = s.find('(', i + 1)
+    else:
+        return None
+
+    n = len(s)
+    pos = i + 8 if s.startswith(' ', i + 7) else i + 7
+    # Title runs to the first dot (past its first character) followed by a journal
+    dot = s.find('.', pos + 1)
+    while dot != -1:
+        start = dot + 2 if s.startswith(' ', dot + 1) else dot + 1
+        if start < n and s[start] not in ',.':
+            comma = s.find(',', start)
+            end = s.find('.', start)
+            if end == -1 or -1 < comma < end:
+                end = comma
+            journal = s[start:end] if end != -1 else s[start:]
+            break
+        if start > dot + 1:
+            journal = ''  # only a space before the ',' / '.' / end
+            break
+        dot = s.find('.', dot + 1)
+    else:
+        return None
+
+    return {
+        'authors': s[:i].strip(),
+        'year': year,
+        'title': s[pos:dot].strip(),
+        'journal': journal.strip()
+    }
+
 def parse_apa_reference_raw(raw: str) -> Dict[str, Optional[str]]:
     s = normalize_whitespace(raw)
 
+    fields = _split_apa_reference(s)
+    if fields:
+        return fields
+
     # Improved APA pattern capturing Authors. (Year). Title. Journal, ...
-    m = re.match(
-        r'^(?P<authors>.+?)\s*\((?P<year>\d{4})\)\.\s*'
-        r'(?P<title>.+?)\.\s*'
-        r'(?P<journal>[^,\.]+)',
-        s
-    )
+    m = apa_reference_regex.match(s)
     if m:
         return {
             'authors': m.group('authors').strip(),
@@ -549,7 +926,7 @@ def parse_apa_reference_raw(raw: str) -> Dict[str, Optional[str]]:
 
     # Fallback parsing
     parts = [p.strip() for p in s.split('.') if p.strip()]
-    year_match = re.search(r'\b(19|20)\d{2}\b', s)
+    year_match = year_regex.search(s)
     return {
         'authors': parts[0] if len(parts) > 0 else '',
         'title': parts[1] if len(parts) > 1 else '',
@@ -563,26 +940,27 @@ def parse_apa_reference_raw(raw: str) -> Dict[str, Optional[str]]:
 def pick_best_between_pubmed_crossref(title: str,
                                      pubmed_items: List[Dict[str, Any]],
                                      crossref_items: List[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], str, float]:
+    tnorm = normalize_whitespace(title).lower()
     candidates = []
-    for cr in crossref_items:
-        ititle = (cr.get('title') or [''])[0]
-        doi = cr.get('DOI') or ''
-        candidates.append(('crossref', cr, ititle, doi))
-
-    for pm in pubmed_items:
-        ititle = (pm.get('title') or [''])[0]
-        doi = pm.get('DOI') or ''
-        candidates.append(('pubmed', pm, ititle, doi))
+    # Titles are normalised once here and reused by every comparison below.
+    # An exact title with a DOI scores the maximum (1.0 + the 0.06 DOI bonus)
+    # and the first one wins every tie, so it is returned without scoring the rest.
+    for src, items in (('crossref', crossref_items), ('pubmed', pubmed_items)):
+        for item in items:
+            inorm = _norm_title(item)
+            doi = item.get('DOI') or ''
+            if doi and tnorm and inorm == tnorm:
+                return item, src, 1.0 + 0.06
+            candidates.append((src, item, inorm, doi))
 
     if not candidates:
         return None, '', 0.0
 
-    tnorm = normalize_whitespace(title).lower()
     best_score = 0.0
     best = None
     best_source = ''
-    for src, obj, ititle, doi in candidates:
-        sc = similarity(tnorm, ititle or '')
+    for src, obj, inorm, doi in candidates:
+        sc = _similarity_norm(tnorm, inorm)
         if doi:
             sc += 0.06
         if sc > best_score:
@@ -596,8 +974,10 @@ def pick_best_between_pubmed_crossref(title: str,
     # If pubmed chosen but crossref has DOI and comparable score, prefer crossref
     if best_source == 'pubmed' and crossref_items:
         cr_best, cr_best_score = None, 0.0
-        for cr in crossref_items:
-            sc = similarity(tnorm, (cr.get('title') or [''])[0] or '')
+        for src, cr, inorm, doi in candidates:
+            if src != 'crossref':
+                continue
+            sc = _similarity_norm(tnorm, inorm)
             if sc > cr_best_score:
                 cr_best_score = sc
                 cr_best = cr
@@ -645,13 +1025,14 @@ def format_authors_apa(authors: List[Dict[str, str]]) -> str:
             parts.append(node)
     return ", ".join(parts)
 
+@lru_cache(maxsize=4096)
 def extract_initials(given_name: str) -> str:
     """Extract all initials from a given name string (e.g. 'John B.' -> 'JB')."""
     if not given_name:
         return ""
     # Filter for uppercase letters that are likely initials
     # or just take the first letter of each part separated by space/hyphen
-    parts = re.split(r'[ \-]', given_name)
+    parts = initials_split_regex.split(given_name)
     initials = []
     for p in parts:
         if p and p[0].isalpha():
@@ -694,10 +1075,59 @@ def format_authors_ama(authors: List[Dict[str, str]]) -> str:
         pass
     return "" # This function seems to be unused by main logic, we will check `generate_ama_citation`
 
+def _extract_year(item: Dict[str, Any], missing: str = 'n.d.') -> str:
+    """Year from 'created' then 'published-print' date-parts, else the scalar 'year', else `missing`."""
+    date_parts = None
+    created = item.get('created')
+    if created:
+        date_parts = created.get('date-parts')
+    if not date_parts:
+        printed = item.get('published-print')
+        if printed:
+            date_parts = printed.get('date-parts')
+    if date_parts and date_parts[0] and date_parts[0][0]:
+        return str(date_parts[0][0])
+    return item.get('year') or missing
+
+def _emit_pages(segments: List[Tuple[str, Optional[str]]], pages: str) -> None:
+    """Append a page range as first page, "-", last page (or a single first page)."""
+    dash = pages.find('-')
+    if dash < 0:
+        segments.append((pages, 'bib_fpage'))
+    else:
+        segments.append((pages[:dash], 'bib_fpage'))
+        segments.append(("-", None))
+        segments.append((pages[dash + 1:], 'bib_lpage'))
+
+@lru_cache(maxsize=4096)
+def _apa_author_segments(family: str, given: str) -> Tuple[Tuple[str, Optional[str]], ...]:
+    """Segments for one APA author, "Family, A. B." (cached: the same authors recur across references)."""
+    segments = []
+    if family:
+        segments.append((family, 'surname'))
+    if given:
+        segments.append((", ", None))
+        # FIX: Use all initials
+        # APA requires dots and spaces: extract_initials returns "AB", we need "A. B."
+        segments.append((". ".join(extract_initials(given)) + ".", 'fname'))
+    return tuple(segments)
+
+@lru_cache(maxsize=4096)
+def _ama_author_segments(family: str, given: str) -> Tuple[Tuple[str, Optional[str]], ...]:
+    """Segments for one AMA author, "Family AB" (cached like _apa_author_segments)."""
+    family = family.strip()
+    given = given.strip()
+    segments = []
+    if family:
+        segments.append((family, 'bib_surname'))
+    if given:
+        # AMA Use all initials
+        segments.extend(((" ", None), (extract_initials(given), 'bib_fname')))
+    return tuple(segments)
+
 def generate_apa_citation(item: Dict[str, Any]) -> List[Tuple[str, Optional[str]]]:
     ctype = item.get('type', 'journal-article')
-    date_parts = item.get('created', {}).get('date-parts') or item.get('published-print', {}).get('date-parts') or [[None]]
-    year = str(date_parts[0][0]) if date_parts[0][0] else (item.get('year') or 'n.d.')
+    year = _extract_year(item)
     title = (item.get('title') or ['No title available'])[0]
     container = (item.get('container-title') or [''])[0]
     volume = item.get('volume', '')
@@ -705,26 +1135,16 @@ def generate_apa_citation(item: Dict[str, Any]) -> List[Tuple[str, Optional[str]
     pages = item.get('page', '')
     doi = item.get('DOI', '')
     url = item.get('URL', '')
+    publisher = item.get('publisher', '')
+    authors_list = item.get('author', [])
 
     segments = []
     
     # --- Author Formatting (APA 7th) ---
     # Rule: <= 20 authors: list all. > 20: list first 19 ... last.
-    authors_list = item.get('author', [])
     
     def _add_author_to_segments(auth_obj):
-        family = auth_obj.get('family', '')
-        given = auth_obj.get('given', '')
-        if family:
-            segments.append((family, 'surname'))
-        if given:
-            segments.append((", ", None))
-            # FIX: Use all initials
-            initials_str = extract_initials(given)
-            # Add dots between initials?? APA requires dots and spaces: "A. B."
-            # extract_initials returns "AB". We need to format "A. B."
-            formatted_initials = ". ".join(list(initials_str)) + "."
-            segments.append((formatted_initials, 'fname'))
+        segments.extend(_apa_author_segments(auth_obj.get('family', ''), auth_obj.get('given', '')))
 
     if not authors_list:
         segments.append(("Unknown authors", 'bib_unpubl'))
@@ -767,7 +1187,6 @@ def generate_apa_citation(item: Dict[str, Any]) -> List[Tuple[str, Optional[str]
     segments.append((". ", None))
 
     if ctype == 'book':
-        publisher = item.get('publisher', '')
         if publisher:
             segments.append((publisher, 'bib_publisher'))
             segments.append((".", None))
@@ -777,18 +1196,12 @@ def generate_apa_citation(item: Dict[str, Any]) -> List[Tuple[str, Optional[str]
             segments.append((container, 'bib_confproceedings')) # or bib_conference
             if pages:
                 segments.append((" (pp. ", None))
-                if '-' in pages:
-                    parts = pages.split('-', 1)
-                    segments.append((parts[0], 'bib_fpage'))
-                    segments.append(("-", None))
-                    segments.append((parts[1], 'bib_lpage'))
-                else:
-                    segments.append((pages, 'bib_fpage'))
+                _emit_pages(segments, pages)
                 segments.append((")", None))
             segments.append((".", None))
-        if item.get('publisher'):
+        if publisher:
             segments.append((" ", None))
-            segments.append((item.get('publisher'), 'bib_publisher'))
+            segments.append((publisher, 'bib_publisher'))
             segments.append((".", None))
     elif ctype == 'web':
         if container:
@@ -808,13 +1221,7 @@ def generate_apa_citation(item: Dict[str, Any]) -> List[Tuple[str, Optional[str]
             segments.append((")", None))
         if pages:
             segments.append((", ", None))
-            if '-' in pages:
-                parts = pages.split('-', 1)
-                segments.append((parts[0], 'bib_fpage'))
-                segments.append(("-", None))
-                segments.append((parts[1], 'bib_lpage'))
-            else:
-                segments.append((pages, 'bib_fpage'))
+            _emit_pages(segments, pages)
         segments.append((".", None))
 
     if doi:
@@ -830,134 +1237,13 @@ def generate_apa_citation(item: Dict[str, Any]) -> List[Tuple[str, Optional[str]
 
     return segments
 
-def abbreviate_journal_name_basic(name: str) -> str:
-    if not name:
-        return "No journal available"
-        
-    name_norm = normalize_whitespace(name).lower()
-    if name_norm in REF_CACHE['journal_abbrev']:
-        return REF_CACHE['journal_abbrev'][name_norm]
-
-    mapping = {
-    "Journal of Virology": "J Virol",
-    "The Journal of Virology": "J Virol",
-    "journal of virology": "J Virol",
-    "The journal of virology": "J Virol",
-    "Journal of General Virology": "J Gen Virol",
-    "The Journal of General Virology": "J Gen Virol",
-    "journal of general virology": "J Gen Virol",
-    "The journal of general virology": "J Gen Virol",
-    "Nature Immunology": "Nat Immunol",
-    "nature immunology": "Nat Immunol",
-    "Thorax": "Thorax",
-    "thorax": "Thorax",
-    "Ultrasound in Obstetrics & Gynecology": "Ultrasound Obstet Gynecol",
-    "Ultrasound in Obstetrics and Gynecology": "Ultrasound Obstet Gynecol",
-    "Ultrasound Obstet Gynecol": "Ultrasound Obstet Gynecol",
-    "Prenatal Diagnosis": "Prenat Diagn",
-    "Prenatal diagnosis": "Prenat Diagn",
-    "American Journal of Perinatology": "Am J Perinat",
-    "American Journal of Obstetrics and Gynecology": "Am J Obstet Gynecol",
-    "American Journal of Obstetrics & Gynecology": "Am J Obstet Gynecol",
-    "Obstetrics and Gynecology": "Obstet Gynecol",
-    "Obstetrics &amp; Gynecology": "Obstet Gynecol",
-    "Journal of Ultrasound in Medicine": "J Ultrasound Med",
-    "Journal of Clinical Ultrasound": "J Clin Ultrasound",
-    "Current Opinion in Obstetrics &amp; Gynecology": "Curr Opin Obstet Gynecol",
-    "Current Opinion in Obstetrics & Gynecology": "Curr Opin Obstet Gynecol",
-    "Cochrane Database of Systematic Reviews": "Cochrane Database Syst Rev",
-    "New England Journal of Medicine": "N Engl J Med",
-    "The New England Journal of Medicine": "N Engl J Med",
-    "Journal of the American Medical Association": "JAMA",
-    "JAMA": "JAMA",
-    "The Lancet": "Lancet",
-    "British Medical Journal": "BMJ",
-    "Annals of Internal Medicine": "Ann Intern Med",
-    "Journal of Clinical Investigation": "J Clin Invest",
-    "Nature": "Nature",
-    "Science": "Science",
-    "Cell": "Cell",
-    "Proceedings of the National Academy of Sciences": "Proc Natl Acad Sci U S A",
-    "PNAS": "Proc Natl Acad Sci U S A",
-    "Journal of Immunology": "J Immunol",
-    "Blood": "Blood",
-    "Circulation": "Circulation",
-    "Journal of the American College of Cardiology": "J Am Coll Cardiol",
-    "Journal of the American Society of Nephrology": "J Am Soc Nephrol",
-    "JASN": "J Am Soc Nephrol",
-    "Frontiers in Neurology": "Front Neurol",
-    "Frontiers in Immunology": "Front Immunol",
-    "Neurology": "Neurology",
-    "Annals of Neurology": "Ann Neurol",
-    "JAMA Neurology": "JAMA Neurol",
-    "JAMA Psychiatry": "JAMA Psychiatry",
-    "JAMA Internal Medicine": "JAMA Intern Med",
-    "JAMA Surgery": "JAMA Surg",
-    "JAMA Pediatrics": "JAMA Pediatr",
-    "JAMA Ophthalmology": "JAMA Ophthalmol",
-    "JAMA Otolaryngology–Head & Neck Surgery": "JAMA Otolaryngol Head Neck Surg",
-    "JAMA Dermatology": "JAMA Dermatol",
-    "JAMA Cardiology": "JAMA Cardiol",
-    "JAMA Oncology": "JAMA Oncol",
-    "Journal of Neuroscience": "J Neurosci",
-    "Journal of Neuroinflammation": "J Neuroinflammation",
-    "Brain": "Brain",
-    "Brain Research": "Brain Res",
-    "Neuroscience": "Neuroscience",
-    "Nature Neuroscience": "Nat Neurosci",
-    "Nature Medicine": "Nat Med",
-    "Nature Reviews Neuroscience": "Nat Rev Neurosci",
-    "Science Translational Medicine": "Sci Transl Med",
-    "Journal of Clinical Oncology": "J Clin Oncol",
-    "Journal of the National Cancer Institute": "J Natl Cancer Inst",
-    "Cancer Research": "Cancer Res",
-    "Clinical Cancer Research": "Clin Cancer Res",
-    "American Journal of Respiratory and Critical Care Medicine": "Am J Respir Crit Care Med",
-    "Chest": "Chest",
-    "European Respiratory Journal": "Eur Respir J",
-    "Diabetes": "Diabetes",
-    "Diabetes Care": "Diabetes Care",
-    "Diabetologia": "Diabetologia",
-    "Journal of Clinical Endocrinology & Metabolism": "J Clin Endocrinol Metab",
-    "Endocrinology": "Endocrinology",
-    "Hepatology": "Hepatology",
-    "Journal of Hepatology": "J Hepatol",
-    "Gastroenterology": "Gastroenterology",
-    "Gut": "Gut",
-    "American Journal of Gastroenterology": "Am J Gastroenterol",
-    "Rheumatology": "Rheumatology",
-    "Annals of the Rheumatic Diseases": "Ann Rheum Dis",
-    "Arthritis & Rheumatology": "Arthritis Rheumatol",
-    "Kidney International": "Kidney Int",
-    "American Journal of Kidney Diseases": "Am J Kidney Dis",
-    "Clinical Journal of the American Society of Nephrology": "Clin J Am Soc Nephrol",
-    "Nephrology Dialysis Transplantation": "Nephrol Dial Transplant",
-    "Journal of the American Geriatrics Society": "J Am Geriatr Soc",
-    "Journal of Gerontology": "J Gerontol",
-    "Aging Cell": "Aging Cell",
-    "PLOS ONE": "PLoS One",
-    "PLOS Medicine": "PLoS Med",
-    "PLOS Biology": "PLoS Biol",
-    "BMC Medicine": "BMC Med",
-    "BMC Biology": "BMC Biol",
-    "Molecular Psychiatry": "Mol Psychiatry",
-    "Biological Psychiatry": "Biol Psychiatry",
-    "American Journal of Psychiatry": "Am J Psychiatry",
-    "Journal of Affective Disorders": "J Affect Disord",
-    "Schizophrenia Research": "Schizophr Res",
-    "Journal of Infectious Diseases": "J Infect Dis",
-    "Clinical Infectious Diseases": "Clin Infect Dis",
-    "The Journal of Infectious Diseases": "J Infect Dis",
-    "Emerging Infectious Diseases": "Emerg Infect Dis",
-    "Infection and Immunity": "Infect Immun",
-    "Vaccine": "Vaccine",
-    "Antimicrobial Agents and Chemotherapy": "Antimicrob Agents Chemother",
-    "Journal of Antimicrobial Chemotherapy": "J Antimicrob Chemother",
-    "Clinical Microbiology Reviews": "Clin Microbiol Rev",
-    "Journal of Clinical Microbiology": "J Clin Microbiol",
+# Lowercased journal title -> abbreviation, used by abbreviate_journal_name_basic
+# (lookups are case-insensitive, so each title is listed once)
+_JOURNAL_ABBREV_MAP = {
     "journal of virology": "J Virol",
     "the journal of virology": "J Virol",
     "journal of general virology": "J Gen Virol",
+    "the journal of general virology": "J Gen Virol",
     "nature immunology": "Nat Immunol",
     "thorax": "Thorax",
     "ultrasound in obstetrics & gynecology": "Ultrasound Obstet Gynecol",
@@ -968,13 +1254,14 @@ def abbreviate_journal_name_basic(name: str) -> str:
     "american journal of obstetrics and gynecology": "Am J Obstet Gynecol",
     "american journal of obstetrics & gynecology": "Am J Obstet Gynecol",
     "obstetrics and gynecology": "Obstet Gynecol",
-    "obstetrics & gynecology": "Obstet Gynecol",
+    "obstetrics &amp; gynecology": "Obstet Gynecol",
     "journal of ultrasound in medicine": "J Ultrasound Med",
     "journal of clinical ultrasound": "J Clin Ultrasound",
+    "current opinion in obstetrics &amp; gynecology": "Curr Opin Obstet Gynecol",
     "current opinion in obstetrics & gynecology": "Curr Opin Obstet Gynecol",
-    "current opinion in obstetrics and gynecology": "Curr Opin Obstet Gynecol",
     "cochrane database of systematic reviews": "Cochrane Database Syst Rev",
     "new england journal of medicine": "N Engl J Med",
+    "the new england journal of medicine": "N Engl J Med",
     "journal of the american medical association": "JAMA",
     "jama": "JAMA",
     "the lancet": "Lancet",
@@ -1054,6 +1341,7 @@ def abbreviate_journal_name_basic(name: str) -> str:
     "schizophrenia research": "Schizophr Res",
     "journal of infectious diseases": "J Infect Dis",
     "clinical infectious diseases": "Clin Infect Dis",
+    "the journal of infectious diseases": "J Infect Dis",
     "emerging infectious diseases": "Emerg Infect Dis",
     "infection and immunity": "Infect Immun",
     "vaccine": "Vaccine",
@@ -1061,45 +1349,81 @@ def abbreviate_journal_name_basic(name: str) -> str:
     "journal of antimicrobial chemotherapy": "J Antimicrob Chemother",
     "clinical microbiology reviews": "Clin Microbiol Rev",
     "journal of clinical microbiology": "J Clin Microbiol",
+    "obstetrics & gynecology": "Obstet Gynecol",
+    "current opinion in obstetrics and gynecology": "Curr Opin Obstet Gynecol",
     "cold spring harbor perspectives in medicine": "Cold Spring Harb Perspect Med",
     "cold spring harbor perspectives in biology": "Cold Spring Harb Perspect Biol"
-    }
-    name_lower = name.lower()
-    for key, abbr in mapping.items():
-        if key.lower() == name_lower:
-            with CACHE_LOCK:
-                REF_CACHE['journal_abbrev'][name_norm] = abbr
-            return abbr
-    sorted_items = sorted(mapping.items(), key=lambda x: len(x[0]), reverse=True)
-    for key, abbr in sorted_items:
-        key_lower = key.lower()
-        # Clean entities thoroughly
-        name_clean = html.unescape(name_lower).replace('–', '-')
-        key_clean = html.unescape(key_lower).replace('–', '-')
+}
+# The substring fallback tries the longest names first
+_JOURNAL_ABBREV_SORTED = sorted(_JOURNAL_ABBREV_MAP.items(), key=lambda kv: -len(kv[0]))
+
+def _clean_journal_name(name_lower: str) -> str:
+    # Clean entities thoroughly
+    return html.unescape(name_lower).replace('–', '-').replace('&amp;', '&')
+
+# Keys cleaned once, in the same (longest first) order
+_JOURNAL_ABBREV_CLEAN = [(_clean_journal_name(k), v) for k, v in _JOURNAL_ABBREV_SORTED]
+
+if ahocorasick is not None:
+    # Substring fallback in two C-level passes instead of one check per key.
+    # Keys inside a name are found by an Aho-Corasick automaton (value: the
+    # key's rank in _JOURNAL_ABBREV_CLEAN, first rank kept for repeats); keys
+    # containing a name by one find() over all keys joined in rank order.
+    _JOURNAL_ABBREV_AUTOMATON = ahocorasick.Automaton()
+    _JOURNAL_ABBREV_STARTS = []  # offset of each key in _JOURNAL_ABBREV_JOINED
+    _offset = 0
+    for _rank, (_key_clean, _abbr) in enumerate(_JOURNAL_ABBREV_CLEAN):
+        if not _JOURNAL_ABBREV_AUTOMATON.exists(_key_clean):
+            _JOURNAL_ABBREV_AUTOMATON.add_word(_key_clean, _rank)
+        _JOURNAL_ABBREV_STARTS.append(_offset)
+        _offset += len(_key_clean) + 1
+    _JOURNAL_ABBREV_AUTOMATON.make_automaton()
+    _JOURNAL_ABBREV_JOINED = '\x00'.join(k for k, _ in _JOURNAL_ABBREV_CLEAN)
+
+def _journal_abbrev_rank(name_clean: str) -> Optional[int]:
+    """Rank of the first key (longest first) inside name_clean or containing it, via the automaton."""
+    ranks = [rank for _, rank in _JOURNAL_ABBREV_AUTOMATON.iter(name_clean)]
+    pos = _JOURNAL_ABBREV_JOINED.find(name_clean)
+    if pos != -1:
+        ranks.append(bisect_right(_JOURNAL_ABBREV_STARTS, pos) - 1)
+    return min(ranks) if ranks else None
 
-        name_clean = name_clean.replace('&amp;', '&')
-        key_clean = key_clean.replace('&amp;', '&')
+def abbreviate_journal_name_basic(name: str) -> str:
+    if not name:
+        return "No journal available"
 
+    name_norm = normalize_whitespace(name).lower()
+    abbr = _journal_abbreviation(name_norm) if name_norm else None
+    # Store original as fallback if no match found
+    return abbr if abbr is not None else name
+
+@lru_cache(maxsize=4096)
+def _journal_abbreviation(name_lower: str) -> Optional[str]:
+    """Abbreviation for a whitespace-normalised, lowercased journal name, or None."""
+    abbr = _JOURNAL_ABBREV_MAP.get(name_lower)
+    if abbr is not None:
+        return abbr
+    name_clean = _clean_journal_name(name_lower)
+    if ahocorasick is not None and '\x00' not in name_clean:
+        rank = _journal_abbrev_rank(name_clean)
+        return _JOURNAL_ABBREV_CLEAN[rank][1] if rank is not None else None
+    for key_clean, abbr in _JOURNAL_ABBREV_CLEAN:
         if key_clean in name_clean or name_clean in key_clean:
-            with CACHE_LOCK:
-                REF_CACHE['journal_abbrev'][name_norm] = abbr
             return abbr
-    
-    # Store original as fallback if no match found (or should we?)
-    # Usually cache success only. But if we want to avoid re-scanning mapping...
-    return name
+    return None
+
+def _clean_text(t):
+    # Decode HTML entities (and doubly-escaped "&amp;") in API text; most
+    # strings have no '&' at all and come back untouched
+    if not t or '&' not in t:
+        return t
+    return html.unescape(t).replace('&amp;', '&')
 
 def generate_ama_citation(item: Dict[str, Any]) -> List[Tuple[str, Optional[str]]]:
     ctype = item.get('type', 'journal-article')
-    date_parts = item.get('created', {}).get('date-parts') or item.get('published-print', {}).get('date-parts') or [[None]]
-    year = str(date_parts[0][0]) if date_parts[0][0] else (item.get('year') or 'n.d')
+    year = _extract_year(item, 'n.d')
     
-    # helper to clean text
-    def clean_text(t):
-        if not t: return t
-        return html.unescape(t).replace('&amp;', '&')
-
-    title = clean_text((item.get('title') or ['No title available'])[0])
+    title = _clean_text((item.get('title') or ['No title available'])[0])
     container = (item.get('container-title') or [''])[0]
     # Clean the container *before* checking mapping, or inside mapping?
     # abbreviate_journal_name_basic handles cleaning internally now for matching keys,
@@ -1107,7 +1431,7 @@ def generate_ama_citation(item: Dict[str, Any]) -> List[Tuple[str, Optional[str]
     # The function returns the *Values* from the map which are clean strings.
     # But if it misses, it returns input. So let's pass container as is?
     # Actually, let's clean container for display purposes at least.
-    container_display = clean_text(container)
+    container_display = _clean_text(container)
 
     # 1. Try Manual Mapping First
     manual_abbr = abbreviate_journal_name_basic(container_display)
@@ -1121,12 +1445,10 @@ def generate_ama_citation(item: Dict[str, Any]) -> List[Tuple[str, Optional[str]
         # No manual mapping hit. Check API.
         short_titles = item.get('short-container-title')
         if short_titles and isinstance(short_titles, list) and short_titles[0]:
-            journal_abbr = clean_text(short_titles[0])
+            journal_abbr = _clean_text(short_titles[0])
         else:
             journal_abbr = manual_abbr # Matches container_display
 
-    volume = item.get('volume', '')
-    issue = item.get('issue', '')
     volume = item.get('volume', '')
     issue = item.get('issue', '')
     pages = item.get('page', '')
@@ -1152,15 +1474,7 @@ def generate_ama_citation(item: Dict[str, Any]) -> List[Tuple[str, Optional[str]
         for i, author in enumerate(subset):
             if i > 0:
                 segments.append((", ", None))
-            family = author.get('family', '').strip()
-            given = author.get('given', '').strip()
-            if family:
-                segments.append((family, 'bib_surname'))
-            if given:
-                segments.append((" ", None))
-                # AMA Use all initials
-                initials = extract_initials(given)
-                segments.append((initials, 'bib_fname'))
+            segments.extend(_ama_author_segments(author.get('family', ''), author.get('given', '')))
         
         if has_etal:
             segments.append((", et al", 'bib_etal'))
@@ -1175,72 +1489,46 @@ def generate_ama_citation(item: Dict[str, Any]) -> List[Tuple[str, Optional[str]
     
     # Strip dots from title to avoid double punctuation
     title_clean = title.rstrip('.')
-    segments.append((title_clean, t_style))
-    segments.append((". ", None))
+    segments.extend(((title_clean, t_style), (". ", None)))
 
     if ctype == 'book':
         publisher = item.get('publisher', '')
         if publisher:
-            segments.append((publisher, 'bib_publisher'))
-            segments.append(("; ", None))
-        segments.append((year, 'bib_year'))
-        segments.append((".", None))
+            segments.extend(((publisher, 'bib_publisher'), ("; ", None)))
+        segments.extend(((year, 'bib_year'), (".", None)))
     elif ctype in ('proceedings-article', 'conference-paper', 'book-chapter'):
         if container:
-            segments.append(("In: ", None))
-            segments.append((container, 'bib_confproceedings' if ctype != 'book-chapter' else 'bib_book'))
-            segments.append((". ", None))
+            segments.extend((
+                ("In: ", None),
+                (container, 'bib_confproceedings' if ctype != 'book-chapter' else 'bib_book'),
+                (". ", None)
+            ))
         if item.get('publisher'):
-            segments.append((item.get('publisher'), 'bib_publisher'))
-            segments.append(("; ", None))
+            segments.extend(((item.get('publisher'), 'bib_publisher'), ("; ", None)))
         segments.append((year, 'bib_year'))
         if pages:
             segments.append((":", None))
-            if '-' in pages:
-                parts = pages.split('-', 1)
-                segments.append((parts[0], 'bib_fpage'))
-                segments.append(("-", None))
-                segments.append((parts[1], 'bib_lpage'))
-            else:
-                segments.append((pages, 'bib_fpage'))
+            _emit_pages(segments, pages)
         segments.append((".", None))
     elif ctype == 'web':
         if container:
-            segments.append((container, 'bib_journal'))
-            segments.append((". ", None))
-        segments.append(("Published ", None))
-        segments.append((year, 'bib_year'))
-        segments.append((".", None))
+            segments.extend(((container, 'bib_journal'), (". ", None)))
+        segments.extend((("Published ", None), (year, 'bib_year'), (".", None)))
         if url:
-            segments.append((" ", None))
-            segments.append((url, 'bib_url'))
+            segments.extend(((" ", None), (url, 'bib_url')))
     else:
-        segments.append((journal_abbr, 'bib_journal'))
-        segments.append((". ", None))
-        segments.append((year, 'bib_year'))
-        segments.append((";", None))
+        segments.extend(((journal_abbr, 'bib_journal'), (". ", None), (year, 'bib_year'), (";", None)))
         if volume:
             segments.append((volume, 'bib_volume'))
         if issue:
-            segments.append(("(", None))
-            segments.append((issue, 'bib_issue'))
-            segments.append((")", None))
+            segments.extend((("(", None), (issue, 'bib_issue'), (")", None)))
         if pages:
             segments.append((":", None))
-            if '-' in pages:
-                parts = pages.split('-', 1)
-                segments.append((parts[0], 'bib_fpage'))
-                segments.append(("-", None))
-                segments.append((parts[1], 'bib_lpage'))
-            else:
-                segments.append((pages, 'bib_fpage'))
+            _emit_pages(segments, pages)
         if doi:
-            segments.append((". ", None))
-            segments.append(("doi:", 'bib_doi'))
-            segments.append((doi, 'bib_doi'))
+            segments.extend(((". ", None), ("doi:", 'bib_doi'), (doi, 'bib_doi')))
         elif url:
-            segments.append((" ", None))
-            segments.append((url, 'bib_url'))
+            segments.extend(((" ", None), (url, 'bib_url')))
 
     return segments
 
@@ -1253,17 +1541,11 @@ def generate_chicago_citation(item: Dict[str, Any]) -> List[Tuple[str, Optional[
     Format: Author. Title. Container. Publisher, Year.
     """
     ctype = item.get('type', 'journal-article')
-    date_parts = item.get('created', {}).get('date-parts') or item.get('published-print', {}).get('date-parts') or [[None]]
-    year = str(date_parts[0][0]) if date_parts[0][0] else (item.get('year') or 'n.d.')
+    year = _extract_year(item)
     
-    # helper to clean text
-    def clean_text(t):
-        if not t: return t
-        return html.unescape(t).replace('&amp;', '&')
-
-    title = clean_text((item.get('title') or ['No title available'])[0])
+    title = _clean_text((item.get('title') or ['No title available'])[0])
     container = (item.get('container-title') or [''])[0]
-    container = clean_text(container)
+    container = _clean_text(container)
     
     publisher = item.get('publisher', '')
     volume = item.get('volume', '')
@@ -1291,16 +1573,14 @@ def generate_chicago_citation(item: Dict[str, Any]) -> List[Tuple[str, Optional[
             if i == 0:
                 segments.append((fam, 'bib_surname'))
                 if giv:
-                    segments.append((", ", None))
-                    segments.append((giv, 'bib_fname'))
+                    segments.extend(((", ", None), (giv, 'bib_fname')))
             else:
                 segments.append((", ", None))
                 if i == count - 1 and count <= limit:
                     segments.append(("and ", None))
                 
                 if giv:
-                    segments.append((giv, 'bib_fname'))
-                    segments.append((" ", None))
+                    segments.extend(((giv, 'bib_fname'), (" ", None)))
                 segments.append((fam, 'bib_surname'))
         
         if count > limit:
@@ -1311,61 +1591,50 @@ def generate_chicago_citation(item: Dict[str, Any]) -> List[Tuple[str, Optional[
     # --- Title & Container ---
     if ctype == 'book':
         # Author. *Title*. Place: Publisher, Year.
-        segments.append((title, 'bib_book'))
-        segments.append((". ", None))
+        segments.extend(((title, 'bib_book'), (". ", None)))
         if publisher:
-            segments.append((publisher, 'bib_publisher'))
-            segments.append((", ", None))
-        segments.append((year, 'bib_year'))
-        segments.append((".", None))
+            segments.extend(((publisher, 'bib_publisher'), (", ", None)))
+        segments.extend(((year, 'bib_year'), (".", None)))
         
     elif ctype == 'chapter' or ctype == 'book-chapter':
         # Author. "Title." In *Book*, edited by..., pages. Pub, Year.
-        segments.append(('"', None))
-        segments.append((title, 'bib_chaptertitle'))
-        segments.append(('."', None))
-        segments.append((" In ", None))
-        segments.append((container, 'bib_book'))
-        segments.append((", ", None))
+        segments.extend((
+            ('"', None),
+            (title, 'bib_chaptertitle'),
+            ('."', None),
+            (" In ", None),
+            (container, 'bib_book'),
+            (", ", None)
+        ))
         if pages:
-            segments.append((pages, 'bib_fpage')) 
-            segments.append((". ", None))
+            segments.extend(((pages, 'bib_fpage'), (". ", None)))
         if publisher:
-            segments.append((publisher, 'bib_publisher'))
-            segments.append((", ", None))
-        segments.append((year, 'bib_year'))
-        segments.append((".", None))
+            segments.extend(((publisher, 'bib_publisher'), (", ", None)))
+        segments.extend(((year, 'bib_year'), (".", None)))
 
     elif ctype == 'web':
         # Author. "Title." Site. Year. URL.
-        segments.append(('"', None))
-        segments.append((title, 'bib_title'))
-        segments.append(('."', None))
+        segments.extend((('"', None), (title, 'bib_title'), ('."', None)))
         if container:
-             segments.append((" ", None))
-             segments.append((container, 'bib_journal'))
-        segments.append((". ", None))
-        segments.append((year, 'bib_year'))
-        segments.append((".", None))
+             segments.extend(((" ", None), (container, 'bib_journal')))
+        segments.extend(((". ", None), (year, 'bib_year'), (".", None)))
     
     else:
         # Journal
-        segments.append(('"', None))
-        segments.append((title, 'bib_article'))
-        segments.append(('."', None))
-        segments.append((" ", None))
-        segments.append((container, 'bib_journal'))
+        segments.extend((
+            ('"', None),
+            (title, 'bib_article'),
+            ('."', None),
+            (" ", None),
+            (container, 'bib_journal')
+        ))
         
         if volume:
-            segments.append((" ", None))
-            segments.append((volume, 'bib_volume'))
+            segments.extend(((" ", None), (volume, 'bib_volume')))
         if issue:
-            segments.append((", no. ", None))
-            segments.append((issue, 'bib_issue'))
+            segments.extend(((", no. ", None), (issue, 'bib_issue')))
             
-        segments.append((" (", None))
-        segments.append((year, 'bib_year'))
-        segments.append(("): ", None))
+        segments.extend(((" (", None), (year, 'bib_year'), ("): ", None)))
         
         if pages:
              segments.append((pages, 'bib_fpage'))
@@ -1373,19 +1642,44 @@ def generate_chicago_citation(item: Dict[str, Any]) -> List[Tuple[str, Optional[
 
     # --- Links ---
     if doi:
-        segments.append((" https://doi.org/", 'bib_doi'))
-        segments.append((doi, 'bib_doi'))
-        segments.append((".", None))
+        segments.extend(((" https://doi.org/", 'bib_doi'), (doi, 'bib_doi'), (".", None)))
     elif url:
-         segments.append((" ", None))
-         segments.append((url, 'bib_url'))
-         segments.append((".", None))
+         segments.extend(((" ", None), (url, 'bib_url'), (".", None)))
          
     return segments
 
 # -------------------------
 # Style-based parsing (character styles)
 # -------------------------
+# Character-style tokens in match order (first hit wins) and the field each one fills
+_STYLE_FIELD_TOKENS = (
+    (('bib_surname', 'bib_ed-surname'), 'surname'),
+    (('bib_fname', 'bib_ed-fname'), 'fname'),
+    (('bib_etal', 'bib_ed-etal'), 'etal'),
+    (('bib_year', 'bib_confdate'), 'year'),
+    (('bib_title', 'bib_chaptertitle', 'bib_article', 'bib_confpaper'), 'title'),
+    (('bib_journal', 'bib_confproceedings', 'bib_conference'), 'container-title'),
+    (('bib_volume', 'bib_volcount'), 'volume'),
+    (('bib_issue', 'bib_number'), 'issue'),
+    (('bib_pages', 'bib_fpage', 'bib_lpage', 'bib_pagecount'), 'page'),
+    (('bib_doi',), 'DOI'),
+    (('bib_url', 'bib_extlink'), 'URL'),
+    (('bib_publisher', 'bib_institution', 'bib_organization', 'bib_school'), 'publisher'),
+    (('bib_book',), 'book'),
+)
+
+@lru_cache(maxsize=1024)
+def _style_field(style_name: str) -> Optional[str]:
+    """Field a run in this character style fills, or None for unrecognised styles."""
+    style = style_name.lower()
+    if 'bib_' not in style:
+        return None
+    for tokens, field in _STYLE_FIELD_TOKENS:
+        for token in tokens:
+            if token in style:
+                return field
+    return None
+
 def parse_reference_from_styles(para) -> Optional[Dict[str, Any]]:
     data = {
         'author_list': [],
@@ -1411,74 +1705,40 @@ def parse_reference_from_styles(para) -> Optional[Dict[str, Any]]:
             curr_fname = ''
 
     has_data = False
-    prev_style = None
+    fields = {}  # style id -> field, resolved once per distinct style in the paragraph
     for run in para.runs:
         text = run.text
         if not text:
             continue
-        style = run.style.name.lower() if run.style else ''
-        if 'bib_surname' in style or 'bib_ed-surname' in style:
+        style_id = run._r.style
+        try:
+            field = fields[style_id]
+        except KeyError:
+            style = run.style
+            field = fields[style_id] = _style_field(style.name) if style else None
+        if field is None:
+            # ignore unstyled punctuation mostly
+            continue
+        has_data = True
+        if field == 'surname':
             if curr_fname:
                 flush_author()
             curr_surname += text
-            has_data = True
-        elif 'bib_fname' in style or 'bib_ed-fname' in style:
+        elif field == 'fname':
             curr_fname += text
-            has_data = True
-        elif 'bib_etal' in style or 'bib_ed-etal' in style:
+        elif field == 'etal':
             flush_author()
             data['has_etal'] = True
-            has_data = True
-        elif 'bib_year' in style or 'bib_confdate' in style:
-            flush_author()
-            data['year'] += text
-            has_data = True
-        elif 'bib_title' in style or 'bib_chaptertitle' in style or 'bib_article' in style or 'bib_confpaper' in style:
-            flush_author()
-            if not data['title']: data['title'] = ['']
-            data['title'][0] += text
-            has_data = True
-        elif 'bib_journal' in style or 'bib_confproceedings' in style or 'bib_conference' in style:
-            flush_author()
-            if not data['container-title']: data['container-title'] = ['']
-            data['container-title'][0] += text
-            has_data = True
-        elif 'bib_volume' in style or 'bib_volcount' in style:
-            flush_author()
-            data['volume'] += text
-            has_data = True
-        elif 'bib_issue' in style or 'bib_number' in style:
-            flush_author()
-            data['issue'] += text
-            has_data = True
-        elif 'bib_pages' in style or 'bib_fpage' in style or 'bib_lpage' in style or 'bib_pagecount' in style:
-            flush_author()
-            data['page'] += text
-            has_data = True
-        elif 'bib_doi' in style:
-            flush_author()
-            data['DOI'] += text
-            has_data = True
-        elif 'bib_url' in style or 'bib_extlink' in style:
-            flush_author()
-            data['URL'] += text
-            has_data = True
-        elif 'bib_publisher' in style or 'bib_institution' in style or 'bib_organization' in style or 'bib_school' in style:
-            flush_author()
-            data['publisher'] += text
-            has_data = True
-        elif 'bib_book' in style:
-            flush_author()
-            data['type'] = 'book'
-            if not data['title']: data['title'] = ['']
-            data['title'][0] += text
-            has_data = True
         else:
-            # ignore unstyled punctuation mostly
-            pass
-
-        if style:
-            prev_style = style
+            flush_author()
+            if field == 'book':
+                data['type'] = 'book'
+                field = 'title'
+            if field == 'title' or field == 'container-title':
+                if not data[field]: data[field] = ['']
+                data[field][0] += text
+            else:
+                data[field] += text
 
     flush_author()
     if not has_data:
@@ -1512,12 +1772,12 @@ def generate_fallback_citation(parsed: Dict[str, Any], original_raw: str, style_
     manual_type = parsed.get('manual_type') or parsed.get('type')
     
     # helper regexes
-    re_year = re.compile(r'\b(19|20)\d{2}\b')
+    re_year = year_regex
     re_url = re.compile(r'https?://\S+')
     
     def parse_authors_title_rest(text):
         """Naive splitter: Authors. Title. Rest"""
-        parts = [p.strip() for p in re.split(r'\.\s+', text) if p.strip()]
+        parts = [p.strip() for p in sentence_split_regex.split(text) if p.strip()]
         if len(parts) >= 3:
             return parts[0], parts[1], ". ".join(parts[2:])
         elif len(parts) == 2:
@@ -2538,7 +2798,7 @@ def find_best_metadata_for_reference(raw_ref: str, style_name: str) -> Tuple[Opt
              if gb_res:
                  # Check similarity
                  found_title = gb_res['title'][0]
-                 sim = similarity(t_query, found_title)
+                 sim = similarity(t_query, found_title, score_cutoff=0.7)
                  if sim > 0.7:
                      return gb_res, 'google_books', sim
              
@@ -2569,18 +2829,22 @@ def find_best_metadata_for_reference(raw_ref: str, style_name: str) -> Tuple[Opt
     authors_str = parsed.get('authors') or ''
 
     # If it is a Book/Web input, we should be very skeptical of Journal results
+
+    # CrossRef does not depend on the PubMed results: search it in the background
+    cr_future = CROSSREF_EXECUTOR.submit(crossref_search, title, journal, year, rows=CROSSREF_ROWS)
     
     pm_ids = pubmed_search_ids(title, journal, year, max_results=4)
+    pm_records = pubmed_fetch_xml_batch(pm_ids)
     pubmed_items = []
     for pid in pm_ids:
-        root = pubmed_fetch_xml(pid)
+        root = pm_records.get(pid)
         if root is None:
             continue
         pm_unified = pubmed_parse_article_from_xml(root)
         if pm_unified:
             pubmed_items.append(pm_unified)
 
-    cr_candidates = crossref_search(title, journal, year, rows=CROSSREF_ROWS)
+    cr_candidates = cr_future.result()
     chosen, source_tag, score = pick_best_between_pubmed_crossref(title, pubmed_items, cr_candidates)
 
     # --- FILTERING LOGIC ---
@@ -2594,7 +2858,7 @@ def find_best_metadata_for_reference(raw_ref: str, style_name: str) -> Tuple[Opt
             # e.g. "Review of: Title" or "Title: subtitle"
             
             chosen_title = (chosen.get('title') or [''])[0]
-            sim_pure = similarity(title, chosen_title)
+            sim_pure = similarity(title, chosen_title, score_cutoff=0.98)
             
             # If input is book, we REJECT if:
             # 1. Score is not perfect (sim < 0.98)
@@ -2692,6 +2956,8 @@ def process_docx_file(input_docx: Path, output_dir: Optional[Path] = None) -> Di
             pass
 
     log_lines = []
+    # (log_lines index, validate_url future, url, source, score, text) per changed reference
+    pending_url_checks = []
     total = 0
     changed = 0
     unresolved = []
@@ -2779,7 +3045,7 @@ def process_docx_file(input_docx: Path, output_dir: Optional[Path] = None) -> Di
 
     # Execute Futures
     print(f"Submitting {len(tasks)} references for parallel validation...")
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+    with concurrent.futures.ThreadPoolExecutor(max_workers=REFERENCE_WORKERS) as executor:
         for t in tasks:
             t['future'] = executor.submit(find_best_metadata_for_reference, t['raw_for_search'], t['style'])
             
@@ -3030,29 +3296,9 @@ def process_docx_file(input_docx: Path, output_dir: Optional[Path] = None) -> Di
                     if m:
                         final_url = m.group(0).rstrip('.,;)')
 
-                validation_msg = ""
-                if final_url:
-                    # Validate URL? This is also slow!
-                    # Should we parallelize this too? 
-                    # For now keep it linear or fast check.
-                    # validate_url has 5s timeout.
-                    # We should probably skip it or parallelize it.
-                    # Given the user complained about slowness, let's skip rigorous URL validation or do it in the parallel block?
-                    # The parallel block returns metadata.
-                    # validation_msg is only for logging, it doesn't affect the document usually (except generic warning).
-                    # Actually, we can move validate_url inside find_best_metadata_for_reference?
-                    # No, find_best_metadata_for_reference returns (metadata, source, score).
-                    # Let's keep it here but with short timeout, OR just trust it.
-                    # The user didn't explicitly ask for URL validation, but the code has it.
-                    # I'll update validate_url to be very fast (HEAD only) or just assume it's slow.
-                    # BUT wait, the original code called `validate_url(final_url)`.
-                    # I will keep it for now but maybe later I can move it.
-                    
-                    is_valid = validate_url(final_url, timeout=3) # Reduced timeout
-                    if not is_valid:
-                        validation_msg = f" [WARNING: URL validation failed for {final_url}]"
-                    else:
-                        validation_msg = " [URL Valid]"
+                # URLs are checked in the background (CROSSREF_EXECUTOR); each result
+                # is filled into this reference's log line after the loop
+                url_check = CROSSREF_EXECUTOR.submit(validate_url, final_url, 3) if final_url else None # Reduced timeout
 
                 # Write back
                 preserve_styles = (source == 'style_parsing')
@@ -3063,7 +3309,11 @@ def process_docx_file(input_docx: Path, output_dir: Optional[Path] = None) -> Di
                      try_add_word_comment(doc, para, comment_text_to_add, author="RefFix", initials="RF")
                      log_lines.append(f"Added comment: {comment_text_to_add}\n")
 
-                log_lines.append(f"Source: {source}, Score: {score:.3f}{validation_msg}\nNew: {full_text}\n")
+                if url_check is None:
+                    log_lines.append(f"Source: {source}, Score: {score:.3f}\nNew: {full_text}\n")
+                else:
+                    pending_url_checks.append((len(log_lines), url_check, final_url, source, score, full_text))
+                    log_lines.append("")
                 changed += 1
 
             except Exception as e:
@@ -3071,6 +3321,13 @@ def process_docx_file(input_docx: Path, output_dir: Optional[Path] = None) -> Di
                 unresolved.append(raw)
 
 
+    for pos, url_check, final_url, source, score, full_text in pending_url_checks:
+        if url_check.result():
+            validation_msg = " [URL Valid]"
+        else:
+            validation_msg = f" [WARNING: URL validation failed for {final_url}]"
+        log_lines[pos] = f"Source: {source}, Score: {score:.3f}{validation_msg}\nNew: {full_text}\n"
+
     try:
         doc.save(output_docx)
         logger.info(f"Saved output to: {output_docx}")
@@ -50,7 +50,7 @@ from docx.table import Table
 import difflib
 from highlighter.core_highlighter_docx import process_docx
 from ReferencesStructing import process_docx_file, parse_ama_reference_raw, parse_apa_reference_raw, generate_fallback_citation
-from ReferenceAPAValidation import validate_document_multi_style, insert_comments_in_document, generate_report as generate_apa_report, apply_citation_formatting
+from ReferenceAPAValidation import validate_document_multi_style, insert_comments_in_document, generate_report as generate_apa_report, apply_citation_formatting, ParagraphIndex
 import tempfile
 from io import BytesIO
 from extractor import extract_from_file, write_permission_log
@@ -2376,13 +2376,18 @@ def process_validation_job(job_id, processing_dir, file_paths, original_filename
                     log_buffer.append("\n--- NAME & YEAR VALIDATION ---")
                     try:
                         apa_results = validate_document_multi_style(current_filepath)
-                        formatted_count = apply_citation_formatting(current_filepath, apa_results)
+                        # Parse the document once; formatting and comments share it and its paragraph index
+                        annotated_doc = Document(current_filepath)
+                        para_index = ParagraphIndex(annotated_doc)
+                        formatted_count = apply_citation_formatting(current_filepath, apa_results, doc=annotated_doc, para_index=para_index)
                         
                         annotated_doc, comment_count = insert_comments_in_document(
                              current_filepath, 
                              apa_results, 
                              apa_results['citation_locations'], 
-                             apa_results['reference_details']
+                             apa_results['reference_details'],
+                             doc=annotated_doc,
+                             para_index=para_index
                         )
                         
                         log_buffer.append(f"Comments inserted: {comment_count}")
@@ -0,0 +1,68 @@
+"""
+Length-window duplicate scoring shared by the reference validators
+
+fuzz.ratio between every pair of reference texts whose lengths still allow a
+score above the duplicate cutoff, computed block by block with rapidfuzz's
+cdist. Kept free of Flask and python-docx so every validator can import it.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz
+from rapidfuzz.process import cdist
+
+DUPLICATE_SCORE_CUTOFF = 85
+# fuzz.ratio can only exceed the cutoff when the longer text is at most this
+# many times the shorter one: 2*short/(short+long) > c  <=>  long/short < (2-c)/c
+DUPLICATE_MAX_LENGTH_RATIO = (200 - DUPLICATE_SCORE_CUTOFF) / DUPLICATE_SCORE_CUTOFF
+# Rows per cdist call when scanning length-sorted references
+DUPLICATE_BLOCK_ROWS = 64
+
+# Bibliographies with fewer entries are always scored exactly with
+# length_window_pairs; larger ones may go through a MinHash LSH prefilter.
+# Measured on one core: 3000 refs take 1.4s exact vs 2.9s via LSH, 10000 refs
+# 16s vs 11s, 20000 refs 47s vs 28s.
+DUPLICATE_LSH_MIN_REFS = 10000
+# LSH settings: 3-character shingles, Jaccard threshold 0.15, 256 permutations.
+# Checked against length_window_pairs on planted near-duplicates of 74-155
+# characters with 4-22 edits: every pair scoring over 85 was a candidate
+# (549/549 at 85-90, 1182/1182 at 90-95). Higher thresholds or longer shingles
+# lose pairs in the 85-90 band.
+DUPLICATE_SHINGLE_SIZE = 3
+DUPLICATE_LSH_THRESHOLD = 0.15
+DUPLICATE_LSH_NUM_PERM = 256
+
+
+def length_window_pairs(texts: List[str]) -> Tuple[List[int], List[int], List[float]]:
+    """
+    Score every pair whose lengths allow a match, as (i, j, score) lists with i < j
+    in row-major order. Texts are sorted by length and each block of rows is
+    compared only with the columns inside its length window, one cdist per block.
+    """
+    n = len(texts)
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=n)
+    order = np.argsort(lengths, kind='stable')
+    sorted_lengths = lengths[order]
+    window_end = np.searchsorted(sorted_lengths, sorted_lengths * DUPLICATE_MAX_LENGTH_RATIO, side='right')
+    sorted_texts = [texts[k] for k in order]
+
+    firsts, seconds, scores = [], [], []
+    for start in range(0, n, DUPLICATE_BLOCK_ROWS):
+        stop = min(start + DUPLICATE_BLOCK_ROWS, n)
+        block = cdist(sorted_texts[start:stop], sorted_texts[start:window_end[stop - 1]],
+                      scorer=fuzz.ratio, dtype=np.float64,
+                      score_cutoff=DUPLICATE_SCORE_CUTOFF, workers=-1)
+        rows, cols = np.nonzero(block > DUPLICATE_SCORE_CUTOFF)
+        forward = cols > rows  # each unordered pair once (block columns start at `start` too)
+        rows, cols = rows[forward], cols[forward]
+        a, b = order[rows + start], order[cols + start]
+        firsts.append(np.minimum(a, b))
+        seconds.append(np.maximum(a, b))
+        scores.append(block[rows, cols])
+
+    if not firsts:
+        return [], [], []
+    i, j, score = np.concatenate(firsts), np.concatenate(seconds), np.concatenate(scores)
+    rank = np.lexsort((j, i))
+    return i[rank].tolist(), j[rank].tolist(), score[rank].tolist()